@@ -1,10 +1,18 @@
 """测验 API"""
+import asyncio
+import logging
 import random
+from collections import Counter
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case, literal
-from app.core.database import get_db
+from sqlalchemy import func, case, exists, insert, literal, select
+from app.core.config import get_settings
+from app.core.database import get_db, get_async_db, upsert
+from app.core.pagination import paginate
+from app.core.responses import list_response
 from app.models import (
     Exam, ExamStatus, ExamMode, ScoreType,
     Question, Material, Answer, Mistake, QuestionType
@@ -14,31 +22,38 @@ from app.services import qwen_service
 from app.services import gamification_service as gs
 
 router = APIRouter(prefix="/exams", tags=["测验"])
+logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
-def _add_or_update_mistake(db: Session, question_id: int, answer_id: int):
-    """添加或更新错题记录（同一题目不重复，多次出错标记为易错题）"""
-    existing = db.query(Mistake).filter(Mistake.question_id == question_id).first()
-    
-    if existing:
-        # 已存在：更新错误次数和时间，标记为易错题
-        existing.error_count += 1
-        existing.last_error_at = datetime.now()
-        existing.answer_id = answer_id
-        if existing.error_count >= 2:
-            existing.error_prone = True
-        # 如果之前标记为已掌握但又答错了，取消掌握状态
-        if existing.mastered:
-            existing.mastered = False
-    else:
-        # 不存在：创建新错题记录
-        mistake = Mistake(
-            question_id=question_id,
-            answer_id=answer_id,
-            error_count=1,
-            error_prone=False,
-        )
-        db.add(mistake)
+def _upsert_mistakes(db: Session, wrong_answers: list[Answer]):
+    """批量添加或更新错题记录（同一题目不重复，多次出错标记为易错题）"""
+    now = datetime.now()
+    rows: dict[int, dict] = {}
+    for answer in wrong_answers:
+        row = rows.setdefault(answer.question_id, {
+            "question_id": answer.question_id,
+            "error_count": 0,
+            "mastered": False,
+            "last_error_at": now,
+        })
+        row["error_count"] += 1
+        row["answer_id"] = answer.id
+    for row in rows.values():
+        row["error_prone"] = row["error_count"] >= 2
+
+    mistakes = Mistake.__table__.c
+    upsert(
+        db, Mistake, list(rows.values()),
+        conflict_columns=["question_id"],
+        update_columns=["answer_id", "last_error_at"],
+        # 已存在：累加错误次数并标记为易错题；之前已掌握但又答错，取消掌握状态
+        update_expressions=lambda new: {
+            "error_count": mistakes.error_count + new.error_count,
+            "error_prone": True,
+            "mastered": False,
+        },
+    )
 
 
 def _resolve_option_text(answer: str, options: list) -> str:
@@ -69,6 +84,42 @@ def _resolve_option_text(answer: str, options: list) -> str:
     return answer
 
 
+OBJECTIVE_TYPES = (QuestionType.SINGLE_CHOICE, QuestionType.MULTI_CHOICE, QuestionType.TRUE_FALSE)
+
+
+def _score_objective(question: Question, user_answer: str) -> tuple[bool, float]:
+    """客观题本地评分，返回 (是否正确, 得分)"""
+    user_ans = user_answer.strip()
+    correct_ans = question.answer.strip()
+
+    if question.type == QuestionType.MULTI_CHOICE:
+        # 多选题：将双方都解析为选项文本集合后比较
+        user_parts = [s.strip() for s in user_ans.split(",") if s.strip()]
+        correct_parts = [s.strip() for s in correct_ans.split(",") if s.strip()]
+        if question.options:
+            user_parts = [_resolve_option_text(p, question.options) for p in user_parts]
+            correct_parts = [_resolve_option_text(p, question.options) for p in correct_parts]
+        is_correct = set(user_parts) == set(correct_parts)
+    else:
+        # 单选题 / 判断题：解析后比较
+        resolved_user = _resolve_option_text(user_ans, question.options) if question.options else user_ans
+        resolved_correct = _resolve_option_text(correct_ans, question.options) if question.options else correct_ans
+        is_correct = resolved_user == resolved_correct
+
+    return is_correct, 100.0 if is_correct else 0.0
+
+
+async def _evaluate_subjective(semaphore: asyncio.Semaphore, question: Question, user_answer: str) -> dict:
+    """主观题 AI 评分（受并发信号量限制）"""
+    async with semaphore:
+        return await qwen_service.evaluate_answer(
+            question.content,
+            question.answer,
+            user_answer,
+            question.type.value
+        )
+
+
 def calculate_grade(score: float) -> str:
     """根据分数计算等级"""
     if score >= 90:
@@ -81,6 +132,16 @@ def calculate_grade(score: float) -> str:
         return "D"
 
 
+PRIORITY_LABELS = ("新题", "易错题", "错题", "其他")
+
+
+def _random_order(db: Session):
+    """按数据库方言返回随机排序函数"""
+    if db.get_bind().dialect.name == "mysql":
+        return func.rand()
+    return func.random()
+
+
 def _select_questions_by_priority(db: Session, direction_id: int, count: int, material_ids: list[int] | None = None) -> list[Question]:
     """按优先级选题：新题 > 易错题 > 错题 > 其他
     
@@ -93,81 +154,52 @@ def _select_questions_by_priority(db: Session, direction_id: int, count: int, ma
     参数：
     - material_ids: 指定资料ID列表，为 None 或空列表时使用该方向全部资料
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    # 该方向下的所有题目ID（可按资料筛选）
-    q_query = db.query(Question.id).join(Material).filter(Material.direction_id == direction_id)
+    # 一条 SQL 完成分层：CASE 计算优先级，层内随机排序，只取 count 行
+    answered = exists().where(Answer.question_id == Question.id)
+    tier = case(
+        (~answered, 0),
+        (Mistake.error_prone == True, 1),
+        (Mistake.id.isnot(None), 2),
+        else_=3,
+    ).label("tier")
+    
+    query = (
+        db.query(Question, tier)
+        .join(Material, Question.material_id == Material.id)
+        .outerjoin(Mistake, Mistake.question_id == Question.id)
+        .filter(Material.direction_id == direction_id)
+    )
     if material_ids:
-        q_query = q_query.filter(Material.id.in_(material_ids))
-    all_q_ids = q_query.all()
-    all_q_ids = {row[0] for row in all_q_ids}
+        query = query.filter(Material.id.in_(material_ids))
     
-    if not all_q_ids:
+    rows = query.order_by(tier, _random_order(db)).limit(count).all()
+    if not rows:
         return []
     
-    # 已答过的题目ID（出现在 answers 表中的）
-    answered_q_ids = (
-        db.query(Answer.question_id)
-        .distinct()
-        .filter(Answer.question_id.in_(all_q_ids))
-        .all()
-    )
-    answered_q_ids = {row[0] for row in answered_q_ids}
-    
-    # 新题：从未答过
-    new_q_ids = all_q_ids - answered_q_ids
-    
-    # 错题本中的题目（不限制 mastered 状态）
-    mistake_rows = (
-        db.query(Mistake.question_id, Mistake.error_prone)
-        .filter(Mistake.question_id.in_(all_q_ids))
-        .all()
-    )
-    error_prone_ids = {row[0] for row in mistake_rows if row[1]}  # 易错题
-    mistake_ids = {row[0] for row in mistake_rows if not row[1]}  # 普通错题
-    
-    # 其他：已答过但不在错题本中的题目
-    all_mistake_ids = error_prone_ids | mistake_ids
-    other_ids = answered_q_ids - all_mistake_ids
-    
+    tier_counts = Counter(row.tier for row in rows)
     logger.info(
-        f"[选题] 方向{direction_id}: 总题{len(all_q_ids)} | "
-        f"新题{len(new_q_ids)} | 易错题{len(error_prone_ids)} | "
-        f"错题{len(mistake_ids)} | 其他{len(other_ids)} | 需要{count}题"
+        f"[选题] 方向{direction_id}: 需要{count}题 | 选中 " + " | ".join(
+            f"{label}{tier_counts.get(idx, 0)}" for idx, label in enumerate(PRIORITY_LABELS)
+        )
     )
     
-    # 按优先级依次填充
-    selected = []
-    remaining = count
-    
-    for label, pool in [("新题", new_q_ids), ("易错题", error_prone_ids), ("错题", mistake_ids), ("其他", other_ids)]:
-        if remaining <= 0:
-            break
-        pool_list = list(pool)
-        random.shuffle(pool_list)
-        take = pool_list[:remaining]
-        if take:
-            logger.info(f"[选题] 从[{label}]池选取{len(take)}题: {take}")
-        selected.extend(take)
-        remaining -= len(take)
-    
-    if not selected:
-        return []
-    
-    # 查询完整的 Question 对象，打乱顺序
-    questions = db.query(Question).filter(Question.id.in_(selected)).all()
+    # 打乱最终顺序，避免按优先级分层呈现
+    questions = [row[0] for row in rows]
     random.shuffle(questions)
     return questions
 
 
 @router.get("", response_model=list[ExamResponse])
 def get_exams(
+    response: Response,
     direction_id: int = None,
     status: str = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+    with_total: bool = False,
     db: Session = Depends(get_db)
 ):
-    """获取测验列表"""
+    """获取测验列表（游标分页，下一页游标见响应头 X-Next-Cursor）"""
     query = db.query(Exam)
     
     if direction_id:
@@ -176,7 +208,8 @@ def get_exams(
     if status:
         query = query.filter(Exam.status == status)
     
-    return query.order_by(Exam.created_at.desc()).all()
+    rows = paginate(query, Exam, response, cursor, limit, with_total)
+    return list_response(rows, ExamResponse, response)
 
 
 @router.post("", response_model=ExamWithQuestions)
@@ -263,83 +296,100 @@ def get_exam(exam_id: int, db: Session = Depends(get_db)):
 async def submit_exam(
     exam_id: int,
     data: ExamSubmit,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """提交测验并评分"""
-    exam = db.query(Exam).filter(Exam.id == exam_id).first()
+    exam = await db.get(Exam, exam_id)
     if not exam:
         raise HTTPException(status_code=404, detail="测验不存在")
     
     if exam.status == ExamStatus.COMPLETED:
         raise HTTPException(status_code=400, detail="测验已完成")
     
-    total_score = 0
-    correct_count = 0
-    answer_responses = []
-    
+    # 第一遍：一次 IN 查询加载全部题目，先为主观题发起 AI 评分（受信号量限制并发）
+    question_ids = {answer_data.question_id for answer_data in data.answers}
+    questions = {
+        q.id: q
+        for q in await db.scalars(select(Question).where(Question.id.in_(question_ids)))
+    }
+    semaphore = asyncio.Semaphore(max(1, settings.grading_concurrency))
+    graded = []  # (answer_data, question, 客观题结果 或 主观题评分任务)
     for answer_data in data.answers:
-        question = db.query(Question).filter(Question.id == answer_data.question_id).first()
+        question = questions.get(answer_data.question_id)
         if not question:
             continue
-        
-        is_correct = False
-        score = 0.0
+        task = None
+        if question.type not in OBJECTIVE_TYPES:
+            task = asyncio.create_task(
+                _evaluate_subjective(semaphore, question, answer_data.user_answer)
+            )
+        graded.append((answer_data, question, task))
+    
+    # 让出一次事件循环，评分任务先把请求发出去；等待响应期间本地完成客观题评分
+    await asyncio.sleep(0)
+    objective_results = {
+        idx: _score_objective(question, answer_data.user_answer)
+        for idx, (answer_data, question, task) in enumerate(graded)
+        if task is None
+    }
+    
+    tasks = [task for _, _, task in graded if task is not None]
+    try:
+        await asyncio.gather(*tasks)
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    # 第二遍：按原始答题顺序构建答题记录，一条 INSERT 批量写入
+    total_score = 0
+    correct_count = 0
+    answer_rows = []
+    answered_at = datetime.now()
+    
+    for idx, (answer_data, question, task) in enumerate(graded):
         ai_feedback = None
-        
-        # 根据题型评分
-        if question.type in [QuestionType.SINGLE_CHOICE, QuestionType.MULTI_CHOICE, QuestionType.TRUE_FALSE]:
-            # 客观题评分
-            user_ans = answer_data.user_answer.strip()
-            correct_ans = question.answer.strip()
-
-            if question.type == QuestionType.MULTI_CHOICE:
-                # 多选题：将双方都解析为选项文本集合后比较
-                user_parts = [s.strip() for s in user_ans.split(",") if s.strip()]
-                correct_parts = [s.strip() for s in correct_ans.split(",") if s.strip()]
-                if question.options:
-                    user_parts = [_resolve_option_text(p, question.options) for p in user_parts]
-                    correct_parts = [_resolve_option_text(p, question.options) for p in correct_parts]
-                is_correct = set(user_parts) == set(correct_parts)
-            else:
-                # 单选题 / 判断题：解析后比较
-                resolved_user = _resolve_option_text(user_ans, question.options) if question.options else user_ans
-                resolved_correct = _resolve_option_text(correct_ans, question.options) if question.options else correct_ans
-                is_correct = resolved_user == resolved_correct
-
-            score = 100.0 if is_correct else 0.0
+        if task is None:
+            is_correct, score = objective_results[idx]
         else:
-            # 主观题：AI评分
-            eval_result = await qwen_service.evaluate_answer(
-                question.content,
-                question.answer,
-                answer_data.user_answer,
-                question.type.value
-            )
+            eval_result = task.result()
             score = eval_result.get("score", 0)
             ai_feedback = eval_result.get("feedback", "")
             is_correct = score >= 60
         
-        # 保存答题记录
-        answer = Answer(
-            exam_id=exam_id,
-            question_id=question.id,
-            user_answer=answer_data.user_answer,
-            is_correct=is_correct,
-            score=score,
-            ai_feedback=ai_feedback,
-        )
-        db.add(answer)
-        db.flush()
-        
-        # 如果答错，添加或更新错题本
-        if not is_correct:
-            _add_or_update_mistake(db, question.id, answer.id)
+        answer_rows.append({
+            "exam_id": exam_id,
+            "question_id": question.id,
+            "user_answer": answer_data.user_answer,
+            "is_correct": is_correct,
+            "score": score,
+            "ai_feedback": ai_feedback,
+            "answered_at": answered_at,
+        })
         
         total_score += score
         if is_correct:
             correct_count += 1
-        
-        answer_responses.append(answer)
+    
+    # 语句数不随答题数增长：executemany 一次写入，再按测验ID一次取回（含自增ID，供错题本关联）
+    answer_responses = []
+    if answer_rows:
+        await db.execute(insert(Answer), answer_rows)
+        answer_responses = (await db.scalars(
+            select(Answer).where(Answer.exam_id == exam_id).order_by(Answer.id)
+        )).all()
+    
+    # 答错的题目批量写入错题本；已掌握的错题再次答错会被取消掌握，需回退统计
+    wrong_answers = [answer for answer in answer_responses if not answer.is_correct]
+    if wrong_answers:
+        relapsed = (await db.execute(
+            select(func.count()).select_from(Mistake).where(
+                Mistake.question_id.in_({answer.question_id for answer in wrong_answers}),
+                Mistake.mastered == True,
+            )
+        )).scalar()
+        await db.run_sync(_upsert_mistakes, wrong_answers)
+        await db.run_sync(gs.record_mistakes_relapsed, relapsed)
     
     # 计算最终得分
     question_count = len(data.answers)
@@ -351,28 +401,21 @@ async def submit_exam(
     exam.grade = calculate_grade(final_score) if exam.score_type == ScoreType.GRADE else None
     exam.completed_at = datetime.now()
     
-    db.commit()
-    
-    # 游戏化处理
-    gamification = None
-    try:
-        gamification = gs.on_exam_complete(db, exam, correct_count, question_count)
-    except Exception:
-        pass  # 游戏化失败不影响测验结果
+    await db.commit()
     
+    # 先组装结果：游戏化失败回滚时会话中的对象会过期
     result = ExamResult(
         exam_id=exam_id,
         total_questions=question_count,
         correct_count=correct_count,
         score=final_score,
         grade=exam.grade,
-        answers=answer_responses
+        answers=answer_responses,
     )
-    # 附加游戏化数据到响应
-    result_dict = result.model_dump()
-    if gamification:
-        result_dict["gamification"] = gamification
-    return result_dict
+    
+    # 游戏化处理（游戏化服务基于同步会话，通过 run_sync 在异步连接上执行；失败不影响测验结果）
+    result.gamification = await db.run_sync(gs.run_event, gs.on_exam_complete, exam, correct_count, question_count)
+    return result
 
 
 @router.get("/{exam_id}/result", response_model=ExamResult)
@@ -408,5 +451,6 @@ def delete_exam(exam_id: int, db: Session = Depends(get_db)):
     # 先删除关联的答题记录
     db.query(Answer).filter(Answer.exam_id == exam_id).delete()
     db.delete(exam)
+    gs.record_data_deleted(db)
     db.commit()
     return {"message": "删除成功"}
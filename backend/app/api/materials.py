@@ -1,20 +1,29 @@
 """学习资料 API"""
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.models import Material, MaterialStatus, Direction, Question, QuestionType
-from app.schemas import MaterialCreate, MaterialResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session, load_only, with_expression
+from app.core.config import get_settings
+from app.core.database import get_db, get_async_db, AsyncSessionLocal
+from app.core.pagination import paginate
+from app.core.responses import list_response
+from app.core.sparse_fields import parse_fields, load_only_fields, sparse_response
+from app.models import Material, MaterialStatus, MaterialJob, Direction, Question, TaskStatus
+from app.schemas import MaterialCreate, MaterialResponse, MaterialSummary
 from app.services import qwen_service
 from app.services import gamification_service as gs
 from app.services.extractor_service import extractor_service
-import json
+from app.services.material_job_service import material_job_queue
 import logging
+import orjson
 
 router = APIRouter(prefix="/materials", tags=["学习资料"])
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 class UpdateMaterialDirectionRequest(BaseModel):
@@ -29,21 +38,21 @@ class MaterialFromUrlRequest(BaseModel):
     direction_id: int
 
 
-async def _process_material_content(
+async def _enqueue_material_content(
     title: str,
     content: str,
     direction_id: int,
-    db: Session
+    db: AsyncSession
 ) -> Material:
-    """处理资料内容：提炼知识点并生成题目（复用逻辑）"""
-    direction = db.query(Direction).filter(Direction.id == direction_id).first()
+    """创建待处理资料并加入后台队列（复用逻辑）"""
+    direction = await db.get(Direction, direction_id)
     if not direction:
         raise HTTPException(status_code=404, detail="学习方向不存在")
     
     if not qwen_service.api_key:
         raise HTTPException(status_code=500, detail="API密钥未配置，请联系管理员设置QWEN_API_KEY")
     
-    # 创建资料记录
+    # 创建资料记录，提炼知识点和生成题目交由后台工作池处理
     material = Material(
         direction_id=direction_id,
         title=title,
@@ -51,78 +60,76 @@ async def _process_material_content(
         status=MaterialStatus.PENDING
     )
     db.add(material)
-    db.commit()
-    db.refresh(material)
-    
-    direction_name = direction.name
-    
-    try:
-        # 1. 提炼知识点
-        key_points = await qwen_service.extract_key_points(content, direction_name)
-        material.key_points = key_points
-        
-        # 2. 生成题目
-        questions_data = await qwen_service.generate_questions(key_points, direction_name)
-        
-        # 3. 保存题目
-        for q_data in questions_data:
-            answer = q_data.get("answer", "")
-            if isinstance(answer, list):
-                answer = ",".join(answer)
-            
-            question = Question(
-                material_id=material.id,
-                type=QuestionType(q_data.get("type", "single_choice")),
-                difficulty=q_data.get("difficulty", 3),
-                content=q_data.get("content", ""),
-                options=q_data.get("options"),
-                answer=str(answer),
-                explanation=q_data.get("explanation", ""),
-            )
-            db.add(question)
-        
-        material.status = MaterialStatus.PROCESSED
-        db.commit()
-        db.refresh(material)
-        
-        # 游戏化：资料上传成功
-        try:
-            gs.on_material_uploaded(db, material)
-        except Exception:
-            pass
-            
-    except Exception as e:
-        logger.error(f"处理资料失败 [ID:{material.id}]: {str(e)}", exc_info=True)
-        material.status = MaterialStatus.FAILED
-        db.commit()
-        db.refresh(material)
-        raise HTTPException(status_code=500, detail=f"处理资料失败: {str(e)}")
+    await db.flush()
     
+    # 资料与任务在同一事务中提交
+    await material_job_queue.enqueue(db, material)
     return material
 
 
-@router.get("", response_model=list[MaterialResponse])
+# 列表只加载摘要所需的列，完整内容和知识点见 GET /materials/{id}
+MATERIAL_SUMMARY_COLUMNS = ("id", "direction_id", "title", "status", "created_at")
+
+
+def key_point_count(db: Session):
+    """知识点数量的 SQL 表达式（按数据库方言），列表不必加载 key_points JSON"""
+    if db.get_bind().dialect.name == "mysql":
+        # MySQL 的 JSON_LENGTH 对标量（含 JSON null）返回 1，只统计数组
+        return case((func.json_type(Material.key_points) == "ARRAY", func.json_length(Material.key_points)), else_=0)
+    # SQLite 的 json_array_length 对非数组返回 0，对 SQL NULL 返回 NULL
+    return func.coalesce(func.json_array_length(Material.key_points), 0)
+
+
+@router.get("", response_model=list[MaterialSummary])
 def get_materials(
+    response: Response,
     direction_id: int = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+    with_total: bool = False,
+    fields: Optional[str] = Query(None, description="只返回指定字段，逗号分隔，如 id,title"),
     db: Session = Depends(get_db)
 ):
-    """获取资料列表"""
+    """获取资料列表（游标分页，下一页游标见响应头 X-Next-Cursor）"""
+    selected = parse_fields(fields, MaterialSummary)
     query = db.query(Material)
     if direction_id:
         query = query.filter(Material.direction_id == direction_id)
-    return query.order_by(Material.created_at.desc()).all()
+    
+    if selected is None or "content_preview" in selected:
+        preview = func.substr(Material.content, 1, settings.material_preview_chars)
+        query = query.options(with_expression(Material.content_preview, preview))
+    if selected is None or "key_point_count" in selected:
+        query = query.options(with_expression(Material.key_point_count, key_point_count(db)))
+    if selected is None:
+        query = query.options(load_only(*(getattr(Material, col) for col in MATERIAL_SUMMARY_COLUMNS)))
+        rows = paginate(query, Material, response, cursor, limit, with_total)
+        return list_response(rows, MaterialSummary, response)
+    
+    query = query.options(load_only_fields(Material, selected))
+    rows = paginate(query, Material, response, cursor, limit, with_total)
+    return sparse_response(rows, MaterialSummary, selected, response)
 
 
-@router.post("/upload-file", response_model=MaterialResponse)
+@router.get("/{material_id}", response_model=MaterialResponse)
+def get_material(material_id: int, db: Session = Depends(get_db)):
+    """获取资料详情（含完整内容）"""
+    material = db.query(Material).filter(Material.id == material_id).first()
+    if not material:
+        raise HTTPException(status_code=404, detail="资料不存在")
+    return material
+
+
+@router.post("/upload-file", response_model=MaterialResponse, status_code=202)
 async def upload_file_material(
     title: str = Form(...),
     direction_id: int = Form(...),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """上传文件创建资料（支持 PDF, DOCX, MD, TXT）
     
-    直接复用 extractor_service 提取文本，然后处理生成题目
+    直接复用 extractor_service 提取文本，题目生成在后台队列中完成
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="未上传文件")
@@ -131,8 +138,8 @@ async def upload_file_material(
         # 使用 extractor_service 提取文件内容
         content = await extractor_service.extract_from_file(file)
         
-        # 复用处理逻辑
-        material = await _process_material_content(title, content, direction_id, db)
+        # 复用入队逻辑
+        material = await _enqueue_material_content(title, content, direction_id, db)
         return material
         
     except ValueError as e:
@@ -144,14 +151,14 @@ async def upload_file_material(
         raise HTTPException(status_code=500, detail=f"文件处理失败: {str(e)}")
 
 
-@router.post("/from-url", response_model=MaterialResponse)
+@router.post("/from-url", response_model=MaterialResponse, status_code=202)
 async def create_material_from_url(
     data: MaterialFromUrlRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """从URL创建资料
     
-    直接复用 extractor_service 抓取网页内容，然后处理生成题目
+    直接复用 extractor_service 抓取网页内容，题目生成在后台队列中完成
     """
     if not data.url.strip():
         raise HTTPException(status_code=400, detail="URL不能为空")
@@ -160,8 +167,8 @@ async def create_material_from_url(
         # 使用 extractor_service 提取URL内容
         content = await extractor_service.extract_from_url(data.url)
         
-        # 复用处理逻辑
-        material = await _process_material_content(data.title, content, data.direction_id, db)
+        # 复用入队逻辑
+        material = await _enqueue_material_content(data.title, content, data.direction_id, db)
         return material
         
     except ValueError as e:
@@ -173,169 +180,77 @@ async def create_material_from_url(
         raise HTTPException(status_code=500, detail=f"URL处理失败: {str(e)}")
 
 
-async def generate_material_stream(material_id: int, direction_name: str, content: str, db: Session):
-    """生成器：流式返回处理进度"""
-    try:
-        # 1. 提炼知识点
-        yield f"data: {json.dumps({'step': 'extracting', 'progress': 10, 'message': '正在提炼知识点...'}, ensure_ascii=False)}\n\n"
-        
-        material = db.query(Material).filter(Material.id == material_id).first()
-        key_points = await qwen_service.extract_key_points(content, direction_name)
-        material.key_points = key_points
-        db.commit()
-        
-        yield f"data: {json.dumps({'step': 'extracted', 'progress': 40, 'message': f'知识点提炼完成，共{len(key_points)}个', 'data': key_points}, ensure_ascii=False)}\n\n"
-        
-        # 2. 生成题目
-        yield f"data: {json.dumps({'step': 'generating', 'progress': 50, 'message': '正在生成题目...'}, ensure_ascii=False)}\n\n"
-        
-        questions_data = await qwen_service.generate_questions(key_points, direction_name)
-        
-        yield f"data: {json.dumps({'step': 'generated', 'progress': 70, 'message': f'题目生成完成，共{len(questions_data)}道', 'data': len(questions_data)}, ensure_ascii=False)}\n\n"
-        
-        # 3. 保存题目
-        yield f"data: {json.dumps({'step': 'saving', 'progress': 80, 'message': '正在保存题目...'}, ensure_ascii=False)}\n\n"
-        
-        for i, q_data in enumerate(questions_data):
-            answer = q_data.get("answer", "")
-            if isinstance(answer, list):
-                answer = ",".join(answer)
-            
-            question = Question(
-                material_id=material_id,
-                type=QuestionType(q_data.get("type", "single_choice")),
-                difficulty=q_data.get("difficulty", 3),
-                content=q_data.get("content", ""),
-                options=q_data.get("options"),
-                answer=str(answer),
-                explanation=q_data.get("explanation", ""),
-            )
-            db.add(question)
-            
-            progress = 80 + int((i + 1) / len(questions_data) * 15)
-            yield f"data: {json.dumps({'step': 'saving', 'progress': progress, 'message': f'保存题目 {i+1}/{len(questions_data)}'}, ensure_ascii=False)}\n\n"
-        
-        material.status = MaterialStatus.PROCESSED
-        db.commit()
+def _sse_event(payload: dict) -> str:
+    """格式化 SSE 消息"""
+    return f"data: {orjson.dumps(payload).decode('utf-8')}\n\n"
+
+
+def _job_event(material_id: int, job: MaterialJob) -> dict:
+    """将任务状态转换为进度事件"""
+    if job.status == TaskStatus.COMPLETED:
+        return {'step': 'completed', 'progress': 100, 'message': '处理完成！', 'material_id': material_id}
+    if job.status == TaskStatus.FAILED:
+        return {'step': 'error', 'progress': 0, 'message': job.message or f'处理失败: {job.error_message}'}
+    return {'step': job.step, 'progress': job.progress, 'message': job.message}
+
+
+async def job_progress_stream(material_id: int):
+    """生成器：轮询后台任务状态，流式返回处理进度"""
+    last_event = None
+    while True:
+        async with AsyncSessionLocal() as db:
+            job = await material_job_queue.get_latest_job(db, material_id)
+            event = _job_event(material_id, job) if job else {
+                'step': 'error', 'progress': 0, 'message': '处理任务不存在'
+            }
         
-        yield f"data: {json.dumps({'step': 'completed', 'progress': 100, 'message': '处理完成！', 'material_id': material_id}, ensure_ascii=False)}\n\n"
+        if event != last_event:
+            yield _sse_event(event)
+            last_event = event
         
-    except Exception as e:
-        material = db.query(Material).filter(Material.id == material_id).first()
-        if material:
-            material.status = MaterialStatus.FAILED
-            db.commit()
-        yield f"data: {json.dumps({'step': 'error', 'progress': 0, 'message': f'处理失败: {str(e)}'}, ensure_ascii=False)}\n\n"
+        if event['step'] in ('completed', 'error'):
+            break
+        await asyncio.sleep(settings.progress_poll_interval)
 
 
-@router.post("", response_model=MaterialResponse)
+@router.post("", response_model=MaterialResponse, status_code=202)
 async def create_material(
     data: MaterialCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """上传资料，立即处理（同步执行）"""
-    try:
-        # 检查方向是否存在
-        direction = db.query(Direction).filter(Direction.id == data.direction_id).first()
-        if not direction:
-            raise HTTPException(status_code=404, detail="学习方向不存在")
-        
-        # 检查API密钥是否配置
-        if not qwen_service.api_key:
-            raise HTTPException(status_code=500, detail="API密钥未配置，请联系管理员设置QWEN_API_KEY")
-        
-        material = Material(**data.model_dump())
-        db.add(material)
-        db.commit()
-        db.refresh(material)
-        
-        # 立即同步处理：提炼知识点并生成题目
-        direction_name = direction.name if direction else "通用"
-        
-        # 1. 提炼知识点
-        key_points = await qwen_service.extract_key_points(
-            material.content, 
-            direction_name
-        )
-        material.key_points = key_points
-        
-        # 2. 生成题目
-        questions_data = await qwen_service.generate_questions(
-            key_points,
-            direction_name
-        )
-        
-        # 3. 保存题目
-        for q_data in questions_data:
-            # 处理answer字段：如果是列表，转换为字符串
-            answer = q_data.get("answer", "")
-            if isinstance(answer, list):
-                answer = ",".join(answer)
-            
-            question = Question(
-                material_id=material.id,
-                type=QuestionType(q_data.get("type", "single_choice")),
-                difficulty=q_data.get("difficulty", 3),
-                content=q_data.get("content", ""),
-                options=q_data.get("options"),
-                answer=str(answer),
-                explanation=q_data.get("explanation", ""),
-            )
-            db.add(question)
-        
-        material.status = MaterialStatus.PROCESSED
-        db.commit()
-        db.refresh(material)
-        
-        # 游戏化：资料上传成功
-        try:
-            gs.on_material_uploaded(db, material)
-        except Exception:
-            pass
-        
-    except HTTPException:
-        # 重新抛出HTTP异常，不需要额外处理
-        raise
-    except Exception as e:
-        # 捕获所有其他异常并记录
-        logger = logging.getLogger(__name__)
-        logger.error(f"处理资料失败 [ID:{material.id if 'material' in locals() else 'unknown'}]: {str(e)}", exc_info=True)
-        print(f"处理资料失败: {e}")
-        import traceback
-        traceback.print_exc()
-        
-        # 更新数据库状态
-        if 'material' in locals():
-            material.status = MaterialStatus.FAILED
-            db.commit()
-            db.refresh(material)
-        else:
-            # 如果材料创建失败，可能没有material变量
-            raise HTTPException(status_code=500, detail=f"创建资料失败: {str(e)}")
-    
-    return material
+    """上传资料，加入后台队列处理（返回 202，通过 /progress 查询进度）"""
+    return await _enqueue_material_content(data.title, data.content, data.direction_id, db)
 
 
 @router.get("/{material_id}/progress")
 async def get_material_progress(
     material_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取资料处理进度（SSE流）"""
-    material = db.query(Material).filter(Material.id == material_id).first()
+    material = await db.get(Material, material_id)
     if not material:
         raise HTTPException(status_code=404, detail="资料不存在")
     
-    # 如果已经处理完成，直接返回
-    if material.status != MaterialStatus.PENDING:
+    # 已经处理结束，直接返回最终状态
+    if material.status == MaterialStatus.PROCESSED:
         return StreamingResponse(
-            iter([f"data: {json.dumps({'step': 'completed', 'progress': 100, 'message': '处理完成！', 'material_id': material_id}, ensure_ascii=False)}\n\n"]),
+            iter([_sse_event({'step': 'completed', 'progress': 100, 'message': '处理完成！', 'material_id': material_id})]),
             media_type="text/event-stream"
         )
+    if material.status == MaterialStatus.FAILED:
+        return StreamingResponse(
+            iter([_sse_event({'step': 'error', 'progress': 0, 'message': '处理失败'})]),
+            media_type="text/event-stream"
+        )
+    
+    # 兼容旧数据：待处理但尚未入队的资料补充入队
+    if await material_job_queue.get_latest_job(db, material_id) is None:
+        await material_job_queue.enqueue(db, material)
     
-    # 否则返回流
+    # 推送后台任务的实时状态
     return StreamingResponse(
-        generate_material_stream(material_id, material.direction.name, material.content, db),
+        job_progress_stream(material_id),
         media_type="text/event-stream"
     )
 
@@ -354,6 +269,7 @@ def delete_material(
     db.query(Question).filter(Question.material_id == material_id).delete()
     # 删除资料本身
     db.delete(material)
+    gs.record_data_deleted(db)
     db.commit()
     return {"message": "删除成功"}
 
@@ -1,21 +1,30 @@
 """错题管理 API"""
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session, joinedload
+from app.core.config import get_settings
 from app.core.database import get_db
+from app.core.pagination import paginate
+from app.core.responses import list_response
 from app.models import Mistake, Question, Material
 from app.schemas import MistakeResponse, MistakeUpdate
 from app.services import gamification_service as gs
 
 router = APIRouter(prefix="/mistakes", tags=["错题管理"])
+settings = get_settings()
 
 
 @router.get("", response_model=list[MistakeResponse])
 def get_mistakes(
+    response: Response,
     direction_id: int = None,
     mastered: bool = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+    with_total: bool = False,
     db: Session = Depends(get_db)
 ):
-    """获取错题列表"""
+    """获取错题列表（游标分页，下一页游标见响应头 X-Next-Cursor）"""
     query = db.query(Mistake).options(joinedload(Mistake.question))
     
     if direction_id:
@@ -28,7 +37,8 @@ def get_mistakes(
     if mastered is not None:
         query = query.filter(Mistake.mastered == mastered)
     
-    return query.order_by(Mistake.created_at.desc()).all()
+    rows = paginate(query, Mistake, response, cursor, limit, with_total)
+    return list_response(rows, MistakeResponse, response)
 
 
 @router.get("/{mistake_id}", response_model=MistakeResponse)
@@ -73,19 +83,18 @@ def update_mistake(
     
     # 游戏化：标记为掌握时触发
     if data.mastered and not was_mastered:
-        try:
-            # 重新加载关联以确保 question.material 可用
-            mistake_with_rel = (
-                db.query(Mistake)
-                .options(
-                    joinedload(Mistake.question).joinedload(Question.material)
-                )
-                .filter(Mistake.id == mistake_id)
-                .first()
+        # 重新加载关联以确保 question.material 可用
+        mistake_with_rel = (
+            db.query(Mistake)
+            .options(
+                joinedload(Mistake.question).joinedload(Question.material)
             )
-            gs.on_mistake_mastered(db, mistake_with_rel)
-        except Exception:
-            pass
+            .filter(Mistake.id == mistake_id)
+            .first()
+        )
+        gs.run_event(db, gs.on_mistake_mastered, mistake_with_rel)
+    elif data.mastered is False and was_mastered:
+        gs.record_mistake_mastery(db, False)
     
     # 重新加载关联
     mistake = (
@@ -105,5 +114,6 @@ def delete_mistake(mistake_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="错题不存在")
     
     db.delete(mistake)
+    gs.record_data_deleted(db)
     db.commit()
     return {"message": "删除成功"}
@@ -2,19 +2,30 @@
 import logging
 from typing import Optional
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, Response
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.models import Material, MaterialStatus, Direction, Question, QuestionType, ParseTask, TaskStatus
-from app.schemas.schemas import ParseTextRequest, ParseUrlRequest, ParseTaskResponse, TaskListResponse, MaterialResponse
+from app.core.config import get_settings
+from app.core.database import get_db, get_async_db
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.responses import list_response
+from app.core.sparse_fields import parse_fields, sparse_response
+from app.models import Material, MaterialStatus, Direction, ParseTask, TaskStatus
+from app.schemas.schemas import (
+    ParseTextRequest, ParseUrlRequest, ParseBatchRequest, ParseTaskResponse, ParseBatchResponse,
+    TaskListResponse, MaterialResponse,
+)
 from app.services.parse_service import parse_service
+from app.services.batch_parse_service import batch_parse_service
 from app.services import qwen_service
+from app.services.material_job_service import save_generated_questions
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/parse", tags=["知识解析"])
+settings = get_settings()
 
 
 class UpdateDirectionRequest(BaseModel):
@@ -23,7 +34,7 @@ class UpdateDirectionRequest(BaseModel):
 
 
 @router.post("/text", response_model=ParseTaskResponse)
-async def parse_text(data: ParseTextRequest, db: Session = Depends(get_db)):
+async def parse_text(data: ParseTextRequest, db: AsyncSession = Depends(get_async_db)):
     """解析纯文本内容"""
     if not data.text.strip():
         raise HTTPException(status_code=400, detail="文本内容不能为空")
@@ -36,7 +47,7 @@ async def parse_file(
     title: str = Form(...),
     direction_id: Optional[int] = Form(None),
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """解析上传文件（支持 .pdf, .docx, .md, .txt）"""
     if not file.filename:
@@ -46,7 +57,7 @@ async def parse_file(
 
 
 @router.post("/url", response_model=ParseTaskResponse)
-async def parse_url(data: ParseUrlRequest, db: Session = Depends(get_db)):
+async def parse_url(data: ParseUrlRequest, db: AsyncSession = Depends(get_async_db)):
     """解析 URL 网页内容"""
     if not data.url.strip():
         raise HTTPException(status_code=400, detail="URL 不能为空")
@@ -54,16 +65,45 @@ async def parse_url(data: ParseUrlRequest, db: Session = Depends(get_db)):
     return task
 
 
+@router.post("/batch", response_model=ParseBatchResponse)
+async def parse_batch(data: ParseBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """批量解析网页：提交 URL 列表或 sitemap/RSS 订阅源，后台并发抓取，每个网页生成一个解析任务"""
+    if not any(url.strip() for url in data.urls) and not (data.feed_url or "").strip():
+        raise HTTPException(status_code=400, detail="请提供 URL 列表或订阅源地址")
+    try:
+        return await batch_parse_service.create_batch(db, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/batch/{batch_id}", response_model=ParseBatchResponse)
+async def get_parse_batch(batch_id: int, db: AsyncSession = Depends(get_async_db)):
+    """获取批量解析进度及各网页对应的解析任务"""
+    batch = await batch_parse_service.get_batch(db, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="批量任务不存在")
+    return batch
+
+
 @router.get("/tasks", response_model=list[TaskListResponse])
 def get_tasks(
-    skip: int = 0,
-    limit: int = 20,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=settings.page_size_max),
     direction_id: Optional[int] = None,
+    fields: Optional[str] = Query(None, description="只返回指定字段，逗号分隔，如 id,title,status"),
     db: Session = Depends(get_db),
 ):
-    """获取解析任务列表"""
-    tasks = parse_service.get_tasks(db, skip=skip, limit=limit, direction_id=direction_id)
-    return tasks
+    """获取解析任务列表（游标分页，下一页游标见响应头 X-Next-Cursor）"""
+    selected = parse_fields(fields, TaskListResponse)
+    tasks, next_cursor = parse_service.get_tasks(
+        db, cursor=cursor, limit=limit, direction_id=direction_id, fields=selected
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if selected is not None:
+        return sparse_response(tasks, TaskListResponse, selected, response)
+    return list_response(tasks, TaskListResponse, response)
 
 
 @router.get("/tasks/{task_id}", response_model=ParseTaskResponse)
@@ -104,9 +144,9 @@ def update_task_direction(task_id: int, data: UpdateDirectionRequest, db: Sessio
 
 
 @router.post("/tasks/{task_id}/generate-questions", response_model=MaterialResponse)
-async def generate_questions_from_task(task_id: int, db: Session = Depends(get_db)):
+async def generate_questions_from_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
     """将解析任务转换为资料并生成题目"""
-    task = db.query(ParseTask).filter(ParseTask.id == task_id).first()
+    task = await db.get(ParseTask, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
     
@@ -124,7 +164,7 @@ async def generate_questions_from_task(task_id: int, db: Session = Depends(get_d
         raise HTTPException(status_code=500, detail="API密钥未配置，请联系管理员设置QWEN_API_KEY")
     
     # 获取方向名称
-    direction = db.query(Direction).filter(Direction.id == task.direction_id).first()
+    direction = await db.get(Direction, task.direction_id)
     direction_name = direction.name if direction else "通用"
     
     # 创建资料
@@ -135,8 +175,7 @@ async def generate_questions_from_task(task_id: int, db: Session = Depends(get_d
         status=MaterialStatus.PENDING
     )
     db.add(material)
-    db.commit()
-    db.refresh(material)
+    await db.commit()
     
     try:
         # 1. 提炼知识点
@@ -147,30 +186,16 @@ async def generate_questions_from_task(task_id: int, db: Session = Depends(get_d
         questions_data = await qwen_service.generate_questions(key_points, direction_name)
         
         # 3. 保存题目
-        for q_data in questions_data:
-            answer = q_data.get("answer", "")
-            if isinstance(answer, list):
-                answer = ",".join(answer)
-            
-            question = Question(
-                material_id=material.id,
-                type=QuestionType(q_data.get("type", "single_choice")),
-                difficulty=q_data.get("difficulty", 3),
-                content=q_data.get("content", ""),
-                options=q_data.get("options"),
-                answer=str(answer),
-                explanation=q_data.get("explanation", ""),
-            )
-            db.add(question)
+        await db.run_sync(save_generated_questions, material.id, questions_data)
         
         material.status = MaterialStatus.PROCESSED
-        db.commit()
-        db.refresh(material)
+        await db.commit()
         
     except Exception as e:
         logger.error(f"生成题目失败: {str(e)}", exc_info=True)
+        await db.rollback()
         material.status = MaterialStatus.FAILED
-        db.commit()
+        await db.commit()
         raise HTTPException(status_code=500, detail=f"生成题目失败: {str(e)}")
     
     return material
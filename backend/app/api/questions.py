@@ -1,21 +1,34 @@
 """题目 API"""
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from app.core.config import get_settings
 from app.core.database import get_db
+from app.core.pagination import paginate
+from app.core.responses import list_response
+from app.core.sparse_fields import parse_fields, load_only_fields, sparse_response
 from app.models import Question, Material
 from app.schemas import QuestionResponse, QuestionRateRequest, QuestionUpdate
+from app.services import gamification_service as gs
 
 router = APIRouter(prefix="/questions", tags=["题目"])
+settings = get_settings()
 
 
 @router.get("", response_model=list[QuestionResponse])
 def get_questions(
+    response: Response,
     material_id: int = None,
     direction_id: int = None,
     question_type: str = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.page_size_default, ge=1, le=settings.page_size_max),
+    with_total: bool = False,
+    fields: Optional[str] = Query(None, description="只返回指定字段，逗号分隔，如 id,content,type"),
     db: Session = Depends(get_db)
 ):
-    """获取题目列表"""
+    """获取题目列表（游标分页，下一页游标见响应头 X-Next-Cursor）"""
+    selected = parse_fields(fields, QuestionResponse)
     query = db.query(Question)
     
     if material_id:
@@ -27,7 +40,12 @@ def get_questions(
     if question_type:
         query = query.filter(Question.type == question_type)
     
-    return query.order_by(Question.created_at.desc()).all()
+    if selected is None:
+        rows = paginate(query, Question, response, cursor, limit, with_total)
+        return list_response(rows, QuestionResponse, response)
+    query = query.options(load_only_fields(Question, selected))
+    rows = paginate(query, Question, response, cursor, limit, with_total)
+    return sparse_response(rows, QuestionResponse, selected, response)
 
 
 @router.get("/{question_id}", response_model=QuestionResponse)
@@ -85,5 +103,6 @@ def delete_question(question_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="题目不存在")
     
     db.delete(question)
+    gs.record_data_deleted(db)
     db.commit()
     return {"message": "删除成功"}
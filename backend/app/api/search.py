@@ -0,0 +1,32 @@
+"""全文检索 API"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app.core.config import get_settings
+from app.core.database import get_db
+from app.schemas.schemas import SearchHit
+from app.services.search_service import search_service, SEARCH_SOURCES
+
+router = APIRouter(prefix="/search", tags=["检索"])
+settings = get_settings()
+
+
+@router.get("", response_model=list[SearchHit])
+def search(
+    q: str = Query(..., min_length=1, max_length=200, description="检索词，空格分隔多个词（同时包含）"),
+    types: Optional[str] = Query(None, description="限定来源，逗号分隔：question,material,knowledge_point,best_practice"),
+    limit: int = Query(settings.search_default_limit, ge=1, le=settings.search_max_limit),
+    db: Session = Depends(get_db)
+):
+    """检索题目、资料、知识点与最佳实践"""
+    kinds = None
+    if types:
+        kinds = [kind.strip() for kind in types.split(",") if kind.strip()]
+        unknown = [kind for kind in kinds if kind not in SEARCH_SOURCES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"不支持的检索来源: {', '.join(unknown)}")
+    
+    try:
+        return search_service.search(db, q, kinds, limit)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
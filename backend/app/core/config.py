@@ -12,15 +12,89 @@ class Settings(BaseSettings):
     
     # 数据库配置
     database_url: str = "sqlite:///./personal_study.db"
+    async_database_url: str = ""  # 异步驱动连接串，留空时由 database_url 推导（aiosqlite / asyncmy）
+    db_echo: bool = False  # 打印全部 SQL（仅排查问题时开启，与 debug 无关）
+    
+    # 慢查询监控
+    slow_query_log_enabled: bool = True
+    slow_query_threshold_ms: float = 200.0  # 超过该耗时的语句记录为慢查询（毫秒）
+    slow_query_top_n: int = 20  # /debug/slow-queries 保留的最慢语句数
+    
+    # SQLite 连接参数（每个连接建立时通过 PRAGMA 设置，MySQL 忽略）
+    sqlite_journal_mode: str = "WAL"  # WAL 模式下读写互不阻塞
+    sqlite_synchronous: str = "NORMAL"  # WAL 下 NORMAL 可保证一致性，仅断电时可能丢失最后的事务
+    sqlite_mmap_size: int = 256 * 1024 * 1024  # 内存映射读取大小（字节），0 为关闭
+    sqlite_cache_size: int = -64000  # 页缓存大小，负数表示 KiB（约 64MB）
+    sqlite_temp_store: str = "MEMORY"  # 临时表和排序使用内存
+    sqlite_busy_timeout: int = 5000  # 遇到写锁时的等待时间（毫秒）
+    
+    # 列表分页配置（游标分页）
+    page_size_default: int = 50  # 默认每页条数
+    page_size_max: int = 200  # 每页最大条数
+    page_total_cache_size: int = 256  # 列表总数缓存条目数（按表版本号失效，随 http_cache_enabled 开启）
+    material_preview_chars: int = 500  # 资料列表返回的内容摘要长度（字符）
+    parse_source_preview_chars: int = 500  # 文本解析任务保存的来源摘要长度（字符）
+    
+    # HTTP 条件请求缓存（ETag / 304）及列表总数缓存：版本号为进程内计数，仅限单进程部署时开启
+    http_cache_enabled: bool = False
+    
+    # 全文检索配置（SQLite FTS5 / MySQL FULLTEXT ngram）
+    search_default_limit: int = 20  # 默认返回结果数
+    search_max_limit: int = 100  # 单次最多返回结果数
+    search_snippet_chars: int = 80  # 摘要片段长度（字符）
     
     # 通义千问 API 配置
     qwen_api_key: str = ""
     qwen_model: str = "qwen-plus"
     qwen_base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+    qwen_timeout: float = 60.0  # 出题/评分单次调用超时（秒）
+    knowledge_timeout: float = 120.0  # 知识解析单次调用超时（秒）
+    grading_concurrency: int = 5  # 交卷时主观题 AI 评分的最大并发数
+    
+    # 长文档分块提取配置
+    chunk_max_tokens: int = 6000  # 单个分块的 token 预算
+    chunk_concurrency: int = 4  # 分块并发提取数
+    max_merged_points: int = 20  # 归并后保留的知识点上限
+    
+    # 资料处理后台队列配置（轮询间隔和租约时长同样用于批量网页解析）
+    material_worker_count: int = 2  # 工作协程数
+    job_poll_interval: float = 2.0  # 队列空闲时的轮询间隔（秒）
+    job_lease_seconds: float = 60.0  # 执行中任务的租约时长（秒），超过该时间没有心跳视为持有进程已退出，可被重新领取
+    progress_poll_interval: float = 1.0  # SSE 进度推送轮询间隔（秒）
+    
+    # 大模型响应缓存配置
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = "./llm_cache.db"
+    llm_cache_memory_size: int = 256  # 内存 LRU 最大条目数
+    llm_cache_max_entries: int = 10000  # 持久层最大条目数
+    llm_cache_ttl: int = 7 * 24 * 3600  # 过期时间（秒）
+
+    # 网页抓取缓存（按 URL 保存 ETag/Last-Modified 和提取后的正文，条件请求复验）
+    url_cache_enabled: bool = True
+    url_cache_path: str = "./url_cache.db"
+    url_cache_max_bytes: int = 100 * 1024 * 1024  # 缓存正文总字节数上限，超出按最近访问时间淘汰
+    
+    # HTTP 连接池配置（应用级共享客户端）
+    http2_enabled: bool = True
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_connect_timeout: float = 10.0
+    url_fetch_timeout: float = 30.0  # 网页抓取超时（秒）
     
     # 知识解析配置
     upload_dir: str = "./uploads"
     max_file_size: int = 30 * 1024 * 1024  # 30MB
+    upload_read_chunk_size: int = 1024 * 1024  # 上传文件分块读取大小，超过 max_file_size 即停止读取
+    pdf_extract_workers: int = 4  # PDF 解析进程数上限（不超过 CPU 核数）
+    pdf_min_pages_per_task: int = 20  # 每个解析任务的最少页数，页数少的文档不拆分
+    pdf_extract_timeout: float = 120.0  # 单个 PDF 解析超时（秒）
+    
+    # 批量网页解析配置
+    batch_max_urls: int = 200  # 单个批次最多网页数（含订阅源展开后的地址）
+    batch_fetch_concurrency: int = 8  # 同时抓取的网页数
+    batch_per_host_concurrency: int = 2  # 同一站点同时抓取的网页数
+    batch_analysis_concurrency: int = 2  # 同时进行大模型分析的网页数
     
     class Config:
         env_file = ".env"
@@ -1,13 +1,18 @@
 """数据库连接配置"""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from app.core.config import get_settings
+from app.core.query_monitor import slow_query_monitor
+from app.core.table_versions import table_versions
 
 settings = get_settings()
 
 # 根据数据库类型配置引擎参数
 connect_args = {}
-engine_kwargs = {"echo": settings.debug}
+engine_kwargs = {"echo": settings.db_echo}
 
 if settings.database_url.startswith("sqlite"):
     # SQLite 特殊配置
@@ -23,6 +28,60 @@ engine = create_engine(
     **engine_kwargs
 )
 
+
+def sqlite_pragmas() -> dict:
+    """按配置生成 SQLite 连接参数（busy_timeout 最先设置，使切换日志模式时也能等待锁）"""
+    return {
+        "busy_timeout": settings.sqlite_busy_timeout,
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": settings.sqlite_cache_size,
+        "temp_store": settings.sqlite_temp_store,
+    }
+
+
+def configure_sqlite(target: Engine, pragmas: dict):
+    """为 SQLite 引擎注册连接事件，在每个新连接上执行 PRAGMA"""
+    @event.listens_for(target, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    configure_sqlite(engine, sqlite_pragmas())
+slow_query_monitor.install(engine)
+table_versions.install(engine)
+
+
+def async_database_url(database_url: str) -> str:
+    """将同步驱动连接串转换为对应的异步驱动（sqlite -> aiosqlite，mysql -> asyncmy）"""
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    elif url.get_backend_name() == "mysql":
+        url = url.set(drivername="mysql+asyncmy")
+    return url.render_as_string(hide_password=False)
+
+
+# 异步引擎：供 async 路由使用，避免数据库 IO 阻塞事件循环
+async_engine = create_async_engine(
+    settings.async_database_url or async_database_url(settings.database_url),
+    **engine_kwargs
+)
+
+if async_engine.dialect.name == "sqlite":
+    configure_sqlite(async_engine.sync_engine, sqlite_pragmas())
+slow_query_monitor.install(async_engine.sync_engine)
+table_versions.install(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -35,3 +94,46 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """获取异步数据库会话依赖"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def upsert(
+    db: Session,
+    model,
+    rows: list[dict],
+    conflict_columns: list[str],
+    update_columns: list[str],
+    update_expressions=None,
+):
+    """单条语句批量插入或更新
+
+    SQLite/PostgreSQL 使用 ON CONFLICT DO UPDATE，MySQL 使用 ON DUPLICATE KEY UPDATE，
+    conflict_columns 须对应唯一约束。update_columns 取新行的值覆盖；
+    update_expressions 为可选函数，接收新行命名空间（excluded / inserted），返回 {列名: 更新表达式}。
+    """
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(table).values(rows)
+        new = stmt.inserted
+    else:
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(table).values(rows)
+        new = stmt.excluded
+
+    values = {col: new[col] for col in update_columns}
+    if update_expressions is not None:
+        values.update(update_expressions(new))
+
+    if dialect == "mysql":
+        stmt = stmt.on_duplicate_key_update(values)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=conflict_columns, set_=values)
+    db.execute(stmt)
@@ -0,0 +1,57 @@
+"""全文检索分词 - 中文按相邻字二元切分（bigram），其他文字保留原词
+
+SQLite FTS5 内置的 unicode61 分词器会把连续汉字当成一个词，无法检索句中的词语，
+因此写入索引前先把文本转换为空格分隔的词元：「机器学习」->「机器 器学 学习 习」。
+分词在应用中完成后再写入索引（见 search_service），数据库触发器不依赖自定义函数，
+其他工具（sqlite3 命令行、迁移或备份脚本）也能正常写入业务表。
+"""
+import re
+
+# 中日韩统一表意文字（含扩展 A）及兼容区
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _cjk_bigrams(run: str, for_query: bool) -> list[str]:
+    """连续汉字切分为二元词元；索引时追加末字，使单字前缀查询能命中词尾"""
+    if len(run) == 1:
+        return [run]
+    tokens = [run[i:i + 2] for i in range(len(run) - 1)]
+    if not for_query:
+        tokens.append(run[-1])
+    return tokens
+
+
+def bigram_tokens(text: str | None, for_query: bool = False) -> str:
+    """将文本转换为空格分隔的检索词元（for_query=True 时用于构造查询短语）"""
+    if not text:
+        return ""
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        pos = 0
+        for match in _CJK_RE.finditer(word):
+            if match.start() > pos:
+                tokens.append(word[pos:match.start()].lower())
+            tokens.extend(_cjk_bigrams(match.group(), for_query))
+            pos = match.end()
+        if pos < len(word):
+            tokens.append(word[pos:].lower())
+    return " ".join(tokens)
+
+
+def fts_match_query(terms: list[str]) -> str:
+    """构造 FTS5 MATCH 表达式：每个检索词转换为词元短语，多个短语为 AND 关系
+
+    以完整二元词元结尾的短语精确匹配；以单字或西文结尾的短语使用前缀匹配，
+    使「树」能命中「树模」「红黑树」，「pyth」能命中「python」。
+    """
+    phrases = []
+    for term in terms:
+        tokens = bigram_tokens(term, for_query=True)
+        if not tokens:
+            continue
+        last = tokens.rsplit(" ", 1)[-1]
+        prefix = "" if len(last) == 2 and _CJK_RE.fullmatch(last) else "*"
+        phrases.append(f'"{tokens}"{prefix}')
+    return " AND ".join(phrases)
+
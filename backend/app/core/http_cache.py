@@ -0,0 +1,83 @@
+"""HTTP 条件请求缓存 - 基于数据表版本号的弱 ETag
+
+对读多写少的 GET 接口，按其依赖的数据表版本号生成弱 ETag：
+请求携带的 If-None-Match 与当前 ETag 一致时直接返回 304，不进入路由、不访问数据库；
+否则正常处理并在 200 响应上附加 ETag 和按路由配置的 Cache-Control。
+
+版本号为进程内计数（见 table_versions），仅统计经本进程 SQLAlchemy 引擎提交的写入，
+因此只适用于单进程部署；ETag 中包含进程启动标识，重启后旧 ETag 自动失效。
+"""
+import hashlib
+import re
+import uuid
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.core.table_versions import table_versions
+
+# 进程启动标识：版本号重启后从 0 开始，加入该标识避免与重启前签发的 ETag 冲突
+_BOOT_ID = uuid.uuid4().hex
+
+# (路径正则, 依赖的数据表, Cache-Control)
+CACHE_RULES = [
+    (r"/api/gamification/achievements", ("user_achievements",), "private, no-cache"),
+    (
+        r"/api/gamification/direction-progress",
+        ("directions", "direction_progress", "materials", "questions"),
+        "private, no-cache",
+    ),
+    (r"/api/directions", ("directions",), "private, no-cache"),
+    # 已完成的测验结果不会再变化（只可能被删除），允许浏览器短时间直接使用缓存
+    (r"/api/exams/\d+/result", ("exams", "answers"), "private, max-age=300"),
+    (r"/api/questions/\d+", ("questions",), "private, no-cache"),
+]
+_COMPILED_RULES = [(re.compile(pattern + "$"), tables, cache_control) for pattern, tables, cache_control in CACHE_RULES]
+
+
+def match_rule(request: Request) -> Optional[tuple[tuple[str, ...], str]]:
+    """返回请求对应的 (依赖表, Cache-Control)，不适用缓存时返回 None"""
+    if request.method != "GET":
+        return None
+    path = request.url.path.rstrip("/") or "/"
+    for pattern, tables, cache_control in _COMPILED_RULES:
+        if pattern.match(path):
+            return tables, cache_control
+    return None
+
+
+def make_etag(tables: tuple[str, ...]) -> str:
+    """由进程标识和依赖表版本号生成弱 ETag"""
+    versions = ",".join(f"{table}:{version}" for table, version in zip(tables, table_versions.version(*tables)))
+    digest = hashlib.sha1(f"{_BOOT_ID}|{versions}".encode("utf-8")).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """按弱比较判断 If-None-Match 是否命中"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+async def conditional_get(request: Request, call_next) -> Response:
+    """命中 ETag 时返回 304，否则为成功响应附加 ETag 和 Cache-Control"""
+    rule = match_rule(request)
+    if rule is None:
+        return await call_next(request)
+    tables, cache_control = rule
+    # 先于路由处理计算 ETag：处理期间若有新写入，响应内容只会比 ETag 更新，下次请求自然失配
+    etag = make_etag(tables)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
@@ -0,0 +1,57 @@
+"""应用级共享 HTTP 客户端（连接池 + keep-alive + HTTP/2）"""
+import logging
+from typing import Optional
+
+import httpx
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    """按配置创建连接池客户端"""
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    # 默认超时只约束连接阶段，读取超时由各调用方按需传入
+    timeout = httpx.Timeout(settings.qwen_timeout, connect=settings.http_connect_timeout)
+
+    http2 = settings.http2_enabled
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("未安装 h2，HTTP/2 已回退为 HTTP/1.1（pip install 'httpx[http2]'）")
+            http2 = False
+
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+async def init_http_client() -> httpx.AsyncClient:
+    """应用启动时创建共享客户端"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client():
+    """应用关闭时释放连接池"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取共享客户端（脚本等未经 lifespan 启动的场景下按需创建）"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
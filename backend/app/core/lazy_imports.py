@@ -0,0 +1,38 @@
+"""可选重依赖的延迟加载 - 文档解析与导出库只在首次使用时导入
+
+bs4/lxml、pymupdf、python-docx、openpyxl 单独导入即各需约 40-160ms，而只有文件解析、
+URL 抓取和数据导出才会用到。应用代码通过 optional_module() 获取这些模块，
+不在模块顶层导入，worker 启动时不加载它们（由 test_import_time.py 检查）。
+"""
+import importlib
+import sys
+from types import ModuleType
+
+# 延迟加载的模块 -> 安装包名
+LAZY_MODULES = {
+    "bs4": "beautifulsoup4",
+    "lxml": "lxml",
+    "fitz": "pymupdf",
+    "docx": "python-docx",
+    "openpyxl": "openpyxl",
+}
+
+
+def optional_module(name: str) -> ModuleType:
+    """导入已登记的重依赖模块（可为子模块），未安装时抛出带安装提示的 RuntimeError"""
+    root = name.split(".", 1)[0]
+    if root not in LAZY_MODULES:
+        raise KeyError(f"未登记的延迟加载模块: {name}")
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        package = LAZY_MODULES[root]
+        raise RuntimeError(f"缺少依赖 {package}，请先安装: pip install {package}") from e
+
+
+def loaded_lazy_modules() -> list[str]:
+    """当前进程中已加载的登记模块"""
+    return sorted(name for name in LAZY_MODULES if name in sys.modules)
@@ -0,0 +1,53 @@
+"""数据库结构迁移 - 为已有数据库补建模型中声明的列和索引
+
+create_all 只会创建缺失的表，不会给已存在的表补列、补建索引，
+因此在启动时对比模型声明与数据库实际结构，逐个创建缺失项（SQLite / MySQL 通用）。
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.core.database import Base
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_columns(engine: Engine) -> list[str]:
+    """为已存在的表补加模型中新增的可空列，返回新增的 表.列 列表"""
+    import app.models  # noqa: F401  确保所有模型已注册到 Base.metadata
+
+    inspector = inspect(engine)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            added.append(f"{table.name}.{column.name}")
+            logger.info("已新增列 %s.%s", table.name, column.name)
+    return added
+
+
+def ensure_indexes(engine: Engine) -> list[str]:
+    """创建模型中声明但数据库中缺失的索引，返回新建的索引名列表"""
+    import app.models  # noqa: F401  确保所有模型已注册到 Base.metadata
+
+    inspector = inspect(engine)
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name in existing:
+                continue
+            index.create(bind=engine)
+            created.append(index.name)
+            logger.info("已创建索引 %s ON %s", index.name, table.name)
+    return created
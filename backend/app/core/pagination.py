@@ -0,0 +1,122 @@
+"""列表分页 - 基于 (created_at, id) 的游标分页（keyset），避免 OFFSET 扫描
+
+列表按 created_at、id 倒序返回，下一页条件为 (created_at, id) < 上一页最后一行，
+可直接利用 (..., created_at) 索引定位，翻页成本与页码无关。
+created_at 为空的旧数据排在最后，按 id 倒序单独翻页（游标中的时间为 null）。
+响应体保持为数组，分页信息放在响应头：X-Next-Cursor（下一页游标，最后一页不返回）、
+X-Total-Count（仅在 with_total=true 时返回）。
+总数缓存与 HTTP 条件请求缓存共用 HTTP_CACHE_ENABLED 开关：版本号为进程内计数，
+只能感知本进程的写入，默认关闭时每次直接 COUNT。
+"""
+import base64
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+from sqlalchemy.sql.util import find_tables
+
+from app.core.config import get_settings
+from app.core.table_versions import table_versions
+
+settings = get_settings()
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: int) -> str:
+    """将最后一行的排序键编码为不透明游标，创建时间为空时记为 null"""
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Optional[datetime], int]:
+    """解析游标，格式不正确时返回 400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return (datetime.fromisoformat(created_at) if created_at is not None else None), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
+class TotalCountCache:
+    """列表总数缓存：按查询语句、参数及涉及表的版本号缓存 COUNT 结果，表有写入后自动失效（仅限单进程部署）"""
+
+    def __init__(self, max_entries: int = 256, enabled: bool = False):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, query: Query) -> int:
+        query = query.order_by(None)
+        if not self.enabled:
+            return query.count()
+        statement = query.statement
+        compiled = statement.compile()
+        tables = sorted({table.name for table in find_tables(statement, include_joins=True)})
+        key = (str(compiled), repr(sorted(compiled.params.items())), tuple(tables), table_versions.version(*tables))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        total = query.count()
+        with self._lock:
+            self._entries[key] = total
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return total
+
+
+def keyset_page(query: Query, model, cursor: Optional[str] = None, limit: int = 50) -> tuple[list, Optional[str]]:
+    """按 (created_at, id) 倒序取一页，返回 (当前页, 下一页游标)，最后一页游标为 None
+
+    有创建时间的行翻完后再按 id 倒序接上创建时间为空的行；两段分开查询，
+    正常翻页时不带 IS NULL 条件，保持索引范围定位。
+    """
+    created_at, row_id = decode_cursor(cursor) if cursor else (None, None)
+    rows = []
+    if row_id is None or created_at is not None:
+        dated = query.filter(model.created_at.isnot(None))
+        if row_id is not None:
+            dated = dated.filter(or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < row_id),
+            ))
+        rows = dated.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        undated = query.filter(model.created_at.is_(None))
+        if row_id is not None and created_at is None:
+            undated = undated.filter(model.id < row_id)
+        rows += undated.order_by(model.id.desc()).limit(limit + 1 - len(rows)).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def paginate(
+    query: Query,
+    model,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    with_total: bool = False,
+) -> list:
+    """取一页并在响应头写入下一页游标和可选的总数"""
+    if with_total:
+        response.headers[TOTAL_COUNT_HEADER] = str(total_count_cache.count(query))
+    rows, next_cursor = keyset_page(query, model, cursor, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
+
+
+# 单例
+total_count_cache = TotalCountCache(max_entries=settings.page_total_cache_size, enabled=settings.http_cache_enabled)
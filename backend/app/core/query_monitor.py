@@ -0,0 +1,141 @@
+"""慢查询监控 - 基于游标执行事件计时，输出结构化日志并保留最慢语句排行"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+
+logger = logging.getLogger("app.slow_query")
+settings = get_settings()
+
+# 当前请求的路由（由 HTTP 中间件设置，后台任务中为空）
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """归一化 SQL：字面量替换为占位符，IN 列表折叠，空白压缩"""
+    sql = _STRING_RE.sub("?", statement)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _SPACE_RE.sub(" ", sql).strip()
+    return _IN_LIST_RE.sub("(?...)", sql)
+
+
+def fingerprint(statement: str) -> tuple[str, str]:
+    """返回 (指纹, 归一化语句)，同一形状的语句指纹相同"""
+    normalized = normalize_statement(statement)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12], normalized
+
+
+class SlowQueryMonitor:
+    """慢查询记录器：按指纹聚合，保留最大耗时最高的 top_n 条"""
+
+    def __init__(self, threshold_ms: float = 200.0, top_n: int = 20, enabled: bool = True):
+        self.threshold_ms = threshold_ms
+        self.top_n = top_n
+        self.enabled = enabled
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def install(self, engine: Engine):
+        """在引擎上注册计时事件（异步引擎传入 async_engine.sync_engine）"""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("query_start_time")
+        if not start_times:
+            return
+        duration_ms = (time.perf_counter() - start_times.pop()) * 1000
+        if self.enabled and duration_ms >= self.threshold_ms:
+            self.record(statement, duration_ms, cursor.rowcount, current_route.get())
+
+    def record(self, statement: str, duration_ms: float, rowcount: int, route: Optional[str]):
+        """记录一次慢查询：输出 JSON 日志并更新排行"""
+        fp, normalized = fingerprint(statement)
+        payload = {
+            "event": "slow_query",
+            "fingerprint": fp,
+            "statement": normalized,
+            "duration_ms": round(duration_ms, 2),
+            "rowcount": rowcount,
+            "route": route,
+        }
+        logger.warning(json.dumps(payload, ensure_ascii=False))
+
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            entry = self._entries.get(fp)
+            if entry is None:
+                entry = self._entries[fp] = {
+                    "fingerprint": fp,
+                    "statement": normalized,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["last_ms"] = round(duration_ms, 2)
+            entry["last_rowcount"] = rowcount
+            entry["last_route"] = route
+            entry["last_seen"] = now
+            if duration_ms >= entry["max_ms"]:
+                entry["max_ms"] = duration_ms
+                entry["max_route"] = route
+
+            if len(self._entries) > self.top_n:
+                fastest = min(self._entries.values(), key=lambda e: e["max_ms"])
+                self._entries.pop(fastest["fingerprint"])
+
+    def top(self) -> list[dict]:
+        """按最大耗时降序返回排行"""
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: e["max_ms"], reverse=True)
+            return [
+                {
+                    **entry,
+                    "max_ms": round(entry["max_ms"], 2),
+                    "total_ms": round(entry["total_ms"], 2),
+                    "avg_ms": round(entry["total_ms"] / entry["count"], 2),
+                }
+                for entry in entries
+            ]
+
+    def clear(self):
+        """清空排行"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """排行与配置"""
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_ms,
+            "top_n": self.top_n,
+            "queries": self.top(),
+        }
+
+
+# 单例
+slow_query_monitor = SlowQueryMonitor(
+    threshold_ms=settings.slow_query_threshold_ms,
+    top_n=settings.slow_query_top_n,
+    enabled=settings.slow_query_log_enabled,
+)
@@ -0,0 +1,52 @@
+"""JSON 响应 - 基于 orjson / pydantic-core 直接输出字节，跳过 jsonable_encoder 和标准库 json
+
+声明了 response_model 的路由由 FastAPI 校验后经 pydantic-core 序列化，无需处理；
+本模块用于其余场景：
+  list_response：大列表接口在路由内一次校验 ORM 对象并用缓存的 TypeAdapter.dump_json 输出，
+               FastAPI 不再对返回值重复校验；
+  ORJSONResponse：返回普通 dict / list 的响应（稀疏字段、调试接口等）改用 orjson 编码。
+"""
+from functools import lru_cache
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+
+class ORJSONResponse(JSONResponse):
+    """使用 orjson 编码的 JSONResponse（默认输出 UTF-8，不转义中文）"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    """按响应模型缓存 list[schema] 的 TypeAdapter，避免每次请求重新构建校验器和序列化器"""
+    return TypeAdapter(list[schema])
+
+
+def forwarded_headers(response: Optional[Response]) -> dict[str, str]:
+    """取出路由已写入的自定义响应头（X-Next-Cursor 等），直接返回 Response 时需手动带上"""
+    if response is None:
+        return {}
+    return {key: value for key, value in response.headers.items() if key.lower().startswith("x-")}
+
+
+def list_response(
+    rows: list,
+    schema: type[BaseModel],
+    response: Optional[Response] = None,
+    include: Optional[set[str]] = None,
+) -> Response:
+    """将 ORM 对象列表按响应模型一次校验后直接序列化为 JSON 字节"""
+    adapter = list_adapter(schema)
+    if include is None:
+        body = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    else:
+        # 稀疏字段：仅读取指定属性构造模型（不触发未加载列的查询），序列化时只输出这些字段
+        models = [schema.model_construct(**{name: getattr(row, name) for name in include}) for row in rows]
+        body = adapter.dump_json(models, include={"__all__": include}, warnings=False)
+    return Response(content=body, media_type="application/json", headers=forwarded_headers(response))
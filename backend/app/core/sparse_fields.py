@@ -0,0 +1,35 @@
+"""稀疏字段集 - 列表接口的 fields= 参数，只查询并返回指定字段
+
+fields 为逗号分隔的字段名（须是响应模型中的字段），查询时仅加载对应列
+（以及分页所需的 id、created_at），响应只包含这些字段。
+"""
+from typing import Optional
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy.orm import load_only
+
+from app.core.responses import list_response
+
+
+def parse_fields(fields: Optional[str], schema: type[BaseModel]) -> Optional[list[str]]:
+    """解析 fields 参数，未指定时返回 None；包含未知字段时返回 400"""
+    if not fields:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in schema.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的字段: {', '.join(unknown)}")
+    return names
+
+
+def load_only_fields(model, fields: list[str]):
+    """生成 load_only 选项：请求字段中的列，以及分页排序用的 id 和 created_at（query_expression 字段由调用方填充）"""
+    columns = set(model.__table__.columns.keys())
+    needed = {"id", "created_at", *fields}
+    return load_only(*(getattr(model, name) for name in sorted(needed & columns)))
+
+
+def sparse_response(rows: list, schema: type[BaseModel], fields: list[str], response: Response) -> Response:
+    """按指定字段序列化（不触发未加载列的读取），并保留已设置的分页响应头"""
+    return list_response(rows, schema, response, include=set(fields))
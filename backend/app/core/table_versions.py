@@ -0,0 +1,53 @@
+"""数据表版本号 - 每次提交写入某张表时递增，供列表总数缓存等按版本失效
+
+在引擎的游标事件中记录本事务写入（INSERT / UPDATE / DELETE）的表，
+提交时统一递增版本号，回滚则丢弃；版本号为进程内计数，多进程部署时各自独立。
+"""
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class TableVersions:
+    """按表名维护的版本计数器"""
+
+    def __init__(self):
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def install(self, engine: Engine):
+        """在引擎上注册写入跟踪（异步引擎传入 async_engine.sync_engine）"""
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "commit", self._commit)
+        event.listen(engine, "rollback", self._rollback)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is None or not (context.isinsert or context.isupdate or context.isdelete):
+            return
+        table = getattr(context.compiled.statement, "table", None) if context.compiled else None
+        if table is not None:
+            conn.info.setdefault("written_tables", set()).add(table.name)
+
+    def _commit(self, conn):
+        tables = conn.info.pop("written_tables", None)
+        if tables:
+            self.bump(*tables)
+
+    def _rollback(self, conn):
+        conn.info.pop("written_tables", None)
+
+    def bump(self, *tables: str):
+        """递增指定表的版本号"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def version(self, *tables: str) -> tuple[int, ...]:
+        """返回指定表的当前版本号"""
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+
+# 单例
+table_versions = TableVersions()
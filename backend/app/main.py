@@ -1,9 +1,23 @@
 """FastAPI 应用入口"""
+import asyncio
 import os
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
-from app.core.database import engine, Base
+from app.core.database import engine, async_engine, Base
+from app.core.http_cache import conditional_get
+from app.core.http_client import init_http_client, close_http_client
+from app.core.migrations import ensure_columns, ensure_indexes
+from app.core.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from app.core.responses import ORJSONResponse
+from app.core.query_monitor import slow_query_monitor, current_route
+from app.services.llm_cache import llm_cache
+from app.services.url_cache import url_cache
+from app.services.extractor_service import extractor_service
+from app.services.material_job_service import material_job_queue
+from app.services.batch_parse_service import batch_parse_service
+from app.services.search_service import ensure_search_index
 from app.api import (
     directions_router,
     materials_router,
@@ -12,10 +26,34 @@ from app.api import (
     mistakes_router,
     parse_router,
     gamification_router,
+    search_router,
 )
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时建表、补列、补建索引和全文索引、建目录、创建共享 HTTP 客户端并启动资料处理工作池（遗留的批量解析任务标记为中断），关闭时依次释放（含 PDF 解析进程池）"""
+    Base.metadata.create_all(bind=engine)
+    ensure_columns(engine)
+    ensure_indexes(engine)
+    ensure_search_index(engine)
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    await init_http_client()
+    await material_job_queue.start()
+    await batch_parse_service.start()
+    try:
+        yield
+    finally:
+        await batch_parse_service.stop()
+        await material_job_queue.stop()
+        # 等待进行中的 PDF 解析任务可能较久，放到线程中执行，不阻塞事件循环
+        await asyncio.to_thread(extractor_service.shutdown)
+        await close_http_client()
+        await async_engine.dispose()
+
+
 # 创建应用
 app = FastAPI(
     title=settings.app_name,
@@ -23,6 +61,7 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS 配置
@@ -32,8 +71,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],  # 分页信息
 )
 
+
+@app.middleware("http")
+async def track_route(request: Request, call_next):
+    """记录当前请求路由，供慢查询日志关联来源"""
+    token = current_route.set(f"{request.method} {request.url.path}")
+    try:
+        return await call_next(request)
+    finally:
+        current_route.reset(token)
+
+
+if settings.http_cache_enabled:
+    # 读多写少的接口按数据表版本号返回 ETag，If-None-Match 命中时直接 304
+    app.middleware("http")(conditional_get)
+
+
 # 注册路由
 app.include_router(directions_router, prefix="/api")
 app.include_router(materials_router, prefix="/api")
@@ -42,13 +98,7 @@ app.include_router(exams_router, prefix="/api")
 app.include_router(mistakes_router, prefix="/api")
 app.include_router(parse_router, prefix="/api")
 app.include_router(gamification_router, prefix="/api")
-
-
-@app.on_event("startup")
-def startup():
-    """应用启动时创建数据表和上传目录"""
-    Base.metadata.create_all(bind=engine)
-    os.makedirs(settings.upload_dir, exist_ok=True)
+app.include_router(search_router, prefix="/api")
 
 
 @app.get("/")
@@ -65,3 +115,21 @@ def root():
 def health():
     """健康检查"""
     return {"status": "ok"}
+
+
+@app.get("/debug/llm-cache", response_class=ORJSONResponse)
+def llm_cache_stats():
+    """大模型响应缓存命中统计"""
+    return llm_cache.stats()
+
+
+@app.get("/debug/url-cache", response_class=ORJSONResponse)
+def url_cache_stats():
+    """网页抓取缓存命中统计与占用空间"""
+    return url_cache.stats()
+
+
+@app.get("/debug/slow-queries", response_class=ORJSONResponse)
+def slow_queries():
+    """最慢 SQL 语句排行（按语句指纹聚合）"""
+    return slow_query_monitor.stats()
@@ -17,12 +17,16 @@ from app.models.models import (
     ParseTask,
     KnowledgePoint,
     BestPractice,
+    MaterialJob,
+    ParseBatch,
+    ParseBatchItem,
     ExpSourceType,
     UserProfile,
     UserAchievement,
     UserDailyTask,
     ExpLog,
     DirectionProgress,
+    UserStats,
 )
 
 __all__ = [
@@ -43,10 +47,14 @@ __all__ = [
     "ParseTask",
     "KnowledgePoint",
     "BestPractice",
+    "MaterialJob",
+    "ParseBatch",
+    "ParseBatchItem",
     "ExpSourceType",
     "UserProfile",
     "UserAchievement",
     "UserDailyTask",
     "ExpLog",
     "DirectionProgress",
+    "UserStats",
 ]
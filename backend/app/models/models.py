@@ -1,8 +1,8 @@
 """数据库模型定义"""
 from datetime import datetime, date
 from enum import Enum as PyEnum
-from sqlalchemy import Column, Integer, String, Text, DateTime, Date, ForeignKey, Boolean, Enum, JSON, Numeric, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, ForeignKey, Boolean, Enum, JSON, Numeric, UniqueConstraint, Index
+from sqlalchemy.orm import relationship, query_expression
 from app.core.database import Base
 
 
@@ -78,6 +78,11 @@ class Direction(Base):
 class Material(Base):
     """学习资料表"""
     __tablename__ = "materials"
+    __table_args__ = (
+        Index("ix_materials_direction_created", "direction_id", "created_at"),
+        Index("ix_materials_created_id", "created_at", "id"),
+        Index("ix_materials_status", "status"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     direction_id = Column(Integer, ForeignKey("directions.id"), nullable=False, comment="学习方向ID")
@@ -87,14 +92,23 @@ class Material(Base):
     status = Column(Enum(MaterialStatus), default=MaterialStatus.PENDING, comment="处理状态")
     created_at = Column(DateTime, default=datetime.now, comment="创建时间")
     
+    # 列表查询时通过 with_expression 填充的内容摘要（不加载完整 content）和知识点数量（不加载 key_points）
+    content_preview = query_expression()
+    key_point_count = query_expression()
+    
     # 关联
     direction = relationship("Direction", back_populates="materials")
     questions = relationship("Question", back_populates="material")
+    jobs = relationship("MaterialJob", back_populates="material", cascade="all, delete-orphan")
 
 
 class Question(Base):
     """题目表"""
     __tablename__ = "questions"
+    __table_args__ = (
+        Index("ix_questions_material_created", "material_id", "created_at"),
+        Index("ix_questions_created_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     material_id = Column(Integer, ForeignKey("materials.id"), nullable=False, comment="来源资料ID")
@@ -116,6 +130,11 @@ class Question(Base):
 class Exam(Base):
     """测验表"""
     __tablename__ = "exams"
+    __table_args__ = (
+        Index("ix_exams_direction_created", "direction_id", "created_at"),
+        Index("ix_exams_created_id", "created_at", "id"),
+        Index("ix_exams_status_direction", "status", "direction_id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     direction_id = Column(Integer, ForeignKey("directions.id"), nullable=False, comment="学习方向ID")
@@ -137,6 +156,10 @@ class Exam(Base):
 class Answer(Base):
     """答题记录表"""
     __tablename__ = "answers"
+    __table_args__ = (
+        Index("ix_answers_question_correct", "question_id", "is_correct"),
+        Index("ix_answers_exam_question", "exam_id", "question_id", "is_correct"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     exam_id = Column(Integer, ForeignKey("exams.id"), nullable=False, comment="测验ID")
@@ -156,6 +179,11 @@ class Answer(Base):
 class Mistake(Base):
     """错题表"""
     __tablename__ = "mistakes"
+    __table_args__ = (
+        Index("ix_mistakes_mastered_created", "mastered", "created_at"),
+        Index("ix_mistakes_created_id", "created_at", "id"),
+        Index("ix_mistakes_answer_id", "answer_id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     question_id = Column(Integer, ForeignKey("questions.id"), nullable=False, unique=True, comment="题目ID(唯一，同题不重复记录)")
@@ -175,6 +203,10 @@ class Mistake(Base):
 class ParseTask(Base):
     """知识解析任务表"""
     __tablename__ = "parse_tasks"
+    __table_args__ = (
+        Index("ix_parse_tasks_direction_created", "direction_id", "created_at"),
+        Index("ix_parse_tasks_created_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     direction_id = Column(Integer, ForeignKey("directions.id", ondelete="SET NULL"), nullable=True, comment="学习方向ID")
@@ -188,6 +220,10 @@ class ParseTask(Base):
     created_at = Column(DateTime, default=datetime.now, comment="创建时间")
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
     
+    # 列表查询时通过 with_expression 填充的关联数量
+    knowledge_point_count = query_expression()
+    best_practice_count = query_expression()
+    
     # 关联
     direction = relationship("Direction", back_populates="parse_tasks")
     knowledge_points = relationship("KnowledgePoint", back_populates="task", cascade="all, delete-orphan")
@@ -197,6 +233,9 @@ class ParseTask(Base):
 class KnowledgePoint(Base):
     """知识点表"""
     __tablename__ = "knowledge_points"
+    __table_args__ = (
+        Index("ix_knowledge_points_task_id", "task_id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     task_id = Column(Integer, ForeignKey("parse_tasks.id"), nullable=False, comment="解析任务ID")
@@ -213,6 +252,9 @@ class KnowledgePoint(Base):
 class BestPractice(Base):
     """最佳实践表"""
     __tablename__ = "best_practices"
+    __table_args__ = (
+        Index("ix_best_practices_task_id", "task_id"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     task_id = Column(Integer, ForeignKey("parse_tasks.id"), nullable=False, comment="解析任务ID")
@@ -226,6 +268,92 @@ class BestPractice(Base):
     task = relationship("ParseTask", back_populates="best_practices")
 
 
+class MaterialJob(Base):
+    """资料处理后台任务表（持久化任务队列）"""
+    __tablename__ = "material_jobs"
+    __table_args__ = (
+        Index("ix_material_jobs_status_id", "status", "id"),
+        Index("ix_material_jobs_material_id", "material_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    material_id = Column(Integer, ForeignKey("materials.id", ondelete="CASCADE"), nullable=False, comment="资料ID")
+    status = Column(Enum(TaskStatus), default=TaskStatus.PENDING, nullable=False, comment="任务状态")
+    step = Column(String(20), default="queued", comment="当前步骤")
+    progress = Column(Integer, default=0, comment="进度(0-100)")
+    message = Column(String(200), nullable=True, comment="进度说明")
+    attempts = Column(Integer, default=0, comment="执行次数")
+    locked_by = Column(String(32), nullable=True, comment="执行中任务的持有者标识")
+    locked_at = Column(DateTime, nullable=True, comment="持有者最近一次心跳时间")
+    error_message = Column(Text, nullable=True, comment="错误信息")
+    created_at = Column(DateTime, default=datetime.now, comment="入队时间")
+    started_at = Column(DateTime, nullable=True, comment="开始时间")
+    finished_at = Column(DateTime, nullable=True, comment="结束时间")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
+    
+    # 关联
+    material = relationship("Material", back_populates="jobs")
+
+
+class ParseBatch(Base):
+    """批量网页解析任务表（一次提交的多个网页作为一个整体汇报进度）"""
+    __tablename__ = "parse_batches"
+    __table_args__ = (
+        Index("ix_parse_batches_status", "status"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    direction_id = Column(Integer, ForeignKey("directions.id", ondelete="SET NULL"), nullable=True, comment="学习方向ID")
+    title = Column(String(200), nullable=False, comment="批次标题")
+    feed_url = Column(Text, nullable=True, comment="sitemap/RSS 订阅源地址")
+    status = Column(Enum(TaskStatus), default=TaskStatus.PENDING, nullable=False, comment="批次状态")
+    total = Column(Integer, default=0, comment="网页总数")
+    completed = Column(Integer, default=0, comment="解析完成数")
+    failed = Column(Integer, default=0, comment="失败数")
+    duplicates = Column(Integer, default=0, comment="重复网页数（最终地址相同）")
+    message = Column(String(200), nullable=True, comment="进度说明")
+    locked_by = Column(String(32), nullable=True, comment="执行中批次的持有者标识")
+    locked_at = Column(DateTime, nullable=True, comment="持有者最近一次心跳时间")
+    created_at = Column(DateTime, default=datetime.now, comment="创建时间")
+    finished_at = Column(DateTime, nullable=True, comment="结束时间")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
+    
+    # 关联
+    items = relationship(
+        "ParseBatchItem", back_populates="batch", cascade="all, delete-orphan", order_by="ParseBatchItem.id"
+    )
+    
+    @property
+    def progress(self) -> int:
+        """整体进度（0-100），已完成、失败和重复的网页都计为已处理"""
+        if not self.total:
+            return 100 if self.status in (TaskStatus.COMPLETED, TaskStatus.FAILED) else 0
+        done = (self.completed or 0) + (self.failed or 0) + (self.duplicates or 0)
+        return min(100, done * 100 // self.total)
+
+
+class ParseBatchItem(Base):
+    """批量解析条目表（每个提交的 URL 一条，记录最终地址和对应的解析任务）"""
+    __tablename__ = "parse_batch_items"
+    __table_args__ = (
+        Index("ix_parse_batch_items_batch_id", "batch_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    batch_id = Column(Integer, ForeignKey("parse_batches.id", ondelete="CASCADE"), nullable=False, comment="批次ID")
+    url = Column(Text, nullable=False, comment="提交的地址")
+    final_url = Column(Text, nullable=True, comment="跳转后的最终地址")
+    task_id = Column(Integer, ForeignKey("parse_tasks.id", ondelete="SET NULL"), nullable=True, comment="解析任务ID")
+    status = Column(Enum(TaskStatus), default=TaskStatus.PENDING, nullable=False, comment="条目状态")
+    duplicate = Column(Boolean, default=False, comment="最终地址与同批次其他条目重复")
+    error_message = Column(Text, nullable=True, comment="错误信息")
+    created_at = Column(DateTime, default=datetime.now, comment="创建时间")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
+    
+    # 关联
+    batch = relationship("ParseBatch", back_populates="items")
+
+
 # ============ 游戏化系统模型 ============
 
 class ExpSourceType(str, PyEnum):
@@ -274,6 +402,7 @@ class UserDailyTask(Base):
     __tablename__ = "user_daily_tasks"
     __table_args__ = (
         UniqueConstraint("user_id", "task_id", "date", name="uq_user_daily_task"),
+        Index("ix_user_daily_tasks_user_date", "user_id", "date", "completed"),
     )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -291,6 +420,9 @@ class UserDailyTask(Base):
 class ExpLog(Base):
     """经验获取日志表"""
     __tablename__ = "exp_logs"
+    __table_args__ = (
+        Index("ix_exp_logs_user_created", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, nullable=False, default=1, comment="用户ID")
@@ -322,3 +454,18 @@ class DirectionProgress(Base):
     
     # 关联
     direction = relationship("Direction")
+
+
+class UserStats(Base):
+    """用户统计计数表（由事件处理器增量维护，供成就检测使用）"""
+    __tablename__ = "user_stats"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False, unique=True, default=1, comment="用户ID")
+    exam_count = Column(Integer, nullable=False, default=0, comment="已完成测验数")
+    mastered_mistakes = Column(Integer, nullable=False, default=0, comment="已掌握错题数")
+    material_count = Column(Integer, nullable=False, default=0, comment="已处理资料数")
+    max_score = Column(Numeric(5, 2), nullable=True, comment="测验最高分")
+    explored_direction_ids = Column(JSON, nullable=True, comment="有已完成测验的方向ID列表")
+    reconciled_at = Column(DateTime, nullable=True, comment="最近一次全量重算时间")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
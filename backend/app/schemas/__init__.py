@@ -6,6 +6,7 @@ from app.schemas.schemas import (
     MaterialBase,
     MaterialCreate,
     MaterialResponse,
+    MaterialSummary,
     QuestionBase,
     QuestionCreate,
     QuestionResponse,
@@ -29,6 +30,7 @@ __all__ = [
     "MaterialBase",
     "MaterialCreate",
     "MaterialResponse",
+    "MaterialSummary",
     "QuestionBase",
     "QuestionCreate",
     "QuestionResponse",
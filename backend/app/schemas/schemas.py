@@ -58,6 +58,19 @@ class MaterialResponse(MaterialBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class MaterialSummary(BaseModel):
+    """学习资料列表项（不含完整内容，详情见 GET /materials/{id}）"""
+    id: int
+    direction_id: int
+    title: str
+    status: MaterialStatus
+    content_preview: Optional[str] = None
+    key_point_count: int = 0
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
 # ============ 题目 Schemas ============
 
 class QuestionBase(BaseModel):
@@ -140,6 +153,7 @@ class ExamResult(BaseModel):
     score: float
     grade: Optional[str] = None
     answers: list["AnswerResponse"] = []
+    gamification: Optional[dict] = None  # 提交测验时附带的经验/成就变化
 
 
 # ============ 答题 Schemas ============
@@ -211,6 +225,14 @@ class ParseUrlRequest(BaseModel):
     direction_id: Optional[int] = None
 
 
+class ParseBatchRequest(BaseModel):
+    """批量解析网页请求：直接给出 URL 列表，或给出 sitemap/RSS 订阅源地址（两者可同时提供）"""
+    title: str = "批量导入"
+    urls: list[str] = []
+    feed_url: Optional[str] = None
+    direction_id: Optional[int] = None
+
+
 class KnowledgePointResponse(BaseModel):
     """知识点响应"""
     id: int
@@ -245,6 +267,8 @@ class TaskListResponse(BaseModel):
     source_type: str
     summary: Optional[str] = None
     status: str
+    knowledge_point_count: Optional[int] = None
+    best_practice_count: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -270,6 +294,39 @@ class ParseTaskResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ParseBatchItemResponse(BaseModel):
+    """批量解析条目响应"""
+    id: int
+    url: str
+    final_url: Optional[str] = None
+    task_id: Optional[int] = None
+    status: str
+    duplicate: bool = False
+    error_message: Optional[str] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ParseBatchResponse(BaseModel):
+    """批量解析任务响应"""
+    id: int
+    direction_id: Optional[int] = None
+    title: str
+    feed_url: Optional[str] = None
+    status: str
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    duplicates: int = 0
+    progress: int = 0
+    message: Optional[str] = None
+    items: list[ParseBatchItemResponse] = []
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
 # ============ 游戏化系统 Schemas ============
 
 class UserProfileResponse(BaseModel):
@@ -373,3 +430,14 @@ class GamificationReward(BaseModel):
     new_title: Optional[str] = None
     achievements_unlocked: list[AchievementInfo] = []
     tasks_completed: list[str] = []
+
+
+# ============ 全文检索 Schemas ============
+
+class SearchHit(BaseModel):
+    """检索结果"""
+    type: str  # question / material / knowledge_point / best_practice
+    id: int
+    title: str
+    snippet: str  # 命中片段，检索词以 <mark> 标记，其余内容已做 HTML 转义
+    score: float  # 相关度，越大越相关（只在同一来源内可比）
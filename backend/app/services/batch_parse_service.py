@@ -0,0 +1,333 @@
+"""批量网页解析 - 一次提交多个 URL（或 sitemap/RSS 订阅源），并发抓取后逐页创建解析任务
+
+批次和条目写入 parse_batches / parse_batch_items 表，整体进度按批次计数汇报。
+执行中的批次由租约保护（见 job_lease），服务重启或持有进程异常退出后重新领取，
+只继续处理尚未完成的条目。
+抓取受全局并发数和单站点并发数双重限制，避免同时压垮同一个站点；
+按跳转后的最终地址去重，同一网页只解析一次。大模型分析另设并发上限。
+"""
+import asyncio
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.http_client import get_http_client
+from app.models import ParseBatch, ParseBatchItem, TaskStatus
+from app.schemas.schemas import ParseBatchRequest
+from app.services.extractor_service import extractor_service
+from app.services.job_lease import JobLease
+from app.services.parse_service import parse_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def normalize_url(url: str) -> str:
+    """规范化网址用于去重：协议和域名小写、去掉 #片段，非 http(s) 地址抛出 ValueError"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.netloc:
+        raise ValueError(f"无效的网址: {url}")
+    return urlunsplit((scheme, parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+
+def feed_links(root: ET.Element) -> tuple[list[str], list[str]]:
+    """解析订阅源，返回 (网页地址, 子 sitemap 地址)；支持 sitemap、sitemap 索引、RSS 和 Atom"""
+    tag = root.tag.rsplit("}", 1)[-1]
+    if tag == "sitemapindex":
+        return [], [loc.text.strip() for loc in root.iterfind("{*}sitemap/{*}loc") if loc.text]
+    if tag == "urlset":
+        return [loc.text.strip() for loc in root.iterfind("{*}url/{*}loc") if loc.text], []
+    if tag == "rss":
+        return [link.text.strip() for link in root.iterfind("channel/item/link") if link.text], []
+    if tag == "RDF":  # RSS 1.0
+        return [link.text.strip() for link in root.iterfind("{*}item/{*}link") if link.text], []
+    if tag == "feed":  # Atom
+        links = []
+        for entry in root.iterfind("{*}entry"):
+            for link in entry.iterfind("{*}link"):
+                if link.get("href") and link.get("rel", "alternate") == "alternate":
+                    links.append(link.get("href").strip())
+                    break
+        return links, []
+    raise ValueError("无法识别的订阅源格式（支持 sitemap、RSS、Atom）")
+
+
+def page_title(text: str, url: str) -> str:
+    """以正文首行作为任务标题，没有正文时使用网址"""
+    for line in text.splitlines():
+        if line.strip():
+            return line.strip()[:200]
+    return url[:200]
+
+
+class BatchParseService:
+    """批量网页解析服务
+
+    每个批次在后台协程中执行，创建时即由本进程领取；关闭时执行中的批次放回待处理，
+    由下次启动的进程（或其他进程在租约过期后）重新领取并继续处理未完成的条目。
+    """
+
+    def __init__(
+        self,
+        max_urls: int = 200,
+        fetch_concurrency: int = 8,
+        per_host_concurrency: int = 2,
+        analysis_concurrency: int = 2,
+        poll_interval: float = 2.0,
+        lease_seconds: float = 60.0,
+    ):
+        self.max_urls = max_urls
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.poll_interval = poll_interval
+        self.lease = JobLease(ParseBatch, lease_seconds)
+        self._fetch_slots = asyncio.Semaphore(max(1, fetch_concurrency))
+        self._analysis_slots = asyncio.Semaphore(max(1, analysis_concurrency))
+        self._runs: set[asyncio.Task] = set()
+        self._reclaimer: Optional[asyncio.Task] = None
+
+    # ============ 生命周期 ============
+
+    async def start(self):
+        """启动租约续约，并定期领取待处理或租约已过期的批次"""
+        self.lease.start()
+        self._reclaimer = asyncio.create_task(self._reclaim_loop())
+
+    async def stop(self):
+        """取消执行中的批次，并将本进程持有的批次放回待处理"""
+        if self._reclaimer is not None:
+            self._reclaimer.cancel()
+            await asyncio.gather(self._reclaimer, return_exceptions=True)
+            self._reclaimer = None
+        for run in self._runs:
+            run.cancel()
+        await asyncio.gather(*self._runs, return_exceptions=True)
+        self._runs.clear()
+        await self.lease.stop(message="服务重启，重新排队...")
+
+    async def _reclaim_loop(self):
+        """领取循环：启动时立即执行一次，之后按轮询间隔检查"""
+        while True:
+            try:
+                while (batch_id := await self._claim_next()) is not None:
+                    logger.info("继续执行批量解析 [batch:%d]", batch_id)
+                    self._spawn(batch_id)
+            except Exception as e:
+                logger.error("领取批量任务失败: %s", str(e))
+            await asyncio.sleep(self.poll_interval)
+
+    async def _claim_next(self) -> Optional[int]:
+        """抢占最早的待处理批次（或租约已过期的执行中批次），返回批次ID"""
+        async with AsyncSessionLocal() as db:
+            candidates = (await db.scalars(
+                select(ParseBatch.id).where(self.lease.claimable()).order_by(ParseBatch.id).limit(5)
+            )).all()
+            for batch_id in candidates:
+                result = await db.execute(
+                    update(ParseBatch)
+                    .where(ParseBatch.id == batch_id, self.lease.claimable())
+                    .values(**self.lease.claim_values())
+                )
+                await db.commit()
+                if result.rowcount == 1:
+                    return batch_id
+            return None
+
+    def _spawn(self, batch_id: int):
+        """在后台协程中执行已领取的批次"""
+        run = asyncio.create_task(self._run_batch(batch_id))
+        self._runs.add(run)
+        run.add_done_callback(self._runs.discard)
+
+    # ============ 创建与查询 ============
+
+    async def create_batch(self, db: AsyncSession, data: ParseBatchRequest) -> ParseBatch:
+        """创建批次并在后台开始抓取；URL 无效或数量超限时抛出 ValueError"""
+        if data.feed_url:
+            normalize_url(data.feed_url)
+        urls = list(dict.fromkeys(normalize_url(url) for url in data.urls if url.strip()))
+        if len(urls) > self.max_urls:
+            raise ValueError(f"单个批次最多 {self.max_urls} 个网址")
+
+        # 创建即由本进程领取，不经过领取循环
+        batch = ParseBatch(
+            title=data.title,
+            direction_id=data.direction_id,
+            feed_url=data.feed_url,
+            total=len(urls),
+            message="排队等待抓取...",
+            items=[ParseBatchItem(url=url, status=TaskStatus.PENDING) for url in urls],
+            **self.lease.claim_values(),
+        )
+        db.add(batch)
+        await db.commit()
+
+        self._spawn(batch.id)
+        return await self.get_batch(db, batch.id)
+
+    async def get_batch(self, db: AsyncSession, batch_id: int) -> Optional[ParseBatch]:
+        """获取批次及其条目"""
+        return await db.scalar(
+            select(ParseBatch)
+            .where(ParseBatch.id == batch_id)
+            .options(selectinload(ParseBatch.items))
+            .execution_options(populate_existing=True)
+        )
+
+    # ============ 执行 ============
+
+    async def _expand_feed(self, feed_url: str, limit: int) -> list[str]:
+        """抓取订阅源并展开为网页地址（sitemap 索引只展开一层）"""
+        pages, sitemaps = feed_links(await self._fetch_xml(feed_url))
+        for sitemap_url in sitemaps:
+            if len(pages) >= limit:
+                break
+            child_pages, _ = feed_links(await self._fetch_xml(sitemap_url))
+            pages.extend(child_pages)
+        return pages
+
+    async def _fetch_xml(self, url: str) -> ET.Element:
+        """下载并解析 XML 文档"""
+        async with self._fetch_slots:
+            response = await get_http_client().get(
+                url,
+                follow_redirects=True,
+                timeout=httpx.Timeout(settings.url_fetch_timeout, connect=settings.http_connect_timeout),
+            )
+        response.raise_for_status()
+        try:
+            return ET.fromstring(response.content)
+        except ET.ParseError as e:
+            raise ValueError(f"订阅源不是有效的 XML: {e}") from e
+
+    async def _run_batch(self, batch_id: int):
+        """执行已领取的批次：展开订阅源，并发处理未完成的条目，最后汇总状态
+
+        重新领取的批次跳过已有结果的条目，已记录的最终地址继续参与去重；
+        订阅源重新展开时已有的地址不会重复添加。
+        """
+        try:
+            async with AsyncSessionLocal() as db:
+                batch = await self.get_batch(db, batch_id)
+                batch.message = "正在抓取网页..."
+                if batch.feed_url:
+                    seen = {item.url for item in batch.items}
+                    for url in await self._expand_feed(batch.feed_url, self.max_urls - len(seen)):
+                        try:
+                            url = normalize_url(url)
+                        except ValueError:
+                            continue
+                        if url in seen or len(seen) >= self.max_urls:
+                            continue
+                        seen.add(url)
+                        batch.items.append(ParseBatchItem(url=url, status=TaskStatus.PENDING))
+                    batch.total = len(batch.items)
+                await db.commit()
+                items = [(item.id, item.url) for item in batch.items if item.status == TaskStatus.PENDING]
+                final_urls = {normalize_url(item.final_url) for item in batch.items if item.final_url}
+                direction_id = batch.direction_id
+
+            host_slots: dict[str, asyncio.Semaphore] = {}
+            await asyncio.gather(*(
+                self._run_item(batch_id, item_id, url, direction_id, host_slots, final_urls)
+                for item_id, url in items
+            ))
+            await self._finish_batch(batch_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("批量解析失败 [batch:%d]: %s", batch_id, str(e))
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(ParseBatch)
+                    .where(ParseBatch.id == batch_id)
+                    .values(status=TaskStatus.FAILED, message=str(e)[:200], finished_at=datetime.now())
+                )
+                await db.commit()
+
+    async def _run_item(
+        self,
+        batch_id: int,
+        item_id: int,
+        url: str,
+        direction_id: Optional[int],
+        host_slots: dict[str, asyncio.Semaphore],
+        final_urls: set[str],
+    ):
+        """抓取单个网页，最终地址重复则跳过，否则创建解析任务"""
+        host = urlsplit(url).netloc
+        host_slot = host_slots.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+        try:
+            async with host_slot, self._fetch_slots:
+                final_url, text = await extractor_service.fetch_page(url)
+
+            key = normalize_url(final_url)
+            if key in final_urls:
+                await self._finish_item(
+                    batch_id, item_id, "duplicates",
+                    status=TaskStatus.COMPLETED, final_url=final_url, duplicate=True,
+                )
+                return
+            final_urls.add(key)
+            if not text.strip():
+                raise ValueError("网页没有可提取的正文")
+
+            async with self._analysis_slots:
+                async with AsyncSessionLocal() as db:
+                    task = await parse_service.parse_page(
+                        page_title(text, final_url), final_url, text, db, direction_id
+                    )
+                    task_id, status, error = task.id, task.status, task.error_message
+            await self._finish_item(
+                batch_id, item_id, "completed" if status == TaskStatus.COMPLETED else "failed",
+                status=status, final_url=final_url, task_id=task_id, error_message=error,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("批量解析条目失败 [batch:%d] %s: %s", batch_id, url, str(e))
+            await self._finish_item(batch_id, item_id, "failed", status=TaskStatus.FAILED, error_message=str(e))
+
+    async def _finish_item(self, batch_id: int, item_id: int, counter: str, **values):
+        """更新条目结果，并原子递增批次对应计数"""
+        now = datetime.now()
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(ParseBatchItem).where(ParseBatchItem.id == item_id).values(updated_at=now, **values)
+            )
+            await db.execute(
+                update(ParseBatch)
+                .where(ParseBatch.id == batch_id)
+                .values({counter: getattr(ParseBatch, counter) + 1, "updated_at": now})
+            )
+            await db.commit()
+
+    async def _finish_batch(self, batch_id: int):
+        """汇总批次状态：全部失败记为失败，否则记为完成"""
+        async with AsyncSessionLocal() as db:
+            batch = await db.get(ParseBatch, batch_id, populate_existing=True)
+            all_failed = batch.failed and not (batch.completed or batch.duplicates)
+            batch.status = TaskStatus.FAILED if all_failed else TaskStatus.COMPLETED
+            batch.message = f"完成 {batch.completed}，失败 {batch.failed}，重复 {batch.duplicates}"
+            batch.finished_at = datetime.now()
+            await db.commit()
+
+
+# 单例
+batch_parse_service = BatchParseService(
+    max_urls=settings.batch_max_urls,
+    fetch_concurrency=settings.batch_fetch_concurrency,
+    per_host_concurrency=settings.batch_per_host_concurrency,
+    analysis_concurrency=settings.batch_analysis_concurrency,
+    poll_interval=settings.job_poll_interval,
+    lease_seconds=settings.job_lease_seconds,
+)
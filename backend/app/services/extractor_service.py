@@ -1,25 +1,75 @@
 """文本提取服务 - 从文件和URL中提取纯文本"""
-import os
+import asyncio
+import io
 import logging
-import tempfile
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import aclosing
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from typing import AsyncIterator, Optional
 
 import httpx
-from bs4 import BeautifulSoup
 from fastapi import UploadFile
 
 from app.core.config import get_settings
+from app.core.http_client import get_http_client
+from app.core.lazy_imports import optional_module
+from app.services.text_chunker import split_blocks
+from app.services.url_cache import url_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# 文件扩展名 -> 文本块生成方法名；解析库（pymupdf、python-docx）在方法内首次调用时才导入
+FILE_EXTRACTORS = {
+    ".pdf": "_iter_pdf",
+    ".docx": "_iter_docx",
+    ".md": "_iter_text_file",
+    ".txt": "_iter_text_file",
+}
+
+# 拼接完整文本时文本块之间的分隔（空行，与分块器的段落切分一致）
+BLOCK_SEPARATOR = "\n\n"
+
 # 支持的文件扩展名
-ALLOWED_EXTENSIONS = {".pdf", ".docx", ".md", ".txt"}
+ALLOWED_EXTENSIONS = set(FILE_EXTRACTORS)
+
+
+def _extract_pdf_pages(data: bytes, start: int, stop: int, deadline: float) -> list[str]:
+    """进程池任务：从内存中的 PDF 提取第 [start, stop) 页的文本，超过截止时间即中止"""
+    fitz = optional_module("fitz")  # pymupdf
+
+    pages = []
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        for number in range(start, stop):
+            if time.time() > deadline:
+                raise TimeoutError
+            pages.append(doc[number].get_text())
+    return pages
 
 
 class ExtractorService:
     """文本提取服务"""
 
+    def __init__(self, pdf_workers: Optional[int] = None):
+        self._pdf_pool: Optional[ProcessPoolExecutor] = None
+        self._pdf_workers = max(1, pdf_workers or min(settings.pdf_extract_workers, os.cpu_count() or 1))
+
+    def _get_pdf_pool(self) -> ProcessPoolExecutor:
+        """获取 PDF 解析进程池，首次使用时创建"""
+        if self._pdf_pool is None:
+            self._pdf_pool = ProcessPoolExecutor(max_workers=self._pdf_workers)
+        return self._pdf_pool
+
+    def shutdown(self):
+        """关闭 PDF 解析进程池：未开始的任务直接取消，等待进行中的任务结束（受单文档超时约束，异步环境中请放到线程里调用）"""
+        if self._pdf_pool is not None:
+            self._pdf_pool.shutdown(wait=True, cancel_futures=True)
+            self._pdf_pool = None
+
     def _validate_extension(self, filename: str) -> str:
         """校验并返回文件扩展名"""
         ext = Path(filename).suffix.lower()
@@ -27,81 +77,177 @@ class ExtractorService:
             raise ValueError(f"不支持的文件格式: {ext}，仅支持 {', '.join(ALLOWED_EXTENSIONS)}")
         return ext
 
-    async def extract_from_file(self, file: UploadFile) -> str:
-        """从上传文件中提取文本"""
-        ext = self._validate_extension(file.filename)
-        content = await file.read()
-
-        if len(content) > settings.max_file_size:
-            raise ValueError(f"文件大小超过限制（最大 {settings.max_file_size // 2048 // 2048}MB）")
+    async def iter_text_blocks(self, source: UploadFile | str) -> AsyncIterator[str]:
+        """边解析边产出文本块：source 为上传文件或 URL
 
-        # 写入临时文件后解析
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-            tmp.write(content)
-            tmp_path = tmp.name
+        PDF 按页、Word 按段落（标题段落单独成块）、纯文本/Markdown 和网页按标题与空行分段，
+        下游可在文档读完之前开始分块和调用大模型。
+        """
+        if isinstance(source, str):
+            async with aclosing(self._iter_url(source)) as blocks:
+                async for block in blocks:
+                    yield block
+            return
 
+        ext = self._validate_extension(source.filename)
+        buffer = await self._read_upload(source)
         try:
-            if ext == ".pdf":
-                return self._extract_pdf(tmp_path)
-            elif ext == ".docx":
-                return self._extract_docx(tmp_path)
-            elif ext == ".md":
-                return self._extract_text_file(tmp_path)
-            elif ext == ".txt":
-                return self._extract_text_file(tmp_path)
-            else:
-                raise ValueError(f"不支持的文件格式: {ext}")
+            async with aclosing(getattr(self, FILE_EXTRACTORS[ext])(buffer)) as blocks:
+                async for block in blocks:
+                    yield block
         finally:
-            os.unlink(tmp_path)
+            buffer.close()
 
-    def _extract_pdf(self, file_path: str) -> str:
-        """解析 PDF 文件"""
-        import fitz  # pymupdf
+    async def extract_from_file(self, file: UploadFile) -> str:
+        """从上传文件中提取文本（全程在内存中处理，不写临时文件）"""
+        return await self._join_blocks(self.iter_text_blocks(file))
 
-        text_parts = []
-        with fitz.open(file_path) as doc:
-            for page in doc:
-                text_parts.append(page.get_text())
-        text = "\n".join(text_parts).strip()
-        if not text:
+    async def extract_from_url(self, url: str) -> str:
+        """从 URL 抓取网页正文"""
+        return await self._join_blocks(self.iter_text_blocks(url))
+
+    async def _join_blocks(self, blocks: AsyncIterator[str]) -> str:
+        """拼接全部文本块，块之间以空行分隔"""
+        async with aclosing(blocks):
+            return BLOCK_SEPARATOR.join([block async for block in blocks])
+
+    def _size_error(self) -> ValueError:
+        """文件过大时的错误"""
+        return ValueError(f"文件大小超过限制（最大 {settings.max_file_size // 1024 // 1024}MB）")
+
+    async def _read_upload(self, file: UploadFile) -> io.BytesIO:
+        """分块读取上传内容，累计超过 max_file_size 时立即拒绝，不再继续读取"""
+        if file.size is not None and file.size > settings.max_file_size:
+            raise self._size_error()
+        buffer = io.BytesIO()
+        while chunk := await file.read(settings.upload_read_chunk_size):
+            if buffer.tell() + len(chunk) > settings.max_file_size:
+                buffer.close()
+                raise self._size_error()
+            buffer.write(chunk)
+        buffer.seek(0)
+        return buffer
+
+    def _pdf_page_ranges(self, page_count: int) -> list[tuple[int, int]]:
+        """拆分页码区间：首段较短以便尽快产出第一批页面，其余按进程数均分，每段不少于 pdf_min_pages_per_task 页"""
+        first = min(page_count, settings.pdf_min_pages_per_task)
+        ranges = [(0, first)] if first else []
+        rest = page_count - first
+        if rest > 0:
+            per_task = max(settings.pdf_min_pages_per_task, math.ceil(rest / self._pdf_workers))
+            ranges += [(start, min(start + per_task, page_count)) for start in range(first, page_count, per_task)]
+        return ranges
+
+    async def _iter_pdf(self, buffer: io.BytesIO) -> AsyncIterator[str]:
+        """解析 PDF 文件：页码区间分给进程池并行提取，按页序逐页产出，不阻塞事件循环
+
+        文档内容随任务参数传给工作进程（区间数约为进程数 + 1），不落盘。
+        """
+        fitz = optional_module("fitz")  # pymupdf
+
+        data = buffer.getvalue()
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            page_count = doc.page_count
+
+        timeout = settings.pdf_extract_timeout
+        deadline = time.time() + timeout
+        loop = asyncio.get_running_loop()
+        futures = []
+        produced = False
+        try:
+            pool = self._get_pdf_pool()
+            futures = [
+                loop.run_in_executor(pool, _extract_pdf_pages, data, start, stop, deadline)
+                for start, stop in self._pdf_page_ranges(page_count)
+            ]
+            for future in futures:
+                # 工作进程按截止时间逐页检查并自行中止，这里的超时兜底排队等待的时间
+                pages = await asyncio.wait_for(future, max(deadline - time.time(), 0))
+                for page in pages:
+                    page = page.strip()
+                    if page:
+                        produced = True
+                        yield page
+        except TimeoutError:
+            raise ValueError(f"PDF 解析超时（超过 {timeout:g} 秒）")
+        except BrokenProcessPool:
+            self._pdf_pool = None  # 工作进程异常退出，下次使用时重建
+            raise
+        finally:
+            # 出错或下游提前停止读取时，取消尚未开始的区间
+            for future in futures:
+                future.cancel()
+        if not produced:
             raise ValueError("PDF 文件内容为空或无法提取文本")
-        return text
 
-    def _extract_docx(self, file_path: str) -> str:
-        """解析 Word 文档"""
-        from docx import Document
+    async def _iter_docx(self, buffer: io.BytesIO) -> AsyncIterator[str]:
+        """解析 Word 文档，逐段落产出"""
+        docx = optional_module("docx")
 
-        doc = Document(file_path)
-        text_parts = [para.text for para in doc.paragraphs if para.text.strip()]
-        text = "\n".join(text_parts).strip()
-        if not text:
+        doc = docx.Document(buffer)
+        produced = False
+        for para in doc.paragraphs:
+            text = para.text.strip()
+            if text:
+                produced = True
+                yield text
+        if not produced:
             raise ValueError("Word 文档内容为空")
-        return text
 
-    def _extract_text_file(self, file_path: str) -> str:
-        """读取纯文本/Markdown 文件"""
-        for encoding in ["utf-8", "gbk", "gb2312", "latin-1"]:
-            try:
-                with open(file_path, "r", encoding=encoding) as f:
-                    text = f.read().strip()
-                if text:
-                    return text
-            except (UnicodeDecodeError, UnicodeError):
-                continue
+    async def _iter_text_file(self, buffer: io.BytesIO) -> AsyncIterator[str]:
+        """读取纯文本/Markdown 文件，按标题和空行分段产出"""
+        for block in split_blocks(self._decode_text(buffer)):
+            yield block
+
+    def _decode_text(self, buffer: io.BytesIO) -> str:
+        """按常见编码依次尝试解码文本文件"""
+        with buffer.getbuffer() as view:
+            for encoding in ["utf-8", "gbk", "gb2312", "latin-1"]:
+                try:
+                    text = str(view, encoding).strip()
+                    if text:
+                        return text
+                except (UnicodeDecodeError, UnicodeError):
+                    continue
         raise ValueError("无法读取文件内容，编码不支持")
 
-    async def extract_from_url(self, url: str) -> str:
-        """从 URL 抓取网页正文"""
+    async def _iter_url(self, url: str) -> AsyncIterator[str]:
+        """抓取网页正文，按标题和段落产出"""
+        _, text = await self.fetch_page(url)
+        for block in split_blocks(text):
+            yield block
+
+    async def fetch_page(self, url: str) -> tuple[str, str]:
+        """抓取网页正文，返回 (跳转后的最终地址, 正文)；缓存过的页面先做条件请求，未变化时直接使用缓存正文"""
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
                           "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            html = response.text
+        cached = await url_cache.get(url)
+        if cached is not None:
+            headers.update(cached.conditional_headers())
+
+        client = get_http_client()
+        response = await client.get(
+            url,
+            headers=headers,
+            follow_redirects=True,
+            timeout=httpx.Timeout(settings.url_fetch_timeout, connect=settings.http_connect_timeout),
+        )
+        if response.status_code == 304 and cached is not None:
+            await url_cache.revalidated_hit(cached)
+            return str(response.url), cached.text
+
+        response.raise_for_status()
+        text = self._html_to_text(response.text)
+        if "no-store" not in response.headers.get("cache-control", "").lower():
+            await url_cache.set(url, response.headers.get("etag"), response.headers.get("last-modified"), text)
+        return str(response.url), text
 
-        soup = BeautifulSoup(html, "lxml")
+    def _html_to_text(self, html: str) -> str:
+        """从 HTML 中提取正文（优先 article / main）"""
+        bs4 = optional_module("bs4")
+        soup = bs4.BeautifulSoup(html, "lxml")
 
         # 移除脚本、样式等无关标签
         for tag in soup(["script", "style", "nav", "footer", "header", "aside", "iframe"]):
@@ -1,20 +1,24 @@
 """游戏化服务 - 经验值、等级、成就、每日任务"""
+import logging
 import random
 from datetime import datetime, date, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
+from sqlalchemy import func, distinct, insert, case
 
 from app.models import (
     UserProfile, UserAchievement, UserDailyTask, ExpLog, DirectionProgress,
     ExpSourceType, Exam, ExamStatus, Answer, Mistake, Material, MaterialStatus,
-    Question, Direction,
+    Question, Direction, UserStats,
 )
 from app.core.level_config import (
     get_level_for_exp, get_title_for_level, get_next_level_exp, LEVEL_THRESHOLDS, MAX_LEVEL,
 )
+from app.core.database import upsert
 from app.core.achievements import ACHIEVEMENTS
 from app.core.daily_tasks import DAILY_TASKS, DAILY_TASK_COUNT
 
+logger = logging.getLogger(__name__)
+
 
 # ============ 用户档案 ============
 
@@ -39,43 +43,61 @@ def get_or_create_profile(db: Session) -> UserProfile:
 
 # ============ 经验值系统 ============
 
-def award_exp(
-    db: Session,
-    amount: int,
-    source_type: ExpSourceType,
-    source_id: int = None,
-    description: str = None,
-) -> dict:
-    """发放经验值，记录日志，检测升级"""
-    profile = get_or_create_profile(db)
-    old_level = profile.level
-    old_title = profile.title
-
-    profile.exp += amount
-    profile.total_exp += amount
-
-    # 记录日志
-    log = ExpLog(
-        user_id=1,
-        exp_amount=amount,
-        source_type=source_type,
-        source_id=source_id,
-        description=description,
-    )
-    db.add(log)
-
-    # 检测升级
-    level_result = _check_level_up(db, profile)
-
-    db.commit()
+class GamificationBatch:
+    """一次游戏化事件的工作单元
+
+    经验发放、任务进度和成就解锁先在内存中累积，
+    最后由 commit() 批量写入经验日志并只提交一次事务。
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.profile = get_or_create_profile(db)
+        self.exp_logs: list[dict] = []
+        self.level_result: dict = {"level_up": False}
+
+    def award_exp(
+        self,
+        amount: int,
+        source_type: ExpSourceType,
+        source_id: int = None,
+        description: str = None,
+    ) -> dict:
+        """累积经验值并检测升级（不提交）"""
+        profile = self.profile
+        profile.exp += amount
+        profile.total_exp += amount
+
+        self.exp_logs.append({
+            "user_id": 1,
+            "exp_amount": amount,
+            "source_type": source_type,
+            "source_id": source_id,
+            "description": description,
+        })
+
+        level_result = _check_level_up(self.db, profile)
+        if level_result["level_up"]:
+            if self.level_result["level_up"]:
+                # 同一事件内多次升级：保留最初等级，更新为最终等级
+                level_result["old_level"] = self.level_result["old_level"]
+                level_result["old_title"] = self.level_result["old_title"]
+            self.level_result = level_result
+
+        result = {
+            "exp_gained": amount,
+            "total_exp": profile.total_exp,
+            "current_exp": profile.exp,
+        }
+        result.update(level_result)
+        return result
 
-    result = {
-        "exp_gained": amount,
-        "total_exp": profile.total_exp,
-        "current_exp": profile.exp,
-    }
-    result.update(level_result)
-    return result
+    def commit(self):
+        """批量写入经验日志并提交全部变更"""
+        if self.exp_logs:
+            self.db.execute(insert(ExpLog), self.exp_logs)
+            self.exp_logs = []
+        self.db.commit()
 
 
 def _check_level_up(db: Session, profile: UserProfile) -> dict:
@@ -109,7 +131,15 @@ def calculate_exam_exp(exam_score: float, streak_days: int) -> int:
 
 def update_streak(db: Session) -> int:
     """更新连续登录天数，返回连击奖励EXP（0表示无奖励）"""
-    profile = get_or_create_profile(db)
+    batch = GamificationBatch(db)
+    bonus = _apply_streak(batch)
+    batch.commit()
+    return bonus
+
+
+def _apply_streak(batch: GamificationBatch) -> int:
+    """在工作单元内更新连续登录天数并累积连击奖励"""
+    profile = batch.profile
     today = date.today()
     last_login = profile.last_login_date
 
@@ -125,67 +155,161 @@ def update_streak(db: Session) -> int:
         profile.streak_days = 1
         profile.last_login_date = today
 
-    db.commit()
-
     bonus_map = {3: 20, 7: 50, 14: 100, 30: 200}
     bonus = bonus_map.get(profile.streak_days, 0)
     if bonus > 0:
-        award_exp(
-            db, bonus, ExpSourceType.STREAK_BONUS,
+        batch.award_exp(
+            bonus, ExpSourceType.STREAK_BONUS,
             description=f"连续学习{profile.streak_days}天奖励",
         )
     return bonus
 
 
-# ============ 成就系统 ============
+# ============ 统计计数 ============
 
-def get_user_stats(db: Session) -> dict:
-    """聚合用户统计数据，供成就检测使用"""
+def get_or_create_stats(db: Session) -> UserStats:
+    """获取用户统计计数，不存在时从源表全量重算一次"""
+    stats = db.query(UserStats).filter(UserStats.user_id == 1).first()
+    if not stats:
+        stats = reconcile_user_stats(db)
+    return stats
+
+
+def reconcile_user_stats(db: Session) -> UserStats:
+    """从源表重新计算统计计数（只 flush 不提交，由调用方或游戏化工作单元统一提交）"""
+    db.flush()  # 会话未开启 autoflush，先写出本事务内的变更再统计
     exam_count = db.query(Exam).filter(Exam.status == ExamStatus.COMPLETED).count()
     mastered_mistakes = db.query(Mistake).filter(Mistake.mastered == True).count()
     material_count = db.query(Material).filter(Material.status == MaterialStatus.PROCESSED).count()
-
-    # 最高分
     max_score = db.query(func.max(Exam.score)).filter(
         Exam.status == ExamStatus.COMPLETED
     ).scalar()
-    has_perfect_score = max_score is not None and float(max_score) >= 100
+    direction_ids = [
+        row[0] for row in db.query(Exam.direction_id).filter(
+            Exam.status == ExamStatus.COMPLETED
+        ).distinct().all()
+    ]
+
+    stats = db.query(UserStats).filter(UserStats.user_id == 1).first()
+    if not stats:
+        stats = UserStats(user_id=1)
+        db.add(stats)
+
+    stats.exam_count = exam_count
+    stats.mastered_mistakes = mastered_mistakes
+    stats.material_count = material_count
+    stats.max_score = max_score
+    stats.explored_direction_ids = sorted(direction_ids)
+    stats.reconciled_at = datetime.now()
+
+    db.flush()
+    return stats
+
+
+def record_data_deleted(db: Session):
+    """删除测验、错题、资料或题目后修正统计计数（不提交，随删除事务提交）
+
+    最高分和已探索方向无法增量回退，删除又是低频操作，因此直接从源表重算。
+    """
+    reconcile_user_stats(db)
+
+
+def _stats_for_increment(db: Session) -> UserStats | None:
+    """获取待增量更新的统计行；首次使用时全量重算（已包含本次变更），返回 None"""
+    stats = db.query(UserStats).filter(UserStats.user_id == 1).first()
+    if not stats:
+        reconcile_user_stats(db)
+    return stats
+
+
+def _record_exam_completed(db: Session, exam):
+    """增量记录一次完成的测验"""
+    stats = _stats_for_increment(db)
+    if stats is None:
+        return
+    stats.exam_count += 1
+    if exam.score is not None and (stats.max_score is None or float(exam.score) > float(stats.max_score)):
+        stats.max_score = exam.score
+    explored = list(stats.explored_direction_ids or [])
+    if exam.direction_id not in explored:
+        # JSON 列需整体赋值才会被识别为变更
+        stats.explored_direction_ids = explored + [exam.direction_id]
+
+
+def record_mistake_mastery(db: Session, mastered: bool):
+    """记录错题掌握状态变化并提交"""
+    _record_mistake_mastery(db, mastered)
+    db.commit()
 
-    # 探索方向数（有已完成测验的方向）
-    direction_count = db.query(distinct(Exam.direction_id)).filter(
-        Exam.status == ExamStatus.COMPLETED
-    ).count()
-
-    # 所有方向是否都达到90%探索率
-    all_directions = db.query(Direction).count()
-    if all_directions > 0:
-        high_explore = db.query(DirectionProgress).filter(
-            DirectionProgress.exploration_rate >= 90
-        ).count()
-        all_directions_90 = high_explore >= all_directions and all_directions > 0
-    else:
-        all_directions_90 = False
 
-    profile = get_or_create_profile(db)
+def record_mistakes_relapsed(db: Session, count: int):
+    """已掌握的错题再次答错被取消掌握时回退计数（不提交，随交卷事务提交）"""
+    if count > 0:
+        _record_mistake_mastery(db, False, count)
+
+
+def _record_mistake_mastery(db: Session, mastered: bool, count: int = 1):
+    """增量记录错题掌握状态变化（取消掌握时计数回退）"""
+    stats = _stats_for_increment(db)
+    if stats is None:
+        return
+    stats.mastered_mistakes = max(0, stats.mastered_mistakes + (count if mastered else -count))
+
+
+def _record_material_processed(db: Session, material):
+    """增量记录一份处理成功的资料"""
+    if material.status != MaterialStatus.PROCESSED:
+        return
+    stats = _stats_for_increment(db)
+    if stats is None:
+        return
+    stats.material_count += 1
+
+
+# ============ 成就系统 ============
+
+def get_user_stats(
+    db: Session, include_exploration: bool = True, profile: UserProfile = None
+) -> dict:
+    """读取用户统计数据，供成就检测使用"""
+    stats = get_or_create_stats(db)
+    profile = profile or get_or_create_profile(db)
+
+    # 所有方向是否都达到90%探索率（方向进度表按方向一行，数据量很小）
+    all_directions_90 = False
+    if include_exploration:
+        all_directions = db.query(Direction).count()
+        if all_directions > 0:
+            high_explore = db.query(DirectionProgress).filter(
+                DirectionProgress.exploration_rate >= 90
+            ).count()
+            all_directions_90 = high_explore >= all_directions
 
     return {
-        "exam_count": exam_count,
-        "mastered_mistakes": mastered_mistakes,
-        "material_count": material_count,
-        "has_perfect_score": has_perfect_score,
-        "direction_count": direction_count,
+        "exam_count": stats.exam_count,
+        "mastered_mistakes": stats.mastered_mistakes,
+        "material_count": stats.material_count,
+        "has_perfect_score": stats.max_score is not None and float(stats.max_score) >= 100,
+        "direction_count": len(stats.explored_direction_ids or []),
         "all_directions_90": all_directions_90,
         "streak_days": profile.streak_days,
     }
 
 
-def check_achievements(db: Session) -> list:
-    """检测并解锁所有满足条件的成就，返回新解锁列表"""
-    stats = get_user_stats(db)
+def _unlock_achievements(batch: GamificationBatch) -> list:
+    """在工作单元内解锁满足条件的成就并累积成就奖励"""
+    db = batch.db
     unlocked_ids = {
-        ua.achievement_id
-        for ua in db.query(UserAchievement).filter(UserAchievement.user_id == 1).all()
+        achievement_id
+        for (achievement_id,) in db.query(UserAchievement.achievement_id).filter(
+            UserAchievement.user_id == 1
+        ).all()
     }
+    if unlocked_ids.issuperset(ACHIEVEMENTS):
+        return []
+    stats = get_user_stats(
+        db, include_exploration="full_exploration" not in unlocked_ids, profile=batch.profile
+    )
 
     newly_unlocked = []
     for ach_id, ach in ACHIEVEMENTS.items():
@@ -195,14 +319,12 @@ def check_achievements(db: Session) -> list:
             ua = UserAchievement(user_id=1, achievement_id=ach_id)
             db.add(ua)
             # 成就经验奖励
-            award_exp(
-                db, ach["exp_reward"], ExpSourceType.ACHIEVEMENT,
+            batch.award_exp(
+                ach["exp_reward"], ExpSourceType.ACHIEVEMENT,
                 description=f"解锁成就：{ach['name']}",
             )
             newly_unlocked.append(ach)
 
-    if newly_unlocked:
-        db.commit()
     return newly_unlocked
 
 
@@ -228,6 +350,16 @@ def _check_achievement_condition(ach_id: str, stats: dict) -> bool:
 
 def generate_daily_tasks(db: Session) -> list:
     """获取今日任务，不存在则自动生成"""
+    tasks, created = _ensure_daily_tasks(db)
+    if created:
+        db.commit()
+        for t in tasks:
+            db.refresh(t)
+    return tasks
+
+
+def _ensure_daily_tasks(db: Session) -> tuple[list, bool]:
+    """获取今日任务，不存在则生成（不提交），返回 (任务列表, 是否新建)"""
     today = date.today()
     existing = db.query(UserDailyTask).filter(
         UserDailyTask.user_id == 1,
@@ -235,7 +367,7 @@ def generate_daily_tasks(db: Session) -> list:
     ).all()
 
     if existing:
-        return existing
+        return existing, False
 
     # 从任务池随机选取
     task_ids = list(DAILY_TASKS.keys())
@@ -255,103 +387,152 @@ def generate_daily_tasks(db: Session) -> list:
         )
         db.add(dt)
         tasks.append(dt)
+    return tasks, True
 
-    db.commit()
-    for t in tasks:
-        db.refresh(t)
-    return tasks
 
+def _advance_daily_tasks(batch: GamificationBatch, increments: dict[str, int]) -> list:
+    """按任务类型累加今日任务进度，返回新完成的任务名称列表
 
-def update_task_progress(db: Session, task_type: str, increment: int = 1) -> list:
-    """更新匹配类型的每日任务进度，返回新完成的任务名称列表"""
-    today = date.today()
-    tasks = db.query(UserDailyTask).filter(
-        UserDailyTask.user_id == 1,
-        UserDailyTask.date == today,
-        UserDailyTask.completed == False,
-    ).all()
+    increments 形如 {"exam": 1, "questions": 8}，一次事件的所有进度在同一批任务上更新。
+    """
+    tasks, _ = _ensure_daily_tasks(batch.db)
 
     completed_names = []
     for task in tasks:
+        if task.completed:
+            continue
         task_def = DAILY_TASKS.get(task.task_id)
-        if not task_def or task_def["task_type"] != task_type:
+        if not task_def:
+            continue
+        increment = increments.get(task_def["task_type"], 0)
+        if increment <= 0:
             continue
         task.current = min(task.current + increment, task.target)
-        if task.current >= task.target and not task.completed:
+        if task.current >= task.target:
             task.completed = True
             task.completed_at = datetime.now()
             # 发放任务奖励
-            award_exp(
-                db, task.exp_reward, ExpSourceType.DAILY_TASK,
+            batch.award_exp(
+                task.exp_reward, ExpSourceType.DAILY_TASK,
                 description=f"完成每日任务：{task_def['name']}",
             )
             completed_names.append(task_def["name"])
-
-    db.commit()
     return completed_names
 
 
 # ============ 方向探索进度 ============
 
-def update_direction_progress(db: Session, direction_id: int):
-    """更新指定方向的探索进度"""
-    # 该方向总题数
-    total_questions = db.query(Question).join(Material).filter(
-        Material.direction_id == direction_id
-    ).count()
-
-    # 已答题目（去重，只统计已完成测验中的题目）
-    answered_qids = db.query(distinct(Answer.question_id)).join(Exam).filter(
-        Exam.status == ExamStatus.COMPLETED,
-        Exam.direction_id == direction_id,
-    ).all()
-    answered_count = len(answered_qids)
+def _direction_counts_query(db: Session, direction_ids: list[int] | None = None):
+    """一次分组查询统计各方向的总题数、已答、答对和已掌握数
+
+    指定 direction_ids 时，方向过滤下推到每个分组子查询内部，只聚合这些方向的数据，
+    避免每次交卷或标记掌握都对全部历史记录做分组。
+    """
+    def only(column):
+        return [column.in_(direction_ids)] if direction_ids is not None else []
+
+    totals = (
+        db.query(Material.direction_id.label("direction_id"), func.count(Question.id).label("total"))
+        .join(Question, Question.material_id == Material.id)
+        .filter(*only(Material.direction_id))
+        .group_by(Material.direction_id)
+        .subquery()
+    )
+    # 已答 / 答对题目（去重，只统计已完成测验中的题目）
+    answered = (
+        db.query(
+            Exam.direction_id.label("direction_id"),
+            func.count(distinct(Answer.question_id)).label("answered"),
+            func.count(distinct(case((Answer.is_correct == True, Answer.question_id)))).label("correct"),
+        )
+        .join(Answer, Answer.exam_id == Exam.id)
+        .filter(Exam.status == ExamStatus.COMPLETED, *only(Exam.direction_id))
+        .group_by(Exam.direction_id)
+        .subquery()
+    )
+    mastered = (
+        db.query(Material.direction_id.label("direction_id"), func.count(Mistake.id).label("mastered"))
+        .join(Question, Question.material_id == Material.id)
+        .join(Mistake, Mistake.question_id == Question.id)
+        .filter(Mistake.mastered == True, *only(Material.direction_id))
+        .group_by(Material.direction_id)
+        .subquery()
+    )
 
-    # 答对的题目数（去重）
-    correct_qids = db.query(distinct(Answer.question_id)).join(Exam).filter(
-        Exam.status == ExamStatus.COMPLETED,
-        Exam.direction_id == direction_id,
-        Answer.is_correct == True,
-    ).all()
-    correct_count = len(correct_qids)
+    return (
+        db.query(
+            Direction.id,
+            func.coalesce(totals.c.total, 0),
+            func.coalesce(answered.c.answered, 0),
+            func.coalesce(answered.c.correct, 0),
+            func.coalesce(mastered.c.mastered, 0),
+        )
+        .outerjoin(totals, totals.c.direction_id == Direction.id)
+        .outerjoin(answered, answered.c.direction_id == Direction.id)
+        .outerjoin(mastered, mastered.c.direction_id == Direction.id)
+        .filter(*only(Direction.id))
+    )
 
-    # 已掌握错题数
-    mastered_count = db.query(Mistake).join(Question).join(Material).filter(
-        Material.direction_id == direction_id,
-        Mistake.mastered == True,
-    ).count()
 
-    exploration_rate = (answered_count / total_questions * 100) if total_questions > 0 else 0
+def refresh_direction_progress(db: Session, direction_ids: list[int] | None = None, studied: bool = True):
+    """重算方向探索进度并整表 upsert（不提交，由调用方统一提交）
+
+    direction_ids 为 None 时刷新全部方向；studied 为 True 时同时更新最后学习时间。
+    """
+    now = datetime.now()
+    rows = []
+    for direction_id, total, answered_count, correct_count, mastered_count in _direction_counts_query(db, direction_ids):
+        exploration_rate = (answered_count / total * 100) if total > 0 else 0
+        rows.append({
+            "user_id": 1,
+            "direction_id": direction_id,
+            "total_questions": total,
+            "answered_questions": answered_count,
+            "correct_questions": correct_count,
+            "mastered_count": mastered_count,
+            "exploration_rate": round(min(exploration_rate, 100), 2),
+            "last_studied_at": now if studied else None,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    update_columns = [
+        "total_questions", "answered_questions", "correct_questions",
+        "mastered_count", "exploration_rate", "updated_at",
+    ]
+    if studied:
+        update_columns.append("last_studied_at")
+    upsert(db, DirectionProgress, rows, ["user_id", "direction_id"], update_columns)
 
-    progress = db.query(DirectionProgress).filter(
-        DirectionProgress.user_id == 1,
-        DirectionProgress.direction_id == direction_id,
-    ).first()
 
-    if not progress:
-        progress = DirectionProgress(user_id=1, direction_id=direction_id)
-        db.add(progress)
+def update_direction_progress(db: Session, direction_id: int):
+    """更新指定方向的探索进度（不提交，由调用方统一提交）"""
+    refresh_direction_progress(db, [direction_id])
 
-    progress.total_questions = total_questions
-    progress.answered_questions = answered_count
-    progress.correct_questions = correct_count
-    progress.mastered_count = mastered_count
-    progress.exploration_rate = min(exploration_rate, 100)
-    progress.last_studied_at = datetime.now()
 
-    db.commit()
+def get_all_direction_progress(db: Session) -> list:
+    """获取所有方向的探索进度（未产生进度记录的方向实时统计总题数）"""
+    rows = (
+        db.query(Direction, DirectionProgress)
+        .outerjoin(
+            DirectionProgress,
+            (DirectionProgress.direction_id == Direction.id) & (DirectionProgress.user_id == 1),
+        )
+        .order_by(Direction.id)
+        .all()
+    )
 
+    missing_totals = {}
+    if any(progress is None for _, progress in rows):
+        missing_totals = dict(
+            db.query(Material.direction_id, func.count(Question.id))
+            .join(Question, Question.material_id == Material.id)
+            .group_by(Material.direction_id)
+            .all()
+        )
 
-def get_all_direction_progress(db: Session) -> list:
-    """获取所有方向的探索进度"""
-    directions = db.query(Direction).all()
     result = []
-    for d in directions:
-        progress = db.query(DirectionProgress).filter(
-            DirectionProgress.user_id == 1,
-            DirectionProgress.direction_id == d.id,
-        ).first()
-
+    for d, progress in rows:
         if progress:
             result.append({
                 "direction_id": d.id,
@@ -365,15 +546,11 @@ def get_all_direction_progress(db: Session) -> list:
                 "last_studied_at": progress.last_studied_at,
             })
         else:
-            # 计算实时数据
-            total = db.query(Question).join(Material).filter(
-                Material.direction_id == d.id
-            ).count()
             result.append({
                 "direction_id": d.id,
                 "direction_name": d.name,
                 "direction_description": d.description,
-                "total_questions": total,
+                "total_questions": missing_totals.get(d.id, 0),
                 "answered_questions": 0,
                 "correct_questions": 0,
                 "mastered_count": 0,
@@ -384,45 +561,65 @@ def get_all_direction_progress(db: Session) -> list:
 
 
 # ============ 事件处理器 ============
+# 每个事件在一个 GamificationBatch 中完成，经验日志批量写入，整体只提交一次
+
+def run_event(db: Session, handler, *args) -> dict | None:
+    """执行事件处理器，失败不影响调用方的业务结果
+
+    失败时记录日志并回滚本次事件，再从源表重算统计计数，避免增量计数漂移；
+    回滚会使会话中已加载的对象过期，调用方应在此之前读取所需数据。
+    """
+    try:
+        return handler(db, *args)
+    except Exception:
+        logger.exception("游戏化事件处理失败: %s", handler.__name__)
+        db.rollback()
+        try:
+            reconcile_user_stats(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("重算统计计数失败")
+        return None
+
 
 def on_exam_complete(db: Session, exam, correct_count: int, total_count: int) -> dict:
     """测验完成后的游戏化处理"""
-    profile = get_or_create_profile(db)
+    batch = GamificationBatch(db)
 
     # 更新连续登录
-    update_streak(db)
+    _apply_streak(batch)
 
     # 计算并发放经验
-    exp = calculate_exam_exp(float(exam.score or 0), profile.streak_days)
-    exp_result = award_exp(
-        db, exp, ExpSourceType.EXAM_COMPLETE, source_id=exam.id,
+    exp = calculate_exam_exp(float(exam.score or 0), batch.profile.streak_days)
+    batch.award_exp(
+        exp, ExpSourceType.EXAM_COMPLETE, source_id=exam.id,
         description=f"完成测验 - {float(exam.score or 0):.0f}分",
     )
 
-    # 更新方向进度
+    # 更新统计计数与方向进度
+    _record_exam_completed(db, exam)
     update_direction_progress(db, exam.direction_id)
 
-    # 更新每日任务
-    generate_daily_tasks(db)  # 确保今日任务已生成
-    completed_tasks = update_task_progress(db, "exam", 1)
-
-    # 高分任务
+    # 更新每日任务：测验、高分、答对题目
+    increments = {"exam": 1}
     if exam.score and float(exam.score) >= 80:
-        completed_tasks += update_task_progress(db, "exam_score", 1)
-
-    # 答对题目任务
+        increments["exam_score"] = 1
     if correct_count > 0:
-        completed_tasks += update_task_progress(db, "questions", correct_count)
+        increments["questions"] = correct_count
+    completed_tasks = _advance_daily_tasks(batch, increments)
 
     # 检测成就
-    unlocked = check_achievements(db)
+    unlocked = _unlock_achievements(batch)
+    batch.commit()
 
+    level_result = batch.level_result
     return {
         "exp_gained": exp,
-        "level_up": exp_result.get("level_up", False),
-        "old_level": exp_result.get("old_level"),
-        "new_level": exp_result.get("new_level"),
-        "new_title": exp_result.get("new_title"),
+        "level_up": level_result.get("level_up", False),
+        "old_level": level_result.get("old_level"),
+        "new_level": level_result.get("new_level"),
+        "new_title": level_result.get("new_title"),
         "achievements_unlocked": unlocked,
         "tasks_completed": completed_tasks,
     }
@@ -430,11 +627,12 @@ def on_exam_complete(db: Session, exam, correct_count: int, total_count: int) ->
 
 def on_mistake_mastered(db: Session, mistake) -> dict:
     """掌握错题后的游戏化处理"""
-    profile = get_or_create_profile(db)
-    update_streak(db)
+    batch = GamificationBatch(db)
+    _apply_streak(batch)
 
-    exp_result = award_exp(
-        db, 20, ExpSourceType.MISTAKE_MASTER, source_id=mistake.id,
+    _record_mistake_mastery(db, True)
+    batch.award_exp(
+        20, ExpSourceType.MISTAKE_MASTER, source_id=mistake.id,
         description="掌握错题",
     )
 
@@ -443,13 +641,13 @@ def on_mistake_mastered(db: Session, mistake) -> dict:
     if question and question.material:
         update_direction_progress(db, question.material.direction_id)
 
-    generate_daily_tasks(db)
-    completed_tasks = update_task_progress(db, "mistake", 1)
-    unlocked = check_achievements(db)
+    completed_tasks = _advance_daily_tasks(batch, {"mistake": 1})
+    unlocked = _unlock_achievements(batch)
+    batch.commit()
 
     return {
         "exp_gained": 20,
-        "level_up": exp_result.get("level_up", False),
+        "level_up": batch.level_result.get("level_up", False),
         "achievements_unlocked": unlocked,
         "tasks_completed": completed_tasks,
     }
@@ -457,25 +655,27 @@ def on_mistake_mastered(db: Session, mistake) -> dict:
 
 def on_material_uploaded(db: Session, material) -> dict:
     """上传资料后的游戏化处理"""
-    profile = get_or_create_profile(db)
-    update_streak(db)
+    batch = GamificationBatch(db)
+    _apply_streak(batch)
+
+    _record_material_processed(db, material)
 
     exp = 30
     if material.status == MaterialStatus.PROCESSED:
         exp += 20  # 成功生成题目额外奖励
 
-    exp_result = award_exp(
-        db, exp, ExpSourceType.MATERIAL_UPLOAD, source_id=material.id,
+    batch.award_exp(
+        exp, ExpSourceType.MATERIAL_UPLOAD, source_id=material.id,
         description=f"上传资料：{material.title[:30]}",
     )
 
-    generate_daily_tasks(db)
-    completed_tasks = update_task_progress(db, "material", 1)
-    unlocked = check_achievements(db)
+    completed_tasks = _advance_daily_tasks(batch, {"material": 1})
+    unlocked = _unlock_achievements(batch)
+    batch.commit()
 
     return {
         "exp_gained": exp,
-        "level_up": exp_result.get("level_up", False),
+        "level_up": batch.level_result.get("level_up", False),
         "achievements_unlocked": unlocked,
         "tasks_completed": completed_tasks,
     }
@@ -0,0 +1,78 @@
+"""任务租约 - 多进程共享任务表时，只重新领取持有进程已退出的执行中任务
+
+领取任务时写入本进程的持有者标识和心跳时间，执行期间后台协程定期续约；
+心跳超过租约时长没有更新的执行中任务，视为持有进程已异常退出，可被任意进程重新领取。
+正常关闭时把本进程持有的任务直接放回待处理，不必等待租约过期。
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_, update
+
+from app.core.database import AsyncSessionLocal
+from app.models import TaskStatus
+
+logger = logging.getLogger(__name__)
+
+
+class JobLease:
+    """任务表的租约管理（任务表需有 status、locked_by、locked_at 列）"""
+
+    def __init__(self, model, seconds: float = 60.0):
+        self.model = model
+        self.seconds = seconds
+        self.owner = uuid.uuid4().hex
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    def claimable(self):
+        """可领取条件：待处理，或执行中但租约已过期"""
+        expired_before = datetime.now() - timedelta(seconds=self.seconds)
+        return or_(
+            self.model.status == TaskStatus.PENDING,
+            and_(
+                self.model.status == TaskStatus.PROCESSING,
+                or_(self.model.locked_at.is_(None), self.model.locked_at < expired_before),
+            ),
+        )
+
+    def claim_values(self) -> dict:
+        """领取时写入的列"""
+        return {"status": TaskStatus.PROCESSING, "locked_by": self.owner, "locked_at": datetime.now()}
+
+    def start(self):
+        """启动续约协程"""
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self, **requeue_values):
+        """停止续约，并将本进程仍持有的执行中任务放回待处理（requeue_values 为额外写入的列）"""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(self.model)
+                .where(self.model.locked_by == self.owner, self.model.status == TaskStatus.PROCESSING)
+                .values(status=TaskStatus.PENDING, locked_by=None, locked_at=None, **requeue_values)
+            )
+            await db.commit()
+
+    async def _heartbeat_loop(self):
+        """每隔租约时长的三分之一，为本进程持有的执行中任务续约"""
+        while True:
+            await asyncio.sleep(self.seconds / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(self.model)
+                        .where(self.model.locked_by == self.owner, self.model.status == TaskStatus.PROCESSING)
+                        # 显式保留 updated_at，续约不算作任务进度更新
+                        .values(locked_at=datetime.now(), updated_at=self.model.updated_at)
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.error("任务续约失败 [%s]: %s", self.model.__tablename__, str(e))
@@ -1,8 +1,13 @@
 """知识提取 AI 服务 - 基于通义千问提取知识点和最佳实践"""
+import asyncio
 import json
 import logging
+from typing import AsyncIterable
 import httpx
 from app.core.config import get_settings
+from app.core.http_client import get_http_client
+from app.services.llm_cache import llm_cache
+from app.services.text_chunker import aiter_chunks, split_text, merge_unique
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -17,39 +22,88 @@ class KnowledgeService:
         self.base_url = settings.qwen_base_url
 
     async def _chat(self, messages: list[dict], temperature: float = 0.7) -> str:
-        """调用通义千问聊天接口"""
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": temperature,
-                },
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-
-    def _parse_json(self, text: str) -> dict | list | None:
-        """解析大模型返回的 JSON，带容错处理"""
-        text = text.strip()
-        if text.startswith("```"):
-            text = text.split("```")[1]
-            if text.startswith("json"):
-                text = text[4:]
+        """调用通义千问聊天接口，返回原始文本"""
+        client = get_http_client()
+        response = await client.post(
+            f"{self.base_url}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": self.model,
+                "messages": messages,
+                "temperature": temperature,
+            },
+            timeout=httpx.Timeout(settings.knowledge_timeout, connect=settings.http_connect_timeout),
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result["choices"][0]["message"]["content"]
+
+    async def extract_knowledge_and_practices(self, raw_text: str, use_cache: bool = True) -> dict:
+        """从内容中提炼知识点、最佳实践和摘要（长文档按分块并发提取后归并去重）"""
+        chunks = split_text(raw_text, settings.chunk_max_tokens)
+        if len(chunks) == 1:
+            return await self._extract_chunk(raw_text, use_cache) or self._failed_result()
+
+        semaphore = asyncio.Semaphore(max(1, settings.chunk_concurrency))
+
+        async def extract(chunk: str) -> dict | None:
+            async with semaphore:
+                return await self._extract_chunk(chunk, use_cache)
+
+        partials = await asyncio.gather(*(extract(chunk) for chunk in chunks))
+        return self._merge_results(partials)
+
+    async def extract_knowledge_from_blocks(self, blocks: AsyncIterable[str], use_cache: bool = True) -> dict:
+        """边读取文本块边提炼：每凑满一个分块立即发起大模型调用，与后续文档解析重叠进行"""
+        semaphore = asyncio.Semaphore(max(1, settings.chunk_concurrency))
+
+        async def extract(chunk: str) -> dict | None:
+            async with semaphore:
+                return await self._extract_chunk(chunk, use_cache)
+
+        tasks: list[asyncio.Task] = []
         try:
-            return json.loads(text.strip())
-        except json.JSONDecodeError:
-            logger.error("JSON 解析失败，原始内容: %s", text[:500])
-            return None
+            async for chunk in aiter_chunks(blocks, settings.chunk_max_tokens):
+                tasks.append(asyncio.create_task(extract(chunk)))
+                await asyncio.sleep(0)  # 让出事件循环，使请求在继续解析前发出
+            partials = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        if len(partials) == 1:
+            return partials[0] or self._failed_result()
+        return self._merge_results(partials)
+
+    def _merge_results(self, partials: list[dict | None]) -> dict:
+        """归并各分块的提取结果：摘要按顺序拼接，知识点和最佳实践去重"""
+        partials = [p for p in partials if p]
+        if not partials:
+            return self._failed_result()
+
+        summaries = [p.get("summary", "").strip() for p in partials]
+        knowledge_points = [kp for p in partials for kp in p.get("knowledge_points") or []]
+        best_practices = [bp for p in partials for bp in p.get("best_practices") or []]
+        return {
+            "summary": "\n".join(s for s in summaries if s),
+            "knowledge_points": merge_unique(knowledge_points, "name", limit=settings.max_merged_points),
+            "best_practices": merge_unique(best_practices, "title", limit=settings.max_merged_points),
+        }
+
+    def _failed_result(self) -> dict:
+        """解析失败时返回的默认结构"""
+        return {
+            "summary": "内容解析失败，请重试。",
+            "knowledge_points": [],
+            "best_practices": [],
+        }
 
-    async def extract_knowledge_and_practices(self, raw_text: str) -> dict:
-        """从内容中提炼知识点、最佳实践和摘要"""
+    async def _extract_chunk(self, raw_text: str, use_cache: bool = True) -> dict | None:
+        """从单个分块中提炼知识点、最佳实践和摘要，解析失败返回 None"""
         prompt = f"""你是一位专业的知识管理专家。请对以下内容进行深度分析，提炼核心知识点并总结最佳实践。
 
 【内容】：
@@ -95,18 +149,14 @@ class KnowledgeService:
 只返回JSON，不要其他内容。"""
 
         messages = [{"role": "user", "content": prompt}]
-        result = await self._chat(messages, temperature=0.3)
-
-        parsed = self._parse_json(result)
-        if parsed and isinstance(parsed, dict):
-            return parsed
-
-        # 解析失败时返回默认结构
-        return {
-            "summary": "内容解析失败，请重试。",
-            "knowledge_points": [],
-            "best_practices": [],
-        }
+        try:
+            parsed = await llm_cache.chat_json(
+                self._chat, self.model, messages, temperature=0.3, expected=dict, use_cache=use_cache
+            )
+        except json.JSONDecodeError as e:
+            logger.error("JSON 解析失败，原始内容: %s", e.doc[:500])
+            return None
+        return parsed or None
 
 
 # 单例
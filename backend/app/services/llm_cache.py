@@ -0,0 +1,261 @@
+"""大模型响应缓存 - 内存 LRU + SQLite 持久化两级缓存"""
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def make_cache_key(model: str, messages: list[dict], temperature: float) -> str:
+    """按模型、提示词和温度生成内容寻址的缓存键"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_json_reply(text: str, expected: type = object) -> dict | list:
+    """解析大模型返回的 JSON（去掉 ```json 代码块标记），格式错误或类型不符时抛出 json.JSONDecodeError"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+    parsed = json.loads(text.strip())
+    if not isinstance(parsed, expected):
+        raise json.JSONDecodeError(f"期望 JSON {expected.__name__}，实际为 {type(parsed).__name__}", text, 0)
+    return parsed
+
+
+class LLMCache:
+    """两级 LLM 响应缓存
+
+    - 内存层：进程内 LRU，按条目数淘汰
+    - 持久层：SQLite 文件，按过期时间和最近访问时间淘汰
+    """
+
+    def __init__(
+        self,
+        path: str,
+        memory_size: int = 256,
+        max_entries: int = 10000,
+        ttl: int = 7 * 24 * 3600,
+        enabled: bool = True,
+    ):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ============ 持久层 ============
+
+    def _get_conn(self) -> sqlite3.Connection:
+        """懒加载 SQLite 连接并建表"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[tuple[str, float]]:
+        """从持久层读取，过期条目直接删除"""
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            row = conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return value, created_at
+
+    def _disk_set(self, key: str, value: str, created_at: float):
+        """写入持久层，超出容量时淘汰最久未访问的条目"""
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, created_at, created_at),
+            )
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (created_at - self.ttl,))
+            overflow = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+            conn.commit()
+
+    def _disk_delete(self, key: str):
+        """从持久层删除条目"""
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            conn.commit()
+
+    # ============ 内存层 ============
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        value, created_at = entry
+        if time.time() - created_at > self.ttl:
+            self._memory.pop(key, None)
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_set(self, key: str, value: str, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    # ============ 对外接口 ============
+
+    async def get(self, key: str) -> Optional[str]:
+        """查询缓存，依次尝试内存层和持久层"""
+        if not self.enabled:
+            return None
+
+        value = self._memory_get(key)
+        if value is not None:
+            self.hits += 1
+            self.memory_hits += 1
+            return value
+
+        try:
+            entry = await asyncio.to_thread(self._disk_get, key)
+        except sqlite3.Error as e:
+            logger.warning("LLM 缓存读取失败: %s", str(e))
+            entry = None
+
+        if entry is not None:
+            value, created_at = entry
+            self._memory_set(key, value, created_at)
+            self.hits += 1
+            self.disk_hits += 1
+            return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        """写入两级缓存"""
+        if not self.enabled:
+            return
+        created_at = time.time()
+        self._memory_set(key, value, created_at)
+        try:
+            await asyncio.to_thread(self._disk_set, key, value, created_at)
+        except sqlite3.Error as e:
+            logger.warning("LLM 缓存写入失败: %s", str(e))
+
+    async def delete(self, key: str):
+        """删除条目（缓存的响应无法解析时调用）"""
+        if not self.enabled:
+            return
+        self._memory.pop(key, None)
+        try:
+            await asyncio.to_thread(self._disk_delete, key)
+        except sqlite3.Error as e:
+            logger.warning("LLM 缓存删除失败: %s", str(e))
+
+    async def chat_json(
+        self,
+        chat: Callable[[list[dict], float], Awaitable[str]],
+        model: str,
+        messages: list[dict],
+        temperature: float = 0.7,
+        expected: type = object,
+        use_cache: bool = True,
+    ) -> dict | list:
+        """经缓存调用聊天接口 chat 并解析 JSON（use_cache=False 时跳过缓存读取）
+
+        只有解析成功的响应才写入缓存；解析失败抛出 json.JSONDecodeError，重试时会重新请求模型。
+        """
+        key = make_cache_key(model, messages, temperature)
+        if use_cache:
+            cached = await self.get(key)
+            if cached is not None:
+                try:
+                    return parse_json_reply(cached, expected)
+                except json.JSONDecodeError:
+                    await self.delete(key)
+
+        content = await chat(messages, temperature)
+        parsed = parse_json_reply(content, expected)
+        await self.set(key, content)
+        return parsed
+
+    def clear(self):
+        """清空两级缓存"""
+        self._memory.clear()
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+    def stats(self) -> dict:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+# 单例
+llm_cache = LLMCache(
+    path=settings.llm_cache_path,
+    memory_size=settings.llm_cache_memory_size,
+    max_entries=settings.llm_cache_max_entries,
+    ttl=settings.llm_cache_ttl,
+    enabled=settings.llm_cache_enabled,
+)
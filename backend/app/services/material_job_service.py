@@ -0,0 +1,253 @@
+"""资料处理后台任务队列 - 数据库表持久化 + 协程工作池"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.models import Material, MaterialStatus, MaterialJob, Question, QuestionType, TaskStatus
+from app.services.job_lease import JobLease
+from app.services.qwen_service import qwen_service
+from app.services import gamification_service as gs
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def save_generated_questions(db: Session, material_id: int, questions_data: list[dict]):
+    """将大模型生成的题目写入数据库"""
+    for q_data in questions_data:
+        answer = q_data.get("answer", "")
+        if isinstance(answer, list):
+            answer = ",".join(answer)
+
+        question = Question(
+            material_id=material_id,
+            type=QuestionType(q_data.get("type", "single_choice")),
+            difficulty=q_data.get("difficulty", 3),
+            content=q_data.get("content", ""),
+            options=q_data.get("options"),
+            answer=str(answer),
+            explanation=q_data.get("explanation", ""),
+        )
+        db.add(question)
+
+
+class MaterialJobQueue:
+    """资料处理任务队列
+
+    任务行写入 material_jobs 表，工作协程通过条件更新抢占任务，
+    多个进程共享同一数据库时也不会重复执行；执行中的任务由租约保护，
+    只有持有进程停止续约超过租约时长后才会被重新领取。
+    """
+
+    def __init__(self, worker_count: int = 2, poll_interval: float = 2.0, lease_seconds: float = 60.0):
+        self.worker_count = worker_count
+        self.poll_interval = poll_interval
+        self.lease = JobLease(MaterialJob, lease_seconds)
+        self._workers: list[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    # ============ 入队 ============
+
+    async def enqueue(self, db: AsyncSession, material: Material) -> MaterialJob:
+        """为资料创建处理任务并唤醒工作协程"""
+        job = MaterialJob(
+            material_id=material.id,
+            status=TaskStatus.PENDING,
+            step="queued",
+            progress=0,
+            message="排队等待处理...",
+        )
+        db.add(job)
+        await db.commit()
+        self.notify()
+        return job
+
+    def notify(self):
+        """通知空闲的工作协程有新任务"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def get_latest_job(self, db: AsyncSession, material_id: int) -> Optional[MaterialJob]:
+        """获取资料最近一次处理任务"""
+        return await db.scalar(
+            select(MaterialJob)
+            .where(MaterialJob.material_id == material_id)
+            .order_by(MaterialJob.id.desc())
+            .limit(1)
+        )
+
+    # ============ 工作池生命周期 ============
+
+    async def start(self):
+        """启动工作池和租约续约（异常退出进程遗留的执行中任务在租约过期后由抢占逻辑重新领取）"""
+        self._wakeup = asyncio.Event()
+        self.lease.start()
+        self._workers = [
+            asyncio.create_task(self._worker_loop(i)) for i in range(max(1, self.worker_count))
+        ]
+        logger.info("资料处理工作池已启动，工作协程数: %d", len(self._workers))
+
+    async def stop(self):
+        """停止工作池，并将本进程执行中的任务放回队列"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.lease.stop(step="queued", message="服务重启，重新排队...")
+
+    async def _worker_loop(self, index: int):
+        """工作协程：循环抢占并执行任务，队列为空时等待唤醒或轮询"""
+        while True:
+            try:
+                job_id = await self._claim_next()
+            except Exception as e:
+                logger.error("抢占任务失败 [worker:%d]: %s", index, str(e))
+                job_id = None
+
+            if job_id is not None:
+                try:
+                    await self._run_job(job_id)
+                except Exception as e:
+                    # 任务记账等意外错误不能让工作协程退出，否则任务停留在执行中且工作池逐渐缩小
+                    logger.error("执行任务异常 [worker:%d job:%d]: %s", index, job_id, str(e), exc_info=True)
+                    await self._fail_job(job_id, str(e))
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim_next(self) -> Optional[int]:
+        """抢占最早入队的待处理任务（或租约已过期的执行中任务），返回任务ID"""
+        async with AsyncSessionLocal() as db:
+            candidates = (await db.scalars(
+                select(MaterialJob.id)
+                .where(self.lease.claimable())
+                .order_by(MaterialJob.id)
+                .limit(self.worker_count + 1)
+            )).all()
+            for job_id in candidates:
+                result = await db.execute(
+                    update(MaterialJob)
+                    .where(MaterialJob.id == job_id, self.lease.claimable())
+                    .values(
+                        **self.lease.claim_values(),
+                        started_at=datetime.now(),
+                        attempts=MaterialJob.attempts + 1,
+                    )
+                )
+                await db.commit()
+                if result.rowcount == 1:
+                    return job_id
+            return None
+
+    async def _fail_job(self, job_id: int, error: str):
+        """在新会话中将任务及其资料标记为失败"""
+        try:
+            async with AsyncSessionLocal() as db:
+                material_id = await db.scalar(select(MaterialJob.material_id).where(MaterialJob.id == job_id))
+                await db.execute(
+                    update(MaterialJob)
+                    .where(MaterialJob.id == job_id, MaterialJob.status == TaskStatus.PROCESSING)
+                    .values(
+                        status=TaskStatus.FAILED,
+                        step="error",
+                        progress=0,
+                        message=f"处理失败: {error}"[:200],
+                        error_message=error,
+                        finished_at=datetime.now(),
+                    )
+                )
+                if material_id is not None:
+                    await db.execute(
+                        update(Material)
+                        .where(Material.id == material_id, Material.status != MaterialStatus.PROCESSED)
+                        .values(status=MaterialStatus.FAILED)
+                    )
+                await db.commit()
+        except Exception as e:
+            logger.error("标记任务失败出错 [job:%d]: %s", job_id, str(e))
+
+    # ============ 任务执行 ============
+
+    async def _report(self, db: AsyncSession, job: MaterialJob, step: str, progress: int, message: str):
+        """更新任务进度"""
+        job.step = step
+        job.progress = progress
+        job.message = message
+        await db.commit()
+
+    async def _run_job(self, job_id: int):
+        """执行资料处理：提炼知识点 -> 生成题目 -> 保存题目"""
+        async with AsyncSessionLocal() as db:
+            job = await db.scalar(
+                select(MaterialJob)
+                .where(MaterialJob.id == job_id)
+                .options(selectinload(MaterialJob.material).selectinload(Material.direction))
+            )
+            material = job.material if job else None
+            if material is None:
+                if job:
+                    job.status = TaskStatus.FAILED
+                    job.error_message = "资料不存在"
+                    job.finished_at = datetime.now()
+                    await db.commit()
+                return
+
+            try:
+                direction_name = material.direction.name if material.direction else "通用"
+
+                # 1. 提炼知识点
+                await self._report(db, job, "extracting", 10, "正在提炼知识点...")
+                key_points = await qwen_service.extract_key_points(material.content, direction_name)
+                material.key_points = key_points
+                await self._report(db, job, "extracted", 40, f"知识点提炼完成，共{len(key_points)}个")
+
+                # 2. 生成题目
+                await self._report(db, job, "generating", 50, "正在生成题目...")
+                questions_data = await qwen_service.generate_questions(key_points, direction_name)
+                await self._report(db, job, "generated", 70, f"题目生成完成，共{len(questions_data)}道")
+
+                # 3. 保存题目
+                await self._report(db, job, "saving", 80, "正在保存题目...")
+                await db.run_sync(save_generated_questions, material.id, questions_data)
+
+                material.status = MaterialStatus.PROCESSED
+                job.status = TaskStatus.COMPLETED
+                job.step = "completed"
+                job.progress = 100
+                job.message = "处理完成！"
+                job.finished_at = datetime.now()
+                await db.commit()
+            except Exception as e:
+                logger.error("处理资料失败 [ID:%s]: %s", material.id, str(e), exc_info=True)
+                await db.rollback()
+                material.status = MaterialStatus.FAILED
+                job.status = TaskStatus.FAILED
+                job.step = "error"
+                job.progress = 0
+                job.message = f"处理失败: {str(e)}"[:200]
+                job.error_message = str(e)
+                job.finished_at = datetime.now()
+                await db.commit()
+                return
+
+            # 游戏化：资料上传成功（游戏化服务基于同步会话，通过 run_sync 执行）
+            await db.run_sync(gs.run_event, gs.on_material_uploaded, material)
+
+
+# 单例
+material_job_queue = MaterialJobQueue(
+    worker_count=settings.material_worker_count,
+    poll_interval=settings.job_poll_interval,
+    lease_seconds=settings.job_lease_seconds,
+)
@@ -1,28 +1,76 @@
 """核心解析服务 - 协调文本提取和大模型分析"""
 import logging
+from contextlib import aclosing
 from datetime import datetime
+from typing import AsyncIterator
 
 from fastapi import UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only, selectinload, with_expression
 
+from app.core.config import get_settings
+from app.core.pagination import keyset_page
 from app.models.models import ParseTask, KnowledgePoint, BestPractice, SourceType, TaskStatus
 from app.services.knowledge_service import knowledge_service
-from app.services.extractor_service import extractor_service
+from app.services.extractor_service import BLOCK_SEPARATOR, extractor_service
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+# 任务列表默认返回的字段（与 TaskListResponse 一致）
+TASK_LIST_FIELDS = (
+    "id", "direction_id", "title", "source_type", "summary", "status",
+    "knowledge_point_count", "best_practice_count", "created_at", "updated_at",
+)
+TASK_COLUMN_NAMES = {column.key for column in ParseTask.__table__.columns}
+
+
+def _count_children(model):
+    """任务关联记录数的相关子查询"""
+    return (
+        select(func.count(model.id))
+        .where(model.task_id == ParseTask.id)
+        .correlate(ParseTask)
+        .scalar_subquery()
+    )
 
 
 class ParseService:
     """核心解析服务"""
 
-    async def _do_analysis(self, task: ParseTask, raw_text: str, db: Session):
-        """执行大模型分析并保存结果"""
-        task.raw_text = raw_text
-        task.status = TaskStatus.PROCESSING
-        db.commit()
+    async def _load_task(self, db: AsyncSession, task_id: int) -> ParseTask:
+        """加载任务及其知识点和最佳实践（异步会话不支持延迟加载，需预先加载关联）"""
+        return await db.scalar(
+            select(ParseTask)
+            .where(ParseTask.id == task_id)
+            .options(selectinload(ParseTask.knowledge_points), selectinload(ParseTask.best_practices))
+            .execution_options(populate_existing=True)
+        )
 
-        # 调用千问分析
-        result = await knowledge_service.extract_knowledge_and_practices(raw_text)
+    async def _do_analysis(self, task: ParseTask, content: str | AsyncIterator[str], db: AsyncSession):
+        """执行大模型分析并保存结果；content 为文本块异步迭代器时边解析边分析，结束后（含失败）保存已读取的原文"""
+        task.status = TaskStatus.PROCESSING
+        if isinstance(content, str):
+            task.raw_text = content
+            await db.commit()
+            # 调用千问分析
+            result = await knowledge_service.extract_knowledge_and_practices(content)
+        else:
+            await db.commit()
+            blocks: list[str] = []
+
+            async def collect() -> AsyncIterator[str]:
+                async for block in content:
+                    blocks.append(block)
+                    yield block
+
+            try:
+                result = await knowledge_service.extract_knowledge_from_blocks(collect())
+            finally:
+                # 分析中途失败时也保存已读取的原文，由调用方随失败状态一并提交
+                task.raw_text = BLOCK_SEPARATOR.join(blocks)
 
         # 保存摘要
         task.summary = result.get("summary", "")
@@ -51,21 +99,19 @@ class ParseService:
 
         task.status = TaskStatus.COMPLETED
         task.updated_at = datetime.now()
-        db.commit()
-        db.refresh(task)
+        await db.commit()
 
-    async def parse_text(self, title: str, text: str, db: Session, direction_id: int | None = None) -> ParseTask:
+    async def parse_text(self, title: str, text: str, db: AsyncSession, direction_id: int | None = None) -> ParseTask:
         """解析纯文本"""
         task = ParseTask(
             title=title,
             direction_id=direction_id,
             source_type=SourceType.TEXT,
-            source_content=text[:500],  # 保存前500字作为来源记录
+            source_content=text[:settings.parse_source_preview_chars],  # 保存开头部分作为来源记录
             status=TaskStatus.PENDING,
         )
         db.add(task)
-        db.commit()
-        db.refresh(task)
+        await db.commit()
 
         try:
             await self._do_analysis(task, text, db)
@@ -74,12 +120,11 @@ class ParseService:
             task.status = TaskStatus.FAILED
             task.error_message = str(e)
             task.updated_at = datetime.now()
-            db.commit()
-            db.refresh(task)
+            await db.commit()
 
-        return task
+        return await self._load_task(db, task.id)
 
-    async def parse_file(self, title: str, file: UploadFile, db: Session, direction_id: int | None = None) -> ParseTask:
+    async def parse_file(self, title: str, file: UploadFile, db: AsyncSession, direction_id: int | None = None) -> ParseTask:
         """解析上传文件"""
         task = ParseTask(
             title=title,
@@ -89,23 +134,21 @@ class ParseService:
             status=TaskStatus.PENDING,
         )
         db.add(task)
-        db.commit()
-        db.refresh(task)
+        await db.commit()
 
         try:
-            raw_text = await extractor_service.extract_from_file(file)
-            await self._do_analysis(task, raw_text, db)
+            async with aclosing(extractor_service.iter_text_blocks(file)) as blocks:
+                await self._do_analysis(task, blocks, db)
         except Exception as e:
             logger.error("文件解析失败: %s", str(e))
             task.status = TaskStatus.FAILED
             task.error_message = str(e)
             task.updated_at = datetime.now()
-            db.commit()
-            db.refresh(task)
+            await db.commit()
 
-        return task
+        return await self._load_task(db, task.id)
 
-    async def parse_url(self, title: str, url: str, db: Session, direction_id: int | None = None) -> ParseTask:
+    async def parse_url(self, title: str, url: str, db: AsyncSession, direction_id: int | None = None) -> ParseTask:
         """解析 URL 内容"""
         task = ParseTask(
             title=title,
@@ -115,34 +158,69 @@ class ParseService:
             status=TaskStatus.PENDING,
         )
         db.add(task)
-        db.commit()
-        db.refresh(task)
+        await db.commit()
 
         try:
-            raw_text = await extractor_service.extract_from_url(url)
-            await self._do_analysis(task, raw_text, db)
+            async with aclosing(extractor_service.iter_text_blocks(url)) as blocks:
+                await self._do_analysis(task, blocks, db)
         except Exception as e:
             logger.error("URL 解析失败: %s", str(e))
             task.status = TaskStatus.FAILED
             task.error_message = str(e)
             task.updated_at = datetime.now()
-            db.commit()
-            db.refresh(task)
+            await db.commit()
+
+        return await self._load_task(db, task.id)
+
+    async def parse_page(
+        self, title: str, url: str, text: str, db: AsyncSession, direction_id: int | None = None
+    ) -> ParseTask:
+        """解析已抓取的网页正文（批量导入时由批次统一抓取，不再重复请求）"""
+        task = ParseTask(
+            title=title,
+            direction_id=direction_id,
+            source_type=SourceType.URL,
+            source_content=url,
+            status=TaskStatus.PENDING,
+        )
+        db.add(task)
+        await db.commit()
+
+        try:
+            await self._do_analysis(task, text, db)
+        except Exception as e:
+            logger.error("网页解析失败: %s", str(e))
+            task.status = TaskStatus.FAILED
+            task.error_message = str(e)
+            task.updated_at = datetime.now()
+            await db.commit()
 
         return task
 
-    def get_tasks(self, db: Session, skip: int = 0, limit: int = 20, direction_id: int | None = None) -> list[ParseTask]:
-        """获取任务列表"""
-        query = db.query(ParseTask)
+    def get_tasks(
+        self,
+        db: Session,
+        cursor: str | None = None,
+        limit: int = 20,
+        direction_id: int | None = None,
+        fields: list[str] | None = None,
+    ) -> tuple[list[ParseTask], str | None]:
+        """获取任务列表（游标分页），返回 (当前页, 下一页游标)
+
+        只加载列表所需的列（不读取 source_content / raw_text 等大字段），
+        知识点和最佳实践数量通过关联子查询一并取出。
+        """
+        columns = fields or TASK_LIST_FIELDS
+        query = db.query(ParseTask).options(load_only(
+            *(getattr(ParseTask, name) for name in {"id", "created_at", *columns} if name in TASK_COLUMN_NAMES)
+        ))
+        if "knowledge_point_count" in columns:
+            query = query.options(with_expression(ParseTask.knowledge_point_count, _count_children(KnowledgePoint)))
+        if "best_practice_count" in columns:
+            query = query.options(with_expression(ParseTask.best_practice_count, _count_children(BestPractice)))
         if direction_id is not None:
             query = query.filter(ParseTask.direction_id == direction_id)
-        return (
-            query
-            .order_by(ParseTask.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        return keyset_page(query, ParseTask, cursor, limit)
 
     def get_task_detail(self, task_id: int, db: Session) -> ParseTask | None:
         """获取任务详情（含关联数据）"""
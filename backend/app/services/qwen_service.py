@@ -1,11 +1,17 @@
 """通义千问 API 服务封装"""
+import asyncio
 import json
 import httpx
 from typing import Optional
 from app.core.config import get_settings
+from app.core.http_client import get_http_client
+from app.services.llm_cache import llm_cache
+from app.services.text_chunker import split_text, merge_unique
 
 settings = get_settings()
 
+KEY_POINT_FAILED = "知识点提取失败"
+
 
 class QwenService:
     """通义千问 API 服务"""
@@ -16,26 +22,49 @@ class QwenService:
         self.base_url = settings.qwen_base_url
         
     async def _chat(self, messages: list[dict], temperature: float = 0.7) -> str:
-        """调用通义千问聊天接口"""
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": temperature,
-                },
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+        """调用通义千问聊天接口，返回原始文本"""
+        client = get_http_client()
+        response = await client.post(
+            f"{self.base_url}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": self.model,
+                "messages": messages,
+                "temperature": temperature,
+            },
+            timeout=httpx.Timeout(settings.qwen_timeout, connect=settings.http_connect_timeout),
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result["choices"][0]["message"]["content"]
+
+    async def extract_key_points(self, content: str, direction: str, use_cache: bool = True) -> list[dict]:
+        """从资料中提炼核心知识点（长文档按分块并发提取后归并去重）"""
+        chunks = split_text(content, settings.chunk_max_tokens)
+        if len(chunks) == 1:
+            return await self._extract_key_points_chunk(content, direction, use_cache)
+        
+        semaphore = asyncio.Semaphore(max(1, settings.chunk_concurrency))
+        
+        async def extract(chunk: str) -> list[dict]:
+            async with semaphore:
+                return await self._extract_key_points_chunk(chunk, direction, use_cache)
+        
+        partials = await asyncio.gather(*(extract(chunk) for chunk in chunks))
+        
+        # 归并：过滤提取失败的分块，按知识点名称去重
+        points = [
+            p for part in partials if isinstance(part, list)
+            for p in part if isinstance(p, dict) and p.get("point") != KEY_POINT_FAILED
+        ]
+        merged = merge_unique(points, "point", limit=settings.max_merged_points)
+        return merged or partials[0]
     
-    async def extract_key_points(self, content: str, direction: str) -> list[dict]:
-        """从资料中提炼核心知识点"""
+    async def _extract_key_points_chunk(self, content: str, direction: str, use_cache: bool = True) -> list[dict]:
+        """从单个分块中提炼核心知识点"""
         prompt = f"""你是一位专业的{direction}领域教师。请从以下学习资料中提炼5-10个核心知识点。
 
 学习资料：
@@ -49,25 +78,19 @@ class QwenService:
 只返回JSON数组，不要其他内容。"""
 
         messages = [{"role": "user", "content": prompt}]
-        result = await self._chat(messages, temperature=0.3)
-        
-        # 解析JSON
         try:
-            # 尝试提取JSON部分
-            result = result.strip()
-            if result.startswith("```"):
-                result = result.split("```")[1]
-                if result.startswith("json"):
-                    result = result[4:]
-            return json.loads(result)
-        except json.JSONDecodeError:
-            return [{"point": "知识点提取失败", "description": result, "importance": 3}]
+            return await llm_cache.chat_json(
+                self._chat, self.model, messages, temperature=0.3, expected=list, use_cache=use_cache
+            )
+        except json.JSONDecodeError as e:
+            return [{"point": KEY_POINT_FAILED, "description": e.doc, "importance": 3}]
     
     async def generate_questions(
         self, 
         key_points: list[dict], 
         direction: str,
-        question_types: Optional[list[str]] = None
+        question_types: Optional[list[str]] = None,
+        use_cache: bool = True,
     ) -> list[dict]:
         """基于知识点生成题目"""
         if question_types is None:
@@ -99,16 +122,10 @@ class QwenService:
 只返回JSON数组，不要其他内容。"""
 
         messages = [{"role": "user", "content": prompt}]
-        result = await self._chat(messages, temperature=0.5)
-        
-        # 解析JSON
         try:
-            result = result.strip()
-            if result.startswith("```"):
-                result = result.split("```")[1]
-                if result.startswith("json"):
-                    result = result[4:]
-            return json.loads(result)
+            return await llm_cache.chat_json(
+                self._chat, self.model, messages, temperature=0.5, expected=list, use_cache=use_cache
+            )
         except json.JSONDecodeError:
             return []
     
@@ -117,7 +134,8 @@ class QwenService:
         question: str,
         standard_answer: str,
         user_answer: str,
-        question_type: str
+        question_type: str,
+        use_cache: bool = True,
     ) -> dict:
         """评估主观题答案"""
         prompt = f"""你是一位专业的阅卷教师。请评估学生的答案。
@@ -137,16 +155,10 @@ class QwenService:
 只返回JSON对象，不要其他内容。"""
 
         messages = [{"role": "user", "content": prompt}]
-        result = await self._chat(messages, temperature=0.3)
-        
-        # 解析JSON
         try:
-            result = result.strip()
-            if result.startswith("```"):
-                result = result.split("```")[1]
-                if result.startswith("json"):
-                    result = result[4:]
-            return json.loads(result)
+            return await llm_cache.chat_json(
+                self._chat, self.model, messages, temperature=0.3, expected=dict, use_cache=use_cache
+            )
         except json.JSONDecodeError:
             return {"score": 0, "feedback": "评分失败，请重试"}
 
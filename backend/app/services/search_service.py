@@ -0,0 +1,306 @@
+"""全文检索服务 - 题目、资料、知识点与最佳实践的统一搜索
+
+SQLite 使用 FTS5 索引表存储中文二元切分后的词元（见 app.core.fts），结果按带列权重的 bm25 排序。
+触发器只使用 SQLite 内置语法：删除或修改业务行时同步删除索引行，新增或修改的行记入待索引表，
+由应用在检索前分词补写索引，因此不经过本应用的写入（命令行、迁移脚本等）同样能保持索引一致。
+MySQL 使用 InnoDB FULLTEXT 索引（ngram 解析器），由数据库自动维护，按 MATCH ... AGAINST 相关度排序。
+"""
+import html
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.fts import bigram_tokens, fts_match_query
+from app.models import Question, Material, KnowledgePoint, BestPractice
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 检索来源：columns 为索引列，weights 为 bm25 列权重（标题类列更高），title 为结果标题列
+SEARCH_SOURCES = {
+    "question": {
+        "model": Question,
+        "columns": ["content", "explanation"],
+        "weights": [2.0, 1.0],
+        "title": "content",
+    },
+    "material": {
+        "model": Material,
+        "columns": ["title", "content"],
+        "weights": [10.0, 1.0],
+        "title": "title",
+    },
+    "knowledge_point": {
+        "model": KnowledgePoint,
+        "columns": ["name", "description"],
+        "weights": [10.0, 1.0],
+        "title": "name",
+    },
+    "best_practice": {
+        "model": BestPractice,
+        "columns": ["title", "content", "scenario", "notes"],
+        "weights": [10.0, 1.0, 1.0, 1.0],
+        "title": "title",
+    },
+}
+
+MAX_QUERY_TERMS = 10
+
+# SQLite 待索引表：触发器记录新增或修改的行 (来源, 行ID)，由 sync_search_index 分词后写入索引
+PENDING_TABLE = "search_index_pending"
+SYNC_BATCH_SIZE = 500
+
+
+def _fts_table(source: dict) -> str:
+    return f"{source['model'].__tablename__}_fts"
+
+
+def _sqlite_ddl(kind: str, source: dict) -> list[str]:
+    """FTS5 索引表及触发器：删除和修改时按 rowid 删除索引行，新增和修改的行记入待索引表"""
+    table = source["model"].__tablename__
+    fts = _fts_table(source)
+    names = ", ".join(source["columns"])
+    mark_new = f"INSERT OR IGNORE INTO {PENDING_TABLE}(source, row_id) VALUES ('{kind}', new.id);"
+    delete_old = f"DELETE FROM {fts} WHERE rowid = old.id;"
+    unmark_old = f"DELETE FROM {PENDING_TABLE} WHERE source = '{kind}' AND row_id = old.id;"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, tokenize='unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {mark_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} {unmark_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} "
+        f"BEGIN {delete_old} {mark_new} END",
+    ]
+
+
+def _is_legacy_sqlite_index(conn: Connection, fts: str) -> bool:
+    """旧版索引为无内容表，触发器调用应用注册的 fts_bigrams 函数，需要重建"""
+    rows = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE name IN (:fts, :trigger)"),
+        {"fts": fts, "trigger": f"{fts}_ai"},
+    ).scalars().all()
+    return any("fts_bigrams" in sql or "content=''" in sql for sql in rows if sql)
+
+
+def _ensure_sqlite_index(engine: Engine, rebuild: bool) -> list[str]:
+    created = []
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {PENDING_TABLE} ("
+            f"source VARCHAR(20) NOT NULL, row_id INTEGER NOT NULL, PRIMARY KEY (source, row_id)) WITHOUT ROWID"
+        ))
+        for kind, source in SEARCH_SOURCES.items():
+            table = source["model"].__tablename__
+            fts = _fts_table(source)
+            if rebuild or _is_legacy_sqlite_index(conn, fts):
+                for suffix in ("ai", "ad", "au"):
+                    conn.execute(text(f"DROP TRIGGER IF EXISTS {fts}_{suffix}"))
+                conn.execute(text(f"DROP TABLE IF EXISTS {fts}"))
+                conn.execute(text(f"DELETE FROM {PENDING_TABLE} WHERE source = :kind"), {"kind": kind})
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts}
+            ).first()
+            for ddl in _sqlite_ddl(kind, source):
+                conn.execute(text(ddl))
+            # 排序函数写入索引配置：ORDER BY rank 即按带列权重的 bm25 排序
+            weights = ", ".join(str(w) for w in source["weights"])
+            conn.execute(text(f"INSERT INTO {fts}({fts}, rank) VALUES ('rank', 'bm25({weights})')"))
+            if not exists:
+                # 新建索引时把已有数据全部记为待索引，随后统一分词回填
+                conn.execute(text(
+                    f"INSERT OR IGNORE INTO {PENDING_TABLE}(source, row_id) SELECT '{kind}', id FROM {table}"
+                ))
+                created.append(fts)
+                logger.info("已创建全文索引 %s ON %s", fts, table)
+        sync_search_index(conn)
+    return created
+
+
+def sync_search_index(db: Session | Connection) -> int:
+    """将待索引表中的行分词后写入 FTS5 索引（仅 SQLite），返回处理行数；由调用方提交"""
+    bind = db.get_bind() if isinstance(db, Session) else db
+    if bind.dialect.name != "sqlite":
+        return 0
+    if db.execute(text(f"SELECT 1 FROM {PENDING_TABLE} LIMIT 1")).first() is None:
+        return 0
+
+    synced = 0
+    for kind, source in SEARCH_SOURCES.items():
+        table = source["model"].__tablename__
+        fts = _fts_table(source)
+        columns = source["columns"]
+        names = ", ".join(columns)
+        insert_rows = text(f"INSERT INTO {fts}(rowid, {names}) VALUES (:id, {', '.join(':' + col for col in columns)})")
+        select_rows = text(f"SELECT id, {names} FROM {table} WHERE id IN :ids").bindparams(
+            bindparam("ids", expanding=True)
+        )
+        while True:
+            ids = db.execute(
+                text(f"SELECT row_id FROM {PENDING_TABLE} WHERE source = :kind LIMIT :limit"),
+                {"kind": kind, "limit": SYNC_BATCH_SIZE},
+            ).scalars().all()
+            if not ids:
+                break
+            rows = db.execute(select_rows, {"ids": ids}).all()
+            db.execute(text(f"DELETE FROM {fts} WHERE rowid = :id"), [{"id": row_id} for row_id in ids])
+            if rows:
+                db.execute(
+                    insert_rows,
+                    [
+                        {"id": row[0], **{col: bigram_tokens(value) for col, value in zip(columns, row[1:])}}
+                        for row in rows
+                    ],
+                )
+            db.execute(
+                text(f"DELETE FROM {PENDING_TABLE} WHERE source = :kind AND row_id = :id"),
+                [{"kind": kind, "id": row_id} for row_id in ids],
+            )
+            synced += len(ids)
+    return synced
+
+
+def _ensure_mysql_index(engine: Engine, rebuild: bool) -> list[str]:
+    inspector = inspect(engine)
+    created = []
+    with engine.begin() as conn:
+        for source in SEARCH_SOURCES.values():
+            table = source["model"].__tablename__
+            name = f"ft_{table}"
+            existing = {ix["name"] for ix in inspector.get_indexes(table)}
+            if name in existing:
+                if not rebuild:
+                    continue
+                conn.execute(text(f"ALTER TABLE {table} DROP INDEX {name}"))
+            names = ", ".join(source["columns"])
+            conn.execute(text(f"ALTER TABLE {table} ADD FULLTEXT INDEX {name} ({names}) WITH PARSER ngram"))
+            created.append(name)
+            logger.info("已创建全文索引 %s ON %s", name, table)
+    return created
+
+
+def ensure_search_index(engine: Engine, rebuild: bool = False) -> list[str]:
+    """创建缺失的全文索引（SQLite 同时创建同步触发器），返回新建的索引名列表"""
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        return _ensure_sqlite_index(engine, rebuild)
+    if dialect == "mysql":
+        return _ensure_mysql_index(engine, rebuild)
+    logger.warning("数据库 %s 不支持全文检索，搜索接口不可用", dialect)
+    return []
+
+
+def parse_terms(query: str) -> list[str]:
+    """按空白拆分检索词并去重（多个词之间为 AND 关系）"""
+    terms = []
+    for term in query.split():
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def make_snippet(values: list[Optional[str]], terms: list[str], width: int) -> str:
+    """从首个命中的字段截取检索词附近的片段，命中词用 <mark> 标记（其余内容已转义）"""
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    fallback = ""
+    for value in values:
+        if not value:
+            continue
+        value = " ".join(value.split())
+        fallback = fallback or value
+        match = pattern.search(value)
+        if not match:
+            continue
+        start = max(0, match.start() - width // 3)
+        end = min(len(value), start + width)
+        fragment = value[start:end]
+        parts, pos = [], 0
+        for m in pattern.finditer(fragment):
+            parts.append(html.escape(fragment[pos:m.start()]))
+            parts.append(f"<mark>{html.escape(m.group())}</mark>")
+            pos = m.end()
+        parts.append(html.escape(fragment[pos:]))
+        return ("…" if start > 0 else "") + "".join(parts) + ("…" if end < len(value) else "")
+    return html.escape(fallback[:width]) + ("…" if len(fallback) > width else "")
+
+
+class SearchService:
+    """全文检索服务"""
+
+    def _mysql_against(self, terms: list[str]) -> str:
+        """布尔模式：每个检索词作为必须出现的短语"""
+        return " ".join('+"{}"'.format(term.replace('"', " ")) for term in terms)
+
+    def _search_source(self, db: Session, dialect: str, source: dict, terms: list[str], limit: int):
+        table = source["model"].__tablename__
+        columns = ", ".join(f"t.{col}" for col in source["columns"])
+        if dialect == "sqlite":
+            match = fts_match_query(terms)
+            if not match:
+                return []
+            fts = _fts_table(source)
+            # rank 为索引配置的带权 bm25，FTS5 在索引内排序取前 N，再回表读取原文
+            sql = (
+                f"SELECT t.id, {columns}, -m.rank FROM "
+                f"(SELECT rowid, rank FROM {fts} WHERE {fts} MATCH :q ORDER BY rank LIMIT :limit) AS m "
+                f"JOIN {table} AS t ON t.id = m.rowid ORDER BY m.rank"
+            )
+            params = {"q": match, "limit": limit}
+        elif dialect == "mysql":
+            names = ", ".join(source["columns"])
+            sql = (
+                f"SELECT t.id, {columns}, MATCH({names}) AGAINST(:q IN BOOLEAN MODE) AS score "
+                f"FROM {table} AS t WHERE MATCH({names}) AGAINST(:q IN BOOLEAN MODE) "
+                f"ORDER BY score DESC LIMIT :limit"
+            )
+            params = {"q": self._mysql_against(terms), "limit": limit}
+        else:
+            raise NotImplementedError(f"数据库 {dialect} 不支持全文检索")
+        return db.execute(text(sql), params).all()
+
+    def search(
+        self,
+        db: Session,
+        query: str,
+        types: Optional[list[str]] = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """跨来源检索，返回 {type, id, title, snippet, score}
+
+        各来源的相关度分数出自不同的索引，不能直接比较：每个来源内按相关度排序，
+        再按来源内名次交错合并，同一名次按来源内归一化分数（与该来源最高分之比）排序。
+        """
+        terms = parse_terms(query)
+        if not terms:
+            return []
+        dialect = db.get_bind().dialect.name
+        if sync_search_index(db):
+            db.commit()
+        width = settings.search_snippet_chars
+
+        ranked = []
+        for kind in types or SEARCH_SOURCES:
+            source = SEARCH_SOURCES[kind]
+            title_index = source["columns"].index(source["title"])
+            rows = self._search_source(db, dialect, source, terms, limit)
+            top = max((float(row[-1]) for row in rows), default=0.0)
+            for position, row in enumerate(rows):
+                values = list(row[1:-1])
+                title = " ".join((values[title_index] or "").split())
+                score = float(row[-1])
+                ranked.append((position, -(score / top if top > 0 else 0.0), {
+                    "type": kind,
+                    "id": row[0],
+                    "title": title[:width] + ("…" if len(title) > width else ""),
+                    "snippet": make_snippet(values, terms, width),
+                    "score": round(score, 6),
+                }))
+        ranked.sort(key=lambda item: item[:2])
+        return [hit for _, _, hit in ranked[:limit]]
+
+
+# 单例
+search_service = SearchService()
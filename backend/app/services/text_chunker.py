@@ -0,0 +1,174 @@
+"""长文本分块 - 按标题和段落切分，控制每块的 token 预算；并提供分块结果的归并去重"""
+import re
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+# Markdown 标题、中文章节编号（第X章/节、一、）、数字编号（1. / 1.2 ）
+_HEADING_RE = re.compile(
+    r"^(#{1,6}\s+.+|第[一二三四五六七八九十百零\d]+[章节部分篇].*|[一二三四五六七八九十]+、.+|\d+(\.\d+)*[\.、\s].{0,40})$"
+)
+_SENTENCE_RE = re.compile(r"(?<=[。！？!?；;\.])\s*")
+_CJK_RE = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+_NORMALIZE_RE = re.compile(r"[\s\W_]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符约 1 token/字，其余约 4 字符/token"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def is_heading(line: str) -> bool:
+    """判断一行是否为标题"""
+    line = line.strip()
+    return bool(line) and len(line) <= 80 and bool(_HEADING_RE.match(line))
+
+
+def split_blocks(text: str) -> Iterator[str]:
+    """将文本切分为块：标题单独成块，空行分隔段落"""
+    paragraph: list[str] = []
+    for line in text.splitlines():
+        if not line.strip():
+            if paragraph:
+                yield "\n".join(paragraph)
+                paragraph = []
+        elif is_heading(line):
+            if paragraph:
+                yield "\n".join(paragraph)
+                paragraph = []
+            yield line.strip()
+        else:
+            paragraph.append(line)
+    if paragraph:
+        yield "\n".join(paragraph)
+
+
+def _hard_split(sentence: str, max_tokens: int) -> Iterator[str]:
+    """按 token 预算对应的字符数硬切，尽量在空白处断开"""
+    while estimate_tokens(sentence) > max_tokens:
+        chars_per_token = len(sentence) / estimate_tokens(sentence)
+        cut = max(1, int(max_tokens * chars_per_token))
+        space = sentence.rfind(" ", cut // 2, cut)
+        if space > 0:
+            cut = space
+        yield sentence[:cut]
+        sentence = sentence[cut:].lstrip()
+    if sentence:
+        yield sentence
+
+
+def _split_oversized(block: str, max_tokens: int) -> Iterator[str]:
+    """超出预算的单个段落先按句子切分，仍过长的句子再硬切"""
+    buf = ""
+    for sentence in _SENTENCE_RE.split(block):
+        if not sentence:
+            continue
+        for piece in _hard_split(sentence, max_tokens):
+            if buf and estimate_tokens(buf) + estimate_tokens(piece) > max_tokens:
+                yield buf
+                buf = ""
+            buf += piece
+    if buf:
+        yield buf
+
+
+class _ChunkPacker:
+    """分块装箱状态：逐块加入，返回已装满的分块
+
+    标题会开启新的分块（当前分块已过半预算时），使分块尽量按章节对齐。
+    """
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.current: list[str] = []
+        self.current_tokens = 0
+
+    def add(self, block: str) -> list[str]:
+        block = block.strip()
+        if not block:
+            return []
+
+        full = []
+        tokens = estimate_tokens(block)
+        pieces = [block] if tokens <= self.max_tokens else _split_oversized(block, self.max_tokens)
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            starts_section = is_heading(piece) and self.current_tokens > self.max_tokens // 2
+            if self.current and (self.current_tokens + tokens > self.max_tokens or starts_section):
+                full.append("\n\n".join(self.current))
+                self.current, self.current_tokens = [], 0
+
+            self.current.append(piece)
+            self.current_tokens += tokens
+        return full
+
+    def flush(self) -> list[str]:
+        if not self.current:
+            return []
+        chunk = "\n\n".join(self.current)
+        self.current, self.current_tokens = [], 0
+        return [chunk]
+
+
+def iter_chunks(blocks: Iterable[str], max_tokens: int) -> Iterator[str]:
+    """将块序列装箱为不超过 max_tokens 的分块
+
+    接受任意可迭代对象，上游边解析边产出块时下游即可开始处理。
+    """
+    packer = _ChunkPacker(max_tokens)
+    for block in blocks:
+        yield from packer.add(block)
+    yield from packer.flush()
+
+
+async def aiter_chunks(blocks: AsyncIterable[str], max_tokens: int) -> AsyncIterator[str]:
+    """iter_chunks 的异步版本：上游异步产出块（如边读取边解析文档）时，每装满一个分块立即产出"""
+    packer = _ChunkPacker(max_tokens)
+    async for block in blocks:
+        for chunk in packer.add(block):
+            yield chunk
+    for chunk in packer.flush():
+        yield chunk
+
+
+def split_text(text: str, max_tokens: int) -> list[str]:
+    """将长文本切分为分块列表，短文本原样返回"""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    return list(iter_chunks(split_blocks(text), max_tokens))
+
+
+def merge_unique(items: Iterable[dict], key_field: str, limit: int | None = None) -> list[dict]:
+    """按名称字段归并去重分块结果
+
+    名称忽略大小写、空白和标点后相同视为重复，保留 importance 更高、
+    描述更完整的一条；结果按 importance 降序、首次出现顺序排列。
+    """
+    merged: dict[str, tuple[int, dict]] = {}
+    for order, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        key = _NORMALIZE_RE.sub("", str(item.get(key_field, ""))).lower()
+        if not key:
+            continue
+        if key not in merged:
+            merged[key] = (order, item)
+            continue
+        first_order, kept = merged[key]
+        if _item_rank(item) > _item_rank(kept):
+            merged[key] = (first_order, item)
+
+    result = sorted(merged.values(), key=lambda pair: (-_importance(pair[1]), pair[0]))
+    result = [item for _, item in result]
+    return result[:limit] if limit else result
+
+
+def _importance(item: dict) -> int:
+    try:
+        return int(item.get("importance", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _item_rank(item: dict) -> tuple[int, int]:
+    text_len = sum(len(str(v)) for v in item.values() if isinstance(v, str))
+    return _importance(item), text_len
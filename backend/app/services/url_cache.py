@@ -0,0 +1,199 @@
+"""网页抓取缓存 - 按 URL 持久化 ETag/Last-Modified 与提取后的正文，支持条件请求复验
+
+再次提交同一 URL 时携带 If-None-Match / If-Modified-Since 请求，服务器返回 304
+即直接使用缓存的正文，跳过下载和 HTML 解析。缓存存放在 SQLite 文件中，
+按正文总字节数限制容量，超出时淘汰最久未访问的条目。
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class CachedPage:
+    """缓存的网页：校验信息与提取后的正文"""
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    text: str
+
+    def conditional_headers(self) -> dict[str, str]:
+        """复验请求头"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class URLCache:
+    """网页正文缓存（SQLite 持久化，按总字节数 LRU 淘汰）"""
+
+    def __init__(self, path: str, max_bytes: int = 100 * 1024 * 1024, enabled: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.lookups = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _get_conn(self) -> sqlite3.Connection:
+        """懒加载 SQLite 连接并建表"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS url_cache (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    text TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_url_cache_accessed_at ON url_cache (accessed_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _disk_get(self, url: str) -> Optional[CachedPage]:
+        """从持久层读取条目"""
+        with self._lock:
+            row = self._get_conn().execute(
+                "SELECT etag, last_modified, text FROM url_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedPage(url=url, etag=row[0], last_modified=row[1], text=row[2])
+
+    def _disk_touch(self, url: str):
+        """复验通过：刷新访问时间"""
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("UPDATE url_cache SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            conn.commit()
+
+    def _disk_set(self, page: CachedPage) -> Optional[int]:
+        """写入条目，先按访问时间淘汰出足够空间，返回淘汰条数；单条正文超过上限时不缓存，返回 None"""
+        now = time.time()
+        size = len(page.text.encode("utf-8"))
+        with self._lock:
+            conn = self._get_conn()
+            if size > self.max_bytes:
+                # 放不下的页面不缓存，也不为它淘汰其他条目；同一 URL 的旧正文已过时，一并删除
+                conn.execute("DELETE FROM url_cache WHERE url = ?", (page.url,))
+                conn.commit()
+                return None
+            overflow = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM url_cache WHERE url != ?", (page.url,)
+            ).fetchone()[0] + size - self.max_bytes
+            evicted = []
+            if overflow > 0:
+                for url, entry_size in conn.execute(
+                    "SELECT url, size FROM url_cache WHERE url != ? ORDER BY accessed_at ASC", (page.url,)
+                ):
+                    evicted.append((url,))
+                    overflow -= entry_size
+                    if overflow <= 0:
+                        break
+                conn.executemany("DELETE FROM url_cache WHERE url = ?", evicted)
+            conn.execute(
+                "INSERT OR REPLACE INTO url_cache (url, etag, last_modified, text, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (page.url, page.etag, page.last_modified, page.text, size, now, now),
+            )
+            conn.commit()
+        return len(evicted)
+
+    async def get(self, url: str) -> Optional[CachedPage]:
+        """查询缓存条目（用于构造复验请求），未命中返回 None"""
+        if not self.enabled:
+            return None
+        self.lookups += 1
+        try:
+            page = await asyncio.to_thread(self._disk_get, url)
+        except sqlite3.Error as e:
+            logger.warning("网页缓存读取失败: %s", str(e))
+            page = None
+        if page is None:
+            self.misses += 1
+        return page
+
+    async def revalidated_hit(self, page: CachedPage):
+        """服务器返回 304，记录命中并刷新访问时间"""
+        self.revalidated += 1
+        try:
+            await asyncio.to_thread(self._disk_touch, page.url)
+        except sqlite3.Error as e:
+            logger.warning("网页缓存更新失败: %s", str(e))
+
+    async def set(self, url: str, etag: Optional[str], last_modified: Optional[str], text: str):
+        """保存正文及校验信息；没有 ETag 和 Last-Modified 的页面无法复验，不缓存"""
+        if not self.enabled or not (etag or last_modified):
+            return
+        try:
+            evicted = await asyncio.to_thread(self._disk_set, CachedPage(url, etag, last_modified, text))
+        except sqlite3.Error as e:
+            logger.warning("网页缓存写入失败: %s", str(e))
+            return
+        if evicted is None:
+            logger.info("网页正文超过缓存上限，不缓存: %s", url)
+            return
+        self.stores += 1
+        self.evictions += evicted
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM url_cache")
+            conn.commit()
+
+    def stats(self) -> dict:
+        """命中统计与占用空间"""
+        entries, size = 0, 0
+        if self.enabled:
+            with self._lock:
+                entries, size = self._get_conn().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM url_cache"
+                ).fetchone()
+        return {
+            "enabled": self.enabled,
+            "lookups": self.lookups,
+            "revalidated_hits": self.revalidated,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.revalidated / self.lookups, 4) if self.lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# 单例
+url_cache = URLCache(
+    path=settings.url_cache_path,
+    max_bytes=settings.url_cache_max_bytes,
+    enabled=settings.url_cache_enabled,
+)
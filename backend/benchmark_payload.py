@@ -0,0 +1,132 @@
+"""列表响应基准 - 对比资料/解析任务列表在完整加载与摘要投影下的响应体积和耗时
+
+在临时 SQLite 库中生成资料（长正文 + 知识点）和解析任务（长原文），分别测量：
+  完整对象：加载整行 ORM 对象并按原响应模型序列化（MaterialResponse / 不含关联计数的 TaskListResponse）
+  摘要投影：列表接口当前的 load_only + 内容摘要 / 关联计数
+  稀疏字段：fields=id,title
+每种方式统计查询 + 序列化耗时（p50）和 JSON 体积。
+
+用法: python benchmark_payload.py [--rows 200] [--content-chars 20000] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker, load_only, with_expression
+
+from app.core.config import get_settings
+from app.core.database import Base
+from app.core.sparse_fields import load_only_fields
+from app.api.materials import MATERIAL_SUMMARY_COLUMNS, key_point_count
+from app.models import Direction, Material, MaterialStatus, ParseTask, KnowledgePoint, SourceType, TaskStatus
+from app.schemas.schemas import MaterialResponse, MaterialSummary, TaskListResponse
+from app.services.parse_service import parse_service
+
+settings = get_settings()
+
+
+def build(path: str, rows: int, content_chars: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    body = ("学习资料正文示例，包含较长的段落内容。" * (content_chars // 19 + 1))[:content_chars]
+    with Session() as db:
+        db.add(Direction(id=1, name="基准"))
+        for i in range(rows):
+            db.add(Material(
+                direction_id=1, title=f"资料 {i}", content=body, status=MaterialStatus.PROCESSED,
+                key_points=[{"point": f"知识点 {j}", "detail": "说明" * 20} for j in range(10)],
+            ))
+            task = ParseTask(
+                direction_id=1, title=f"任务 {i}", source_type=SourceType.TEXT, source_content=body,
+                raw_text=body, summary="摘要" * 50, status=TaskStatus.COMPLETED,
+            )
+            task.knowledge_points = [KnowledgePoint(name=f"知识点 {j}", description="描述") for j in range(5)]
+            db.add(task)
+        db.commit()
+    return engine, Session
+
+
+def measure(Session, fn, repeat: int) -> tuple[float, int]:
+    timings, size = [], 0
+    for _ in range(repeat):
+        with Session() as db:
+            start = time.perf_counter()
+            payload = fn(db)
+            timings.append((time.perf_counter() - start) * 1000)
+            size = len(payload)
+    return statistics.median(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表响应体积与耗时基准")
+    parser.add_argument("--rows", type=int, default=200, help="资料数和任务数")
+    parser.add_argument("--content-chars", type=int, default=20000, help="每条资料/任务的正文字数")
+    parser.add_argument("--repeat", type=int, default=20, help="重复次数")
+    args = parser.parse_args()
+
+    materials_full = TypeAdapter(list[MaterialResponse])
+    materials_summary = TypeAdapter(list[MaterialSummary])
+    tasks = TypeAdapter(list[TaskListResponse])
+    limit = args.rows
+
+    def material_full(db):
+        rows = db.query(Material).order_by(Material.created_at.desc(), Material.id.desc()).limit(limit).all()
+        return materials_full.dump_json(rows)
+
+    def material_summary(db):
+        preview = func.substr(Material.content, 1, settings.material_preview_chars)
+        rows = (
+            db.query(Material)
+            .options(
+                load_only(*(getattr(Material, col) for col in MATERIAL_SUMMARY_COLUMNS)),
+                with_expression(Material.content_preview, preview),
+                with_expression(Material.key_point_count, key_point_count(db)),
+            )
+            .order_by(Material.created_at.desc(), Material.id.desc()).limit(limit).all()
+        )
+        return materials_summary.dump_json(rows)
+
+    def material_sparse(db):
+        rows = (
+            db.query(Material).options(load_only_fields(Material, ["id", "title"]))
+            .order_by(Material.created_at.desc(), Material.id.desc()).limit(limit).all()
+        )
+        return materials_summary.dump_json(
+            [MaterialSummary.model_construct(id=m.id, title=m.title) for m in rows],
+            include={"__all__": {"id", "title"}},
+        )
+
+    def task_full(db):
+        rows = db.query(ParseTask).order_by(ParseTask.created_at.desc(), ParseTask.id.desc()).limit(limit).all()
+        return tasks.dump_json(rows)
+
+    def task_summary(db):
+        rows, _ = parse_service.get_tasks(db, limit=limit)
+        return tasks.dump_json(rows)
+
+    cases = [
+        ("资料列表", "完整对象", material_full),
+        ("资料列表", "摘要投影", material_summary),
+        ("资料列表", "稀疏字段 id,title", material_sparse),
+        ("任务列表", "完整对象", task_full),
+        ("任务列表", "摘要投影", task_summary),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, Session = build(os.path.join(tmp, "payload.db"), args.rows, args.content_chars)
+        print(f"{args.rows} 条资料 / 任务，正文 {args.content_chars} 字\n")
+        print("| 列表 | 方式 | 耗时 p50 (ms) | 响应体积 (KB) |")
+        print("| --- | --- | ---: | ---: |")
+        for name, mode, fn in cases:
+            elapsed, size = measure(Session, fn, args.repeat)
+            print(f"| {name} | {mode} | {elapsed:.2f} | {size / 1024:.1f} |")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""全文检索基准 - 在临时 SQLite 库中生成大量题目，测量 /search 的检索延迟
+
+题目内容由常见技术词汇随机组合而成，写入后由触发器记入待索引表，再分词补写索引（与线上写入路径一致），
+随后对高频词、低频词、多词组合和单字前缀分别检索，统计 p50 / p99 延迟。
+
+用法: python benchmark_search.py [--rows 1000000] [--repeat 50] [--dir .]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, configure_sqlite, sqlite_pragmas
+from app.models import Direction, Material, Question, QuestionType
+from app.services.search_service import ensure_search_index, search_service, sync_search_index
+
+WORDS = [
+    "机器学习", "深度学习", "神经网络", "梯度下降", "反向传播", "数据库", "索引", "事务", "隔离级别",
+    "哈希表", "二叉树", "红黑树", "链表", "队列", "操作系统", "进程", "线程", "协程", "内存管理",
+    "虚拟内存", "网络协议", "拥塞控制", "加密算法", "分布式", "一致性", "缓存", "负载均衡",
+    "Python", "Java", "SQL", "HTTP", "TCP", "Redis", "Docker",
+]
+FILLERS = ["是什么", "的原理", "如何实现", "有哪些特点", "与", "的区别", "在实际项目中", "请简述", "为什么", "常见问题"]
+RARE_WORD = "量子退火"
+
+QUERIES = {
+    "高频词": "机器学习",
+    "低频词": RARE_WORD,
+    "多词组合": "数据库 事务",
+    "单字前缀": "树",
+    "英文前缀": "pyth",
+}
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return "".join(rng.choice(WORDS) + rng.choice(FILLERS) for _ in range(words))
+
+
+def build(path: str, rows: int, batch: int = 10000):
+    """建库、写入题目并补写全文索引"""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    configure_sqlite(engine, sqlite_pragmas())
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    Session = sessionmaker(bind=engine)
+
+    rng = random.Random(42)
+    start = time.perf_counter()
+    with Session() as db:
+        db.add(Direction(id=1, name="基准"))
+        db.add(Material(id=1, direction_id=1, title="基准资料", content="基准"))
+        db.flush()
+        for offset in range(0, rows, batch):
+            db.execute(insert(Question), [
+                {
+                    "material_id": 1,
+                    "type": QuestionType.SHORT_ANSWER,
+                    "content": random_text(rng, 2) + ("？" if i % 1000 else RARE_WORD + "？"),
+                    "answer": "略",
+                    "explanation": random_text(rng, 3),
+                }
+                for i in range(offset, min(offset + batch, rows))
+            ])
+        db.commit()
+        sync_search_index(db)
+        db.commit()
+    return engine, Session, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全文检索延迟基准")
+    parser.add_argument("--rows", type=int, default=100000, help="题目数")
+    parser.add_argument("--repeat", type=int, default=50, help="每个查询重复次数")
+    parser.add_argument("--dir", default=None, help="数据库文件所在目录（默认系统临时目录）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        path = os.path.join(tmp, "search.db")
+        engine, Session, build_seconds = build(path, args.rows)
+        print(f"{args.rows} 道题目，写入含索引同步耗时 {build_seconds:.1f} 秒，库文件 {os.path.getsize(path) / 1e6:.0f} MB\n")
+
+        print("| 查询 | 检索词 | 结果数 | p50 (ms) | p99 (ms) |")
+        print("| --- | --- | ---: | ---: | ---: |")
+        with Session() as db:
+            for name, query in QUERIES.items():
+                latencies = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    hits = search_service.search(db, query, ["question"], limit=20)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                latencies.sort()
+                p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+                print(f"| {name} | {query} | {len(hits)} | {statistics.median(latencies):.2f} | {p99:.2f} |")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
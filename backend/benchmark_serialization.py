@@ -0,0 +1,110 @@
+"""序列化基准 - 对比大列表响应在不同 JSON 编码方式下的耗时
+
+构造 N 条题目 ORM 对象（不访问数据库，只测序列化），分别测量：
+  序列化层：
+    jsonable_encoder + json.dumps：校验后转为基础类型再用标准库编码（旧版 FastAPI 的默认路径）
+    model_dump + orjson：校验后转为 dict 再用 orjson 编码
+    TypeAdapter.dump_json：校验后由 pydantic-core 直接输出 JSON 字节（list_response）
+  接口层（TestClient 完整请求）：
+    response_model 默认：路由返回 ORM 对象，由 FastAPI 校验并序列化
+    response_model + ORJSONResponse：同上，但以 orjson 响应类为默认响应类
+    list_response：路由内一次校验并直接返回 JSON 字节
+每种方式统计耗时 p50 和响应体积。
+
+用法: python benchmark_serialization.py [--rows 10000] [--repeat 10]
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+
+import orjson
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from app.core.responses import ORJSONResponse, list_adapter, list_response
+from app.models import Question, QuestionType
+from app.schemas.schemas import QuestionResponse
+
+
+def build_rows(count: int) -> list[Question]:
+    now = datetime.now()
+    return [
+        Question(
+            id=i + 1, material_id=1, type=QuestionType.SINGLE_CHOICE, difficulty=3,
+            content=f"第 {i} 题：下列关于学习方法的说法中，哪一项是正确的？" * 2,
+            options=["A. 选项一", "B. 选项二", "C. 选项三", "D. 选项四"],
+            answer="A", explanation="解析说明：" + "该选项符合题意。" * 10,
+            created_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def measure(fn, repeat: int) -> tuple[float, int]:
+    fn()  # 预热（构建校验器、路由等）
+    timings, size = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(fn())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), size
+
+
+def make_client(rows: list, mode: str) -> TestClient:
+    if mode == "orjson":
+        app = FastAPI(default_response_class=ORJSONResponse)
+    else:
+        app = FastAPI()
+
+    @app.get("/questions", response_model=list[QuestionResponse])
+    def get_questions():
+        if mode == "list_response":
+            return list_response(rows, QuestionResponse)
+        return rows
+
+    return TestClient(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大列表 JSON 序列化基准")
+    parser.add_argument("--rows", type=int, default=10000, help="题目条数")
+    parser.add_argument("--repeat", type=int, default=10, help="重复次数")
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+    adapter = list_adapter(QuestionResponse)
+
+    def stdlib():
+        models = adapter.validate_python(rows, from_attributes=True)
+        return json.dumps(jsonable_encoder(models), ensure_ascii=False).encode("utf-8")
+
+    def dump_orjson():
+        models = adapter.validate_python(rows, from_attributes=True)
+        return orjson.dumps(adapter.dump_python(models))
+
+    def dump_json():
+        return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+    clients = {mode: make_client(rows, mode) for mode in ("default", "orjson", "list_response")}
+    cases = [
+        ("序列化", "jsonable_encoder + json.dumps", stdlib),
+        ("序列化", "model_dump + orjson", dump_orjson),
+        ("序列化", "TypeAdapter.dump_json", dump_json),
+        ("接口", "response_model 默认", lambda: clients["default"].get("/questions").content),
+        ("接口", "response_model + ORJSONResponse", lambda: clients["orjson"].get("/questions").content),
+        ("接口", "list_response", lambda: clients["list_response"].get("/questions").content),
+    ]
+
+    print(f"{args.rows} 条题目\n")
+    print("| 层级 | 方式 | 耗时 p50 (ms) | 响应体积 (KB) |")
+    print("| --- | --- | ---: | ---: |")
+    for level, name, fn in cases:
+        elapsed, size = measure(fn, args.repeat)
+        print(f"| {level} | {name} | {elapsed:.1f} | {size / 1024:.1f} |")
+
+
+if __name__ == "__main__":
+    main()
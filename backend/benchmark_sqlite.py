@@ -0,0 +1,124 @@
+"""SQLite 并发基准 - 对比默认连接参数与调优参数（WAL 等）下写入期间的读吞吐
+
+一个写线程持续模拟交卷（插入测验 + 答题记录并提交），多个读线程同时查询测验结果，
+统计两种配置下的读/写吞吐、读延迟和锁错误数。
+
+用法: python benchmark_sqlite.py [--seconds 5] [--readers 4] [--dir .]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, configure_sqlite, sqlite_pragmas
+from app.models import Direction, Exam, Answer, ExamStatus
+
+
+def build_engine(path: str, pragmas: dict):
+    """创建与应用相同方式配置的 SQLite 引擎"""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    configure_sqlite(engine, pragmas)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(Direction(id=1, name="基准"))
+        for i in range(1, 201):
+            db.add(Exam(id=i, direction_id=1, status=ExamStatus.COMPLETED))
+            db.add_all(Answer(exam_id=i, question_id=j, user_answer="A", is_correct=j % 2 == 0) for j in range(10))
+        db.commit()
+    return engine, Session
+
+
+def writer(Session, stop: threading.Event, stats: dict):
+    """模拟交卷：每个事务写入 1 条测验和 10 条答题记录"""
+    while not stop.is_set():
+        try:
+            with Session() as db:
+                exam = Exam(direction_id=1, status=ExamStatus.COMPLETED)
+                db.add(exam)
+                db.flush()
+                db.add_all(Answer(exam_id=exam.id, question_id=j, user_answer="A") for j in range(10))
+                db.commit()
+            stats["writes"] += 1
+        except OperationalError:
+            stats["write_errors"] += 1
+
+
+def reader(Session, stop: threading.Event, stats: dict, latencies: list):
+    """模拟查看测验结果：按测验ID读取答题记录并统计正确数"""
+    i = 0
+    while not stop.is_set():
+        i += 1
+        start = time.perf_counter()
+        try:
+            with Session() as db:
+                db.execute(text("SELECT * FROM answers WHERE exam_id = :id"), {"id": i % 200 + 1}).fetchall()
+                db.execute(text("SELECT count(*) FROM answers WHERE is_correct = 1")).scalar()
+            latencies.append(time.perf_counter() - start)
+            stats["reads"] += 1
+        except OperationalError:
+            stats["read_errors"] += 1
+
+
+def run(name: str, pragmas: dict, seconds: float, readers: int, directory: str | None) -> dict:
+    stats = {"reads": 0, "writes": 0, "read_errors": 0, "write_errors": 0}
+    latencies: list[float] = []
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        engine, Session = build_engine(os.path.join(tmp, "bench.db"), pragmas)
+        with engine.connect() as conn:
+            journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+
+        stop = threading.Event()
+        threads = [threading.Thread(target=writer, args=(Session, stop, stats))]
+        threads += [threading.Thread(target=reader, args=(Session, stop, stats, latencies)) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        engine.dispose()
+
+    latencies.sort()
+    return {
+        "name": name,
+        "journal_mode": journal_mode,
+        "reads_per_sec": stats["reads"] / seconds,
+        "writes_per_sec": stats["writes"] / seconds,
+        "read_p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "read_p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+        "read_errors": stats["read_errors"],
+        "write_errors": stats["write_errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 并发读写基准")
+    parser.add_argument("--seconds", type=float, default=5.0, help="每种配置的运行时长（秒）")
+    parser.add_argument("--readers", type=int, default=4, help="读线程数")
+    parser.add_argument("--dir", default=None, help="数据库文件所在目录（默认系统临时目录，建议与生产库同一磁盘）")
+    args = parser.parse_args()
+
+    results = [
+        run("默认参数", {}, args.seconds, args.readers, args.dir),
+        run("调优参数", sqlite_pragmas(), args.seconds, args.readers, args.dir),
+    ]
+
+    print(f"1 个写线程 + {args.readers} 个读线程，每种配置运行 {args.seconds:.0f} 秒\n")
+    print("| 配置 | journal_mode | 读/秒 | 写/秒 | 读 p50 (ms) | 读 p99 (ms) | 读锁错误 | 写锁错误 |")
+    print("| --- | --- | ---: | ---: | ---: | ---: | ---: | ---: |")
+    for r in results:
+        print(
+            f"| {r['name']} | {r['journal_mode']} | {r['reads_per_sec']:.0f} | {r['writes_per_sec']:.0f} | "
+            f"{r['read_p50_ms']:.2f} | {r['read_p99_ms']:.2f} | {r['read_errors']} | {r['write_errors']} |"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""pytest 公共配置 - 测试使用临时目录下的 SQLite 数据库与缓存文件，不访问真实大模型接口"""
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# 须在导入 app 之前设置（配置在首次导入时读取）
+_TMP_DIR = tempfile.mkdtemp(prefix="study-manager-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ["LLM_CACHE_PATH"] = os.path.join(_TMP_DIR, "llm_cache.db")
+os.environ["URL_CACHE_PATH"] = os.path.join(_TMP_DIR, "url_cache.db")
+os.environ["UPLOAD_DIR"] = os.path.join(_TMP_DIR, "uploads")
+os.environ["QWEN_API_KEY"] = "test-key"
+os.environ["DEBUG"] = "false"
+
+# 以下为调用真实千问接口的手动脚本，不作为自动化测试收集
+collect_ignore = ["test_api.py", "test_full_flow.py", "test_qwen.py"]
+
+
+@pytest.fixture(scope="session")
+def client():
+    """启动应用（执行 lifespan 建表）的测试客户端"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_direction(client):
+    """创建学习方向、一份已处理资料和若干单选题，返回 (方向ID, 题目ID列表)"""
+    from app.core.database import SessionLocal
+    from app.models import Direction, Material, MaterialStatus, Question, QuestionType
+
+    def make(question_count: int = 10) -> tuple[int, list[int]]:
+        with SessionLocal() as db:
+            direction = Direction(name=f"测试方向-{uuid.uuid4().hex[:8]}")
+            material = Material(direction=direction, title="资料", content="内容", status=MaterialStatus.PROCESSED)
+            questions = [
+                Question(
+                    material=material, type=QuestionType.SINGLE_CHOICE, content=f"题目{i}",
+                    options=["A. 甲", "B. 乙"], answer="A",
+                )
+                for i in range(question_count)
+            ]
+            db.add_all(questions)
+            db.commit()
+            return direction.id, [question.id for question in questions]
+
+    return make
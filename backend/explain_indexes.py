@@ -0,0 +1,237 @@
+"""索引效果报告 - 在临时 SQLite 库中对热点查询做建索引前后的 EXPLAIN QUERY PLAN 与耗时对比
+
+用法: python explain_indexes.py > docs/index_explain_report.md
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, date
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.core.migrations import ensure_indexes
+from app.services.gamification_service import _direction_counts_query
+from app.models import (
+    Direction, Material, Question, Exam, Answer, Mistake, ExpLog, UserDailyTask,
+    MaterialStatus, QuestionType, ExamStatus, ExpSourceType,
+)
+
+DIRECTIONS = 5
+MATERIALS = 200
+QUESTIONS = 20000
+EXAMS = 2000
+ANSWERS_PER_EXAM = 10
+REPEAT = 20
+
+# 与 exams.py / mistakes.py / gamification_service.py 中实际查询形状一致
+QUERIES = {
+    "选题（exams._select_questions_by_priority）": """
+        SELECT questions.id,
+               CASE WHEN NOT EXISTS (SELECT 1 FROM answers WHERE answers.question_id = questions.id) THEN 0
+                    WHEN mistakes.error_prone = 1 THEN 1
+                    WHEN mistakes.id IS NOT NULL THEN 2 ELSE 3 END AS tier
+        FROM questions
+        JOIN materials ON questions.material_id = materials.id
+        LEFT OUTER JOIN mistakes ON mistakes.question_id = questions.id
+        WHERE materials.direction_id = 1
+        ORDER BY tier, random() LIMIT 10
+    """,
+    "测验列表（exams.get_exams）": """
+        SELECT * FROM exams WHERE exams.direction_id = 1 ORDER BY exams.created_at DESC
+    """,
+    "测验结果（exams.get_exam_result）": """
+        SELECT * FROM answers WHERE answers.exam_id = 100
+    """,
+    "方向进度（gamification.refresh_direction_progress）": None,  # 由 direction_progress_sql() 生成
+    "完成测验数（gamification.get_user_stats）": """
+        SELECT count(*) FROM exams WHERE exams.status = 'COMPLETED'
+    """,
+    "错题列表（mistakes.get_mistakes）": """
+        SELECT * FROM mistakes WHERE mistakes.mastered = 0 ORDER BY mistakes.created_at DESC
+    """,
+    "资料题目（questions.get_questions）": """
+        SELECT * FROM questions WHERE questions.material_id = 7 ORDER BY questions.created_at DESC
+    """,
+    "经验日志（gamification.get_exp_logs）": """
+        SELECT * FROM exp_logs WHERE exp_logs.user_id = 1 ORDER BY exp_logs.created_at DESC LIMIT 20
+    """,
+    "今日任务（gamification.update_task_progress）": """
+        SELECT * FROM user_daily_tasks
+        WHERE user_daily_tasks.user_id = 1 AND user_daily_tasks.date = :today AND user_daily_tasks.completed = 0
+    """,
+}
+
+
+# 判定迁移后变慢的阈值：相对 10% 且绝对 0.05ms 以上（更小的差异属于多次运行的波动）
+SLOWER_RATIO = 1.1
+SLOWER_MIN_MS = 0.05
+
+# 迁移后变慢的查询说明（与实测结果一起写入报告）
+NOTES = {
+    "测验列表（exams.get_exams）": (
+        "单个方向约 400 场测验且 SELECT * 需回表，整表扫描 + 排序与按索引有序回表的耗时相当；"
+        "索引避免的是随测验数增长的全表排序。"
+    ),
+    "错题列表（mistakes.get_mistakes）": (
+        "约一半错题未掌握，按 mastered 过滤的选择性低，两种计划都要读出大部分行。"
+    ),
+    "今日任务（gamification.update_task_progress）": (
+        "结果只有几行，两种计划都是一次索引查找，耗时在 0.2ms 以内。"
+    ),
+}
+
+# 单独评估的索引：删除后重测依赖它的查询
+ABLATION_INDEX = "ix_answers_question_correct"
+ABLATION_QUERIES = ["选题（exams._select_questions_by_priority）", "方向进度（gamification.refresh_direction_progress）"]
+ABLATION_REPEAT = 3
+
+
+def direction_progress_sql() -> str:
+    """方向进度刷新实际执行的分组统计 SQL（单个方向）"""
+    query = _direction_counts_query(Session(), [1])
+    return str(query.statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def seed(engine):
+    """批量写入样例数据"""
+    rng = random.Random(42)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(Direction.__table__.insert(), [
+            {"id": i, "name": f"方向{i}", "created_at": now} for i in range(1, DIRECTIONS + 1)
+        ])
+        conn.execute(Material.__table__.insert(), [
+            {"id": i, "direction_id": rng.randint(1, DIRECTIONS), "title": f"资料{i}", "content": "x",
+             "status": MaterialStatus.PROCESSED, "created_at": now - timedelta(minutes=i)}
+            for i in range(1, MATERIALS + 1)
+        ])
+        conn.execute(Question.__table__.insert(), [
+            {"id": i, "material_id": rng.randint(1, MATERIALS), "type": QuestionType.SINGLE_CHOICE,
+             "content": f"题目{i}", "answer": "A", "created_at": now - timedelta(seconds=i)}
+            for i in range(1, QUESTIONS + 1)
+        ])
+        conn.execute(Exam.__table__.insert(), [
+            {"id": i, "direction_id": rng.randint(1, DIRECTIONS), "status": ExamStatus.COMPLETED,
+             "created_at": now - timedelta(hours=i)}
+            for i in range(1, EXAMS + 1)
+        ])
+        answers = []
+        for exam_id in range(1, EXAMS + 1):
+            for _ in range(ANSWERS_PER_EXAM):
+                answers.append({
+                    "exam_id": exam_id, "question_id": rng.randint(1, QUESTIONS // 2),
+                    "user_answer": "A", "is_correct": rng.random() > 0.3, "answered_at": now,
+                })
+        conn.execute(Answer.__table__.insert(), answers)
+        mistake_qids = rng.sample(range(1, QUESTIONS // 2), QUESTIONS // 20)
+        conn.execute(Mistake.__table__.insert(), [
+            {"question_id": qid, "answer_id": 1, "error_count": 1, "error_prone": rng.random() > 0.7,
+             "review_count": 0, "mastered": rng.random() > 0.5, "created_at": now - timedelta(minutes=i),
+             "last_error_at": now}
+            for i, qid in enumerate(mistake_qids)
+        ])
+        conn.execute(ExpLog.__table__.insert(), [
+            {"user_id": 1, "exp_amount": 10, "source_type": ExpSourceType.EXAM_COMPLETE,
+             "created_at": now - timedelta(minutes=i)}
+            for i in range(5000)
+        ])
+        conn.execute(UserDailyTask.__table__.insert(), [
+            {"user_id": 1, "task_id": f"t{i % 5}", "date": date.today() - timedelta(days=i // 5),
+             "target": 1, "current": 0, "completed": False, "exp_reward": 10}
+            for i in range(1500)
+        ])
+
+
+def drop_indexes(engine):
+    """删除模型声明的二级索引，模拟迁移前的数据库"""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+
+def measure(engine, names=None, repeat: int = REPEAT) -> dict:
+    """对每条查询记录执行计划和平均耗时"""
+    params = {"today": date.today().isoformat()}
+    results = {}
+    with engine.connect() as conn:
+        for name in names or QUERIES:
+            sql = QUERIES[name] or direction_progress_sql()
+            plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(text(sql), params).fetchall()
+            elapsed = (time.perf_counter() - start) / repeat * 1000
+            results[name] = ([row[-1] for row in plan], elapsed)
+    return results
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "explain.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    seed(engine)
+
+    drop_indexes(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    before = measure(engine)
+
+    ensure_indexes(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    after = measure(engine)
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP INDEX {ABLATION_INDEX}"))
+        conn.execute(text("ANALYZE"))
+    without = measure(engine, ABLATION_QUERIES, ABLATION_REPEAT)
+    ensure_indexes(engine)
+
+    print("# 索引迁移前后 EXPLAIN QUERY PLAN 对比\n")
+    print(f"数据规模：{QUESTIONS} 题目 / {EXAMS} 测验 / {EXAMS * ANSWERS_PER_EXAM} 答题记录 / "
+          f"{QUESTIONS // 20} 错题 / 5000 经验日志，耗时为 {REPEAT} 次执行的平均值（SQLite）。\n")
+    print("| 查询 | 迁移前 (ms) | 迁移后 (ms) |")
+    print("| --- | ---: | ---: |")
+    for name in QUERIES:
+        print(f"| {name} | {before[name][1]:.2f} | {after[name][1]:.2f} |")
+    print()
+
+    slower = [
+        name for name in QUERIES
+        if after[name][1] > before[name][1] * SLOWER_RATIO and after[name][1] - before[name][1] > SLOWER_MIN_MS
+    ]
+    print("迁移后变慢的查询（超过 10% 且 0.05ms）：\n")
+    for name in slower:
+        print(f"- {name}：{NOTES.get(name, '未记录原因，需要分析执行计划。')}")
+    if not slower:
+        print("- 无。")
+    print()
+
+    print(f"## 索引 {ABLATION_INDEX} 的取舍\n")
+    print("选题查询对每道候选题做 NOT EXISTS (answers.question_id = ?) 判断，answers 上没有以 question_id "
+          "开头的索引时只能逐题扫描整张答题表。方向进度改为按方向过滤的分组统计后走 ix_answers_exam_question，"
+          "不再选用该索引（早期按 question_id 去重的答对题数查询曾因选中它而变慢，该查询已不再使用）。"
+          f"删除该索引后重测（{ABLATION_REPEAT} 次平均）：\n")
+    print("| 查询 | 保留 (ms) | 删除后 (ms) | 删除后执行计划中的 answers 访问 |")
+    print("| --- | ---: | ---: | --- |")
+    for name in ABLATION_QUERIES:
+        access = "; ".join(step for step in without[name][0] if "answers" in step)
+        print(f"| {name} | {after[name][1]:.2f} | {without[name][1]:.2f} | {access} |")
+    print()
+
+    for name in QUERIES:
+        print(f"## {name}\n")
+        print("迁移前：\n```")
+        print("\n".join(before[name][0]))
+        print("```\n迁移后：\n```")
+        print("\n".join(after[name][0]))
+        print("```\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,16 @@
 """数据导出脚本 - 将数据库中的数据导出为 Excel"""
 import os
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum, JSON, Numeric
 from sqlalchemy.orm import declarative_base, sessionmaker
 from datetime import datetime
 import json
 
+if TYPE_CHECKING:
+    from openpyxl import Workbook
+
 
 # 数据库路径
 DB_PATH = Path(__file__).parent / "personal_study.db"
@@ -112,6 +114,9 @@ def get_db_session():
 
 def style_header(ws, max_col: int):
     """设置表头样式"""
+    # openpyxl 导入较慢，只在真正写表时加载
+    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+
     header_font = Font(bold=True, color="FFFFFF")
     header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
     header_alignment = Alignment(horizontal="center", vertical="center")
@@ -130,7 +135,7 @@ def style_header(ws, max_col: int):
         cell.border = thin_border
 
 
-def export_parse_tasks(session, wb: Workbook):
+def export_parse_tasks(session, wb: "Workbook"):
     """导出解析记录"""
     ws = wb.create_sheet("解析记录")
 
@@ -170,7 +175,7 @@ def export_parse_tasks(session, wb: Workbook):
     print(f"  解析记录: {len(tasks)} 条")
 
 
-def export_questions(session, wb: Workbook):
+def export_questions(session, wb: "Workbook"):
     """导出题目管理"""
     ws = wb.create_sheet("题目管理")
 
@@ -225,7 +230,7 @@ def export_questions(session, wb: Workbook):
     print(f"  题目管理: {len(questions)} 条")
 
 
-def export_mistakes(session, wb: Workbook):
+def export_mistakes(session, wb: "Workbook"):
     """导出错题本"""
     ws = wb.create_sheet("错题本")
 
@@ -300,6 +305,8 @@ def main():
 
     try:
         # 创建工作簿
+        from openpyxl import Workbook
+
         wb = Workbook()
         wb.remove(wb.active)  # 移除默认sheet
 
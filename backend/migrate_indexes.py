@@ -0,0 +1,21 @@
+"""为已有数据库补列、补建索引和全文索引（SQLite / MySQL），按 .env 中的 DATABASE_URL 连接
+
+用法: python migrate_indexes.py [--rebuild-search]  # --rebuild-search 重建全文索引并回填
+"""
+import sys
+
+from app.core.database import engine
+from app.core.migrations import ensure_columns, ensure_indexes
+from app.services.search_service import ensure_search_index
+
+added = ensure_columns(engine)
+for name in added:
+    print(f"已新增列 {name}")
+created = ensure_indexes(engine)
+created += ensure_search_index(engine, rebuild="--rebuild-search" in sys.argv)
+if created:
+    print(f"已创建 {len(created)} 个索引:")
+    for name in created:
+        print(f"  - {name}")
+else:
+    print("索引已是最新，无需迁移")
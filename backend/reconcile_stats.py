@@ -0,0 +1,18 @@
+"""从源表重建游戏化统计计数（user_stats）和方向探索进度（direction_progress），按 .env 中的 DATABASE_URL 连接"""
+from app.core.database import SessionLocal, Base, engine
+from app.services.gamification_service import reconcile_user_stats, refresh_direction_progress
+
+Base.metadata.create_all(bind=engine)
+db = SessionLocal()
+try:
+    stats = reconcile_user_stats(db)
+    refresh_direction_progress(db, studied=False)
+    db.commit()
+    print("统计计数已重建:")
+    print(f"  已完成测验: {stats.exam_count}")
+    print(f"  已掌握错题: {stats.mastered_mistakes}")
+    print(f"  已处理资料: {stats.material_count}")
+    print(f"  最高分: {stats.max_score}")
+    print(f"  探索方向: {len(stats.explored_direction_ids or [])}")
+finally:
+    db.close()
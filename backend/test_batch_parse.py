@@ -0,0 +1,75 @@
+"""批量网页解析测试 - 执行中批次的租约与重启后续跑"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core.database import Base, SessionLocal, engine
+from app.models import ParseBatch, ParseBatchItem, TaskStatus
+from app.services import batch_parse_service as module
+from app.services.batch_parse_service import BatchParseService
+
+
+def create_batch(owner: str, items: list[ParseBatchItem], **values) -> int:
+    """创建执行中的批次（由 owner 持有且租约有效，避免被应用自带的服务领取）"""
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        batch = ParseBatch(
+            title="批量测试", status=TaskStatus.PROCESSING, locked_by=owner, locked_at=datetime.now(),
+            total=len(items), items=items, **values,
+        )
+        db.add(batch)
+        db.commit()
+        return batch.id
+
+
+def is_claimable(service: BatchParseService, batch_id: int) -> bool:
+    with SessionLocal() as db:
+        return db.scalar(select(ParseBatch.id).where(ParseBatch.id == batch_id, service.lease.claimable())) is not None
+
+
+@pytest.mark.asyncio
+async def test_stop_requeues_own_batches_and_leaves_live_ones(client):
+    """关闭时本进程的批次放回待处理而不是标记失败；其他进程仍在续约的批次不可领取"""
+    service = BatchParseService()
+    own_id = create_batch(service.lease.owner, [ParseBatchItem(url="https://a.example/", status=TaskStatus.PENDING)])
+    other_id = create_batch("other-process", [ParseBatchItem(url="https://b.example/", status=TaskStatus.PENDING)])
+    assert not is_claimable(service, other_id)
+
+    await service.stop()
+
+    with SessionLocal() as db:
+        own, other = db.get(ParseBatch, own_id), db.get(ParseBatch, other_id)
+        assert (own.status, own.locked_by, own.finished_at) == (TaskStatus.PENDING, None, None)
+        assert (other.status, other.locked_by) == (TaskStatus.PROCESSING, "other-process")
+        other.locked_at = datetime.now() - timedelta(seconds=61)
+        db.commit()
+    assert is_claimable(service, other_id)
+
+
+@pytest.mark.asyncio
+async def test_resumed_batch_only_runs_unfinished_items(client, monkeypatch):
+    """重新领取的批次跳过已完成的条目，已记录的最终地址继续参与去重"""
+    service = BatchParseService()
+    batch_id = create_batch(
+        service.lease.owner,
+        [
+            ParseBatchItem(url="https://a.example/", final_url="https://a.example/page", status=TaskStatus.COMPLETED),
+            ParseBatchItem(url="https://b.example/", status=TaskStatus.PENDING),
+        ],
+        completed=1,
+    )
+    fetched = []
+
+    async def fetch_page(url):
+        fetched.append(url)
+        return "https://A.example/page#top", "正文"
+
+    monkeypatch.setattr(module.extractor_service, "fetch_page", fetch_page)
+    await service._run_batch(batch_id)
+
+    assert fetched == ["https://b.example/"]
+    with SessionLocal() as db:
+        batch = db.get(ParseBatch, batch_id)
+        assert (batch.status, batch.completed, batch.duplicates) == (TaskStatus.COMPLETED, 1, 1)
+        assert batch.items[1].duplicate
@@ -0,0 +1,72 @@
+"""游戏化统计计数测试 - 工作单元只提交一次，删除数据后计数同步修正"""
+from sqlalchemy import event
+
+from app.core.database import SessionLocal
+from app.models import Exam, ExamStatus, UserStats
+from app.services import gamification_service as gs
+
+
+def submit(client, direction_id: int, question_ids: list[int], answer: str) -> dict:
+    exam = client.post("/api/exams", json={"direction_id": direction_id, "question_count": len(question_ids)}).json()
+    answers = [
+        {"exam_id": exam["id"], "question_id": question["id"], "user_answer": answer}
+        for question in exam["questions"]
+    ]
+    return client.post(f"/api/exams/{exam['id']}/submit", json={"answers": answers}).json()
+
+
+def test_first_event_reconciles_within_single_commit(client, make_direction):
+    direction_id, question_ids = make_direction(3)
+    with SessionLocal() as db:
+        gs.get_or_create_profile(db)
+        db.query(UserStats).delete()
+        exam = Exam(direction_id=direction_id, status=ExamStatus.COMPLETED, score=80)
+        db.add(exam)
+        db.commit()
+
+        commits = []
+        event.listen(db, "after_commit", lambda session: commits.append(session))
+        gs.on_exam_complete(db, exam, correct_count=2, total_count=3)
+
+        assert len(commits) == 1
+        stats = db.query(UserStats).one()
+        assert stats.exam_count == db.query(Exam).filter(Exam.status == ExamStatus.COMPLETED).count()
+
+
+def test_deleting_exam_updates_stats(client, make_direction):
+    direction_id, question_ids = make_direction(3)
+    submit(client, direction_id, question_ids, "B")
+    high = submit(client, direction_id, question_ids, "A")
+    assert high["score"] == 100
+
+    with SessionLocal() as db:
+        before = db.query(UserStats).one()
+        exam_count, max_score = before.exam_count, float(before.max_score)
+    assert max_score == 100
+
+    assert client.delete(f"/api/exams/{high['exam_id']}").status_code == 200
+    with SessionLocal() as db:
+        after = db.query(UserStats).one()
+        assert after.exam_count == exam_count - 1
+        remaining = db.query(Exam.score).filter(Exam.status == ExamStatus.COMPLETED).order_by(Exam.score.desc()).first()
+        assert (float(after.max_score) if after.max_score is not None else None) == (
+            float(remaining[0]) if remaining else None
+        )
+
+
+def test_failed_event_is_logged_and_stats_reconciled(client, make_direction, monkeypatch, caplog):
+    """游戏化事件中途失败：测验结果照常返回，记录错误日志，统计计数从源表重算"""
+    direction_id, question_ids = make_direction(3)
+
+    def broken(batch, increments):
+        raise RuntimeError("每日任务更新失败")
+
+    monkeypatch.setattr(gs, "_advance_daily_tasks", broken)
+    result = submit(client, direction_id, question_ids, "A")
+
+    assert result["score"] == 100
+    assert result["gamification"] is None
+    assert "游戏化事件处理失败: on_exam_complete" in caplog.text
+    with SessionLocal() as db:
+        stats = db.query(UserStats).one()
+        assert stats.exam_count == db.query(Exam).filter(Exam.status == ExamStatus.COMPLETED).count()
@@ -0,0 +1,80 @@
+"""启动导入耗时检查 - 用 python -X importtime 测量 app.main 冷启动导入
+
+在全新子进程中导入 app.main，解析 -X importtime 输出：
+  1. 延迟加载登记的解析/导出库（见 app/core/lazy_imports.py）不得在启动时被导入；
+  2. 打印总导入耗时与耗时最多的顶层包；设置 IMPORT_TIME_BUDGET_MS 时超出预算即失败。
+
+用法: python test_import_time.py [--top 15]    或    pytest test_import_time.py
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from app.core.lazy_imports import LAZY_MODULES
+
+BACKEND_DIR = Path(__file__).parent
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def measure_imports(module: str = "app.main") -> list[tuple[str, int, int, int]]:
+    """在子进程中导入模块，返回 (模块名, 自身耗时 us, 累计耗时 us, 嵌套层级) 列表"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def heavy_modules(rows) -> list[str]:
+    """启动时被导入的延迟加载模块"""
+    return sorted({name for name, *_ in rows if name.split(".", 1)[0] in LAZY_MODULES})
+
+
+def test_lazy_modules_not_imported_at_startup():
+    rows = measure_imports()
+    loaded = heavy_modules(rows)
+    assert not loaded, f"以下模块应延迟加载，却在启动时被导入: {', '.join(loaded)}"
+
+
+def test_startup_import_budget():
+    budget = os.environ.get("IMPORT_TIME_BUDGET_MS")
+    rows = measure_imports()
+    total_ms = sum(self_us for _, self_us, _, _ in rows) / 1000
+    if budget:
+        assert total_ms <= float(budget), f"app.main 导入耗时 {total_ms:.0f}ms 超出预算 {budget}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="app.main 冷启动导入耗时")
+    parser.add_argument("--top", type=int, default=15, help="显示耗时最多的顶层包数量")
+    args = parser.parse_args()
+
+    rows = measure_imports()
+    packages: dict[str, int] = {}
+    for name, self_us, _, _ in rows:
+        root = name.split(".", 1)[0]
+        packages[root] = packages.get(root, 0) + self_us
+    total_ms = sum(packages.values()) / 1000
+
+    print(f"app.main 导入总耗时: {total_ms:.1f}ms（{len(rows)} 个模块）\n")
+    print("| 顶层包 | 自身耗时合计 (ms) |")
+    print("| --- | ---: |")
+    for root, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"| {root} | {self_us / 1000:.1f} |")
+
+    loaded = heavy_modules(rows)
+    print(f"\n启动时加载的延迟模块: {', '.join(loaded) if loaded else '无'}")
+    sys.exit(1 if loaded else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""大模型响应缓存测试 - 只缓存能解析的响应"""
+import uuid
+
+import pytest
+
+from app.services.llm_cache import llm_cache, make_cache_key
+from app.services.qwen_service import qwen_service
+
+
+def fake_chat(monkeypatch, replies: list[str]) -> list:
+    """替换聊天接口，按顺序返回预设回复，返回调用记录"""
+    calls = []
+
+    async def chat(messages, temperature=0.7):
+        calls.append(messages)
+        return replies[len(calls) - 1]
+
+    monkeypatch.setattr(qwen_service, "_chat", chat)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_malformed_reply_is_not_cached(monkeypatch):
+    calls = fake_chat(monkeypatch, ['{"score": 80, "feedback": "要点', '{"score": 80, "feedback": "要点齐全"}'])
+    user_answer = f"作答-{uuid.uuid4()}"
+
+    first = await qwen_service.evaluate_answer("题目", "标准答案", user_answer, "short_answer")
+    assert first["feedback"] == "评分失败，请重试"
+
+    # 重试时重新请求模型，而不是返回缓存的残缺响应
+    second = await qwen_service.evaluate_answer("题目", "标准答案", user_answer, "short_answer")
+    assert second == {"score": 80, "feedback": "要点齐全"}
+    assert len(calls) == 2
+
+    # 解析成功的响应才会缓存
+    third = await qwen_service.evaluate_answer("题目", "标准答案", user_answer, "short_answer")
+    assert third == second
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_unparsable_cached_entry_is_evicted(monkeypatch):
+    reply = '[{"point": "p", "description": "d", "importance": 3}]'
+    calls = fake_chat(monkeypatch, [reply, reply])
+    content = f"资料-{uuid.uuid4()}"
+
+    # 先取得真实请求的缓存键，再用一条无法解析的条目覆盖
+    await qwen_service.extract_key_points(content, "编程")
+    key = make_cache_key(qwen_service.model, calls[0], 0.3)
+    await llm_cache.set(key, "not json")
+
+    result = await qwen_service.extract_key_points(content, "编程")
+    assert result == [{"point": "p", "description": "d", "importance": 3}]
+    assert len(calls) == 2
+    assert await llm_cache.get(key) == reply
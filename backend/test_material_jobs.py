@@ -0,0 +1,102 @@
+"""资料处理任务队列测试 - 工作协程容错与执行中任务的租约"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core.database import Base, SessionLocal, engine
+from app.models import Direction, Material, MaterialJob, MaterialStatus, TaskStatus
+from app.services.material_job_service import MaterialJobQueue
+
+
+def create_jobs(count: int, owner: str = "other-process") -> list[int]:
+    """创建执行中的资料任务（由 owner 持有且租约有效，避免被应用自带的工作池抢占）"""
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        direction = Direction(name=f"队列测试-{uuid.uuid4().hex[:8]}")
+        db.add(direction)
+        db.flush()
+        jobs = []
+        for i in range(count):
+            material = Material(
+                direction_id=direction.id, title=f"资料{i}", content="内容", status=MaterialStatus.PENDING
+            )
+            job = MaterialJob(
+                material=material, status=TaskStatus.PROCESSING, locked_by=owner, locked_at=datetime.now()
+            )
+            db.add(job)
+            jobs.append(job)
+        db.commit()
+        return [job.id for job in jobs]
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_unexpected_job_error(monkeypatch):
+    broken_id, next_id = create_jobs(2)
+    queue = MaterialJobQueue(worker_count=1, poll_interval=0.01)
+    queue._wakeup = asyncio.Event()
+
+    pending = [broken_id, next_id]
+    processed = []
+    finished = asyncio.Event()
+
+    async def claim_next():
+        return pending.pop(0) if pending else None
+
+    async def run_job(job_id):
+        if job_id == broken_id:
+            raise RuntimeError("状态记账出错")
+        processed.append(job_id)
+        finished.set()
+
+    monkeypatch.setattr(queue, "_claim_next", claim_next)
+    monkeypatch.setattr(queue, "_run_job", run_job)
+
+    worker = asyncio.create_task(queue._worker_loop(0))
+    await asyncio.wait_for(finished.wait(), timeout=5)
+    assert processed == [next_id]
+
+    # 取消仍会让工作协程退出
+    worker.cancel()
+    await asyncio.gather(worker, return_exceptions=True)
+    assert worker.cancelled()
+
+    with SessionLocal() as db:
+        job = db.get(MaterialJob, broken_id)
+        assert job.status == TaskStatus.FAILED
+        assert job.error_message == "状态记账出错"
+        assert job.material.status == MaterialStatus.FAILED
+
+
+def is_claimable(queue: MaterialJobQueue, job_id: int) -> bool:
+    with SessionLocal() as db:
+        return db.scalar(select(MaterialJob.id).where(MaterialJob.id == job_id, queue.lease.claimable())) is not None
+
+
+def test_running_job_is_reclaimed_only_after_lease_expires():
+    """其他进程持有且仍在续约的任务不会被重新领取，心跳过期后才可领取"""
+    job_id, = create_jobs(1)
+    queue = MaterialJobQueue(worker_count=1, lease_seconds=60)
+    assert not is_claimable(queue, job_id)
+
+    with SessionLocal() as db:
+        db.get(MaterialJob, job_id).locked_at = datetime.now() - timedelta(seconds=61)
+        db.commit()
+    assert is_claimable(queue, job_id)
+
+
+@pytest.mark.asyncio
+async def test_stop_requeues_only_own_jobs():
+    """关闭时只把本进程持有的任务放回队列，其他进程的任务保持执行中"""
+    queue = MaterialJobQueue(worker_count=1)
+    own_id, = create_jobs(1, owner=queue.lease.owner)
+    other_id, = create_jobs(1)
+
+    await queue.stop()
+
+    with SessionLocal() as db:
+        own, other = db.get(MaterialJob, own_id), db.get(MaterialJob, other_id)
+        assert (own.status, own.locked_by, own.step) == (TaskStatus.PENDING, None, "queued")
+        assert (other.status, other.locked_by) == (TaskStatus.PROCESSING, "other-process")
@@ -0,0 +1,34 @@
+"""资料列表测试 - 摘要投影不加载完整内容和知识点"""
+from sqlalchemy import event
+
+from app.core.database import SessionLocal, engine
+from app.models import Material
+
+
+def test_key_point_count_is_computed_in_sql(client, make_direction):
+    """知识点数量由 SQL 计算，列表查询不读取 key_points 列"""
+    direction_id, _ = make_direction(1)
+    with SessionLocal() as db:
+        db.add_all([
+            Material(direction_id=direction_id, title="三个知识点", content="正文", key_points=[{"point": "a"}] * 3),
+            Material(direction_id=direction_id, title="没有知识点", content="正文"),
+        ])
+        db.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/api/materials", params={"direction_id": direction_id})
+        sparse = client.get("/api/materials", params={"direction_id": direction_id, "fields": "title,content_preview,key_point_count"})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    counts = {row["title"]: row["key_point_count"] for row in response.json() if row["title"] in ("三个知识点", "没有知识点")}
+    assert counts == {"三个知识点": 3, "没有知识点": 0}
+    assert "key_points" not in response.json()[0]
+    assert {row["title"]: row["key_point_count"] for row in sparse.json()}.items() >= counts.items()
+    assert not any("materials.key_points AS" in statement for statement in statements)
@@ -0,0 +1,49 @@
+"""游标分页测试"""
+from sqlalchemy import update
+
+
+def test_keyset_page_includes_rows_without_created_at(make_direction):
+    """创建时间为空的行排在最后，逐页翻完不重复、不遗漏"""
+    from app.core.database import SessionLocal
+    from app.core.pagination import keyset_page
+    from app.models import Question
+
+    _, question_ids = make_direction(7)
+    with SessionLocal() as db:
+        db.execute(update(Question).where(Question.id.in_(question_ids[:3])).values(created_at=None))
+        db.commit()
+
+        query = db.query(Question).filter(Question.id.in_(question_ids))
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(query, Question, cursor, limit=2)
+            seen.extend(row.id for row in rows)
+            if cursor is None:
+                break
+
+    assert sorted(seen) == sorted(question_ids)
+    assert seen[-3:] == sorted(question_ids[:3], reverse=True)
+
+
+def test_total_count_sees_writes_from_other_processes(make_direction):
+    """总数缓存默认关闭：其他进程的写入不经过本进程版本号，也能立即反映在总数中"""
+    import sqlite3
+
+    from sqlalchemy import make_url
+
+    from app.core.config import get_settings
+    from app.core.database import SessionLocal
+    from app.core.pagination import TotalCountCache, total_count_cache
+    from app.models import Question
+
+    assert not total_count_cache.enabled
+    _, question_ids = make_direction(2)
+    with SessionLocal() as db:
+        query = db.query(Question).filter(Question.material_id == db.get(Question, question_ids[0]).material_id)
+        cached = TotalCountCache(enabled=True)
+        assert total_count_cache.count(query) == cached.count(query) == 2
+
+        with sqlite3.connect(make_url(get_settings().database_url).database) as conn:
+            conn.execute("DELETE FROM questions WHERE id = ?", (question_ids[0],))
+        assert total_count_cache.count(query) == 1
+        assert cached.count(query) == 2
@@ -0,0 +1,24 @@
+"""知识解析测试"""
+from app.services.knowledge_service import knowledge_service
+
+
+def test_failed_analysis_keeps_streamed_raw_text(client, monkeypatch):
+    """大模型分析中途失败时，任务标记为失败，已读取的原文仍然保存"""
+
+    async def extract(blocks):
+        async for block in blocks:
+            if block == "第二段":
+                raise RuntimeError("模型调用失败")
+        return {}
+
+    monkeypatch.setattr(knowledge_service, "extract_knowledge_from_blocks", extract)
+    res = client.post(
+        "/api/parse/file",
+        data={"title": "笔记"},
+        files={"file": ("note.txt", "第一段\n\n第二段\n\n第三段".encode("utf-8"), "text/plain")},
+    )
+    assert res.status_code == 200
+    task = res.json()
+    assert task["status"] == "failed"
+    assert task["error_message"] == "模型调用失败"
+    assert task["raw_text"] == "第一段\n\n第二段"
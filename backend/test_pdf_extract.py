@@ -0,0 +1,42 @@
+"""PDF 进程池解析测试"""
+import io
+from contextlib import aclosing
+
+import pytest
+from fastapi import UploadFile
+
+fitz = pytest.importorskip("fitz")
+
+
+def build_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for number in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {number}")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.mark.asyncio
+async def test_pdf_pages_extracted_in_memory(monkeypatch):
+    """各页码区间并行提取后按页序产出，可提前停止读取，全程不写临时文件"""
+    import tempfile
+
+    from app.services import extractor_service as module
+
+    def no_temp_files(*args, **kwargs):
+        raise AssertionError("PDF 解析不应写临时文件")
+
+    monkeypatch.setattr(tempfile, "mkstemp", no_temp_files)
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", no_temp_files)
+    monkeypatch.setattr(module.settings, "pdf_min_pages_per_task", 2)
+    service = module.ExtractorService(pdf_workers=2)
+    data = build_pdf(6)
+    try:
+        text = await service.extract_from_file(UploadFile(io.BytesIO(data), filename="a.pdf"))
+        assert [f"page {number}" for number in range(6)] == text.split("\n\n")
+
+        async with aclosing(service.iter_text_blocks(UploadFile(io.BytesIO(data), filename="b.pdf"))) as blocks:
+            assert await anext(blocks) == "page 0"
+    finally:
+        service.shutdown()
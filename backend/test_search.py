@@ -0,0 +1,92 @@
+"""全文检索测试 - 中文分词、索引同步与相关度排序"""
+import sqlite3
+import uuid
+
+from sqlalchemy import make_url
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.core.fts import bigram_tokens, fts_match_query
+from app.models import Material, Question, QuestionType
+from app.services.search_service import search_service
+
+
+def unique_term() -> str:
+    """每个用例使用独立的检索词，避免与其他用例的数据互相干扰"""
+    return f"kw{uuid.uuid4().hex[:8]}"
+
+
+def test_bigram_tokens():
+    assert bigram_tokens("机器学习 Python3入门") == "机器 器学 学习 习 python3 入门 门"
+    assert bigram_tokens("机器学习", for_query=True) == "机器 器学 学习"
+    assert bigram_tokens("树") == "树"
+    assert bigram_tokens(None) == ""
+
+
+def test_match_query_uses_prefix_for_partial_tokens():
+    assert fts_match_query(["机器学习", "树", "Pyth"]) == '"机器 器学 学习" AND "树"* AND "pyth"*'
+    assert fts_match_query(["，"]) == ""
+
+
+def test_rows_written_outside_the_app_are_indexed(client, make_direction):
+    """不经过应用的写入（sqlite3 命令行等）不依赖自定义函数，检索前补写索引"""
+    direction_id, _ = make_direction(1)
+    term = unique_term()
+    path = make_url(get_settings().database_url).database
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "INSERT INTO materials (direction_id, title, content, status) VALUES (?, ?, ?, 'PROCESSED')",
+            (direction_id, f"梯度下降 {term}", "正文"),
+        )
+    with SessionLocal() as db:
+        hits = search_service.search(db, f"梯度 {term}", ["material"])
+        assert [hit["title"] for hit in hits] == [f"梯度下降 {term}"]
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE materials SET title = ? WHERE title = ?", (f"反向传播 {term}", f"梯度下降 {term}"))
+    with SessionLocal() as db:
+        assert search_service.search(db, f"梯度 {term}", ["material"]) == []
+        assert len(search_service.search(db, f"反向 {term}", ["material"])) == 1
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("DELETE FROM materials WHERE title = ?", (f"反向传播 {term}",))
+    with SessionLocal() as db:
+        assert search_service.search(db, term, ["material"]) == []
+
+
+def test_older_relevant_row_outranks_many_newer_matches(client, make_direction):
+    """相关度最高的旧数据不会因为命中行较多而被截断"""
+    direction_id, _ = make_direction(1)
+    term = unique_term()
+    with SessionLocal() as db:
+        best = Material(direction_id=direction_id, title=term, content=term)
+        db.add(best)
+        db.flush()
+        db.add_all(
+            Material(direction_id=direction_id, title=f"资料{i}", content=f"{term} " + "填充内容 " * 20)
+            for i in range(1200)
+        )
+        db.commit()
+
+        hits = search_service.search(db, term, ["material"], limit=5)
+        assert hits[0]["id"] == best.id
+
+
+def test_sources_are_interleaved_by_rank(client, make_direction):
+    """不同来源的分数不可比，按来源内名次交错合并"""
+    direction_id, question_ids = make_direction(1)
+    term = unique_term()
+    with SessionLocal() as db:
+        material_id = db.get(Question, question_ids[0]).material_id
+        db.add_all(
+            Question(material_id=material_id, type=QuestionType.SHORT_ANSWER, content=f"{term} 题目{i}", answer="略")
+            for i in range(3)
+        )
+        db.add_all(
+            Material(direction_id=direction_id, title=f"资料{i}", content=f"{term} " + "很长的正文 " * 50)
+            for i in range(3)
+        )
+        db.commit()
+
+        hits = search_service.search(db, term, ["question", "material"], limit=4)
+        assert [hit["type"] for hit in hits] == ["question", "material", "question", "material"]
@@ -0,0 +1,53 @@
+"""交卷测试 - 批量写入答题记录，SQL 语句数不随答题数增长"""
+import pytest
+from sqlalchemy import event
+
+from app.core.database import async_engine
+from app.services import gamification_service as gs
+
+# 后台任务队列随应用启动，按轮询间隔领取任务，语句会随机落入统计区间
+BACKGROUND_TABLES = ("material_jobs", "parse_batches")
+
+
+@pytest.fixture
+def count_statements():
+    """统计异步引擎执行的 SQL 语句数（executemany 计为一条，不含后台任务队列的轮询）"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not any(table in statement for table in BACKGROUND_TABLES):
+            statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def submit_all(client, direction_id: int, question_ids: list[int], statements: list) -> dict:
+    """创建测验并提交：前一半答对、后一半答错，返回提交期间的语句数和结果"""
+    exam = client.post("/api/exams", json={"direction_id": direction_id, "question_count": len(question_ids)}).json()
+    assert len(exam["questions"]) == len(question_ids)
+    half = len(question_ids) // 2
+    answers = [
+        {"exam_id": exam["id"], "question_id": question_id, "user_answer": "A" if i < half else "B"}
+        for i, question_id in enumerate(question_ids)
+    ]
+    statements.clear()
+    response = client.post(f"/api/exams/{exam['id']}/submit", json={"answers": answers})
+    assert response.status_code == 200
+    return {"statements": len(statements), "result": response.json()}
+
+
+def test_statement_count_does_not_grow_with_answers(client, make_direction, count_statements, monkeypatch):
+    # 游戏化的语句数取决于是否升级、完成任务或解锁成就，与答题数无关，这里不计入
+    monkeypatch.setattr(gs, "on_exam_complete", lambda db, exam, correct_count, total_count: None)
+
+    small = submit_all(client, *make_direction(10), count_statements)
+    large = submit_all(client, *make_direction(100), count_statements)
+
+    assert small["statements"] == large["statements"]
+    assert large["result"]["correct_count"] == 50
+    answers = large["result"]["answers"]
+    assert len(answers) == 100
+    assert all(answer["id"] for answer in answers)
+    assert [answer["is_correct"] for answer in answers] == [True] * 50 + [False] * 50
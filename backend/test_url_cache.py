@@ -0,0 +1,38 @@
+"""网页抓取缓存测试 - 按总字节数淘汰"""
+import pytest
+
+from app.services.url_cache import URLCache
+
+
+def cached_urls(cache: URLCache) -> list[str]:
+    return [row[0] for row in cache._get_conn().execute("SELECT url FROM url_cache ORDER BY accessed_at")]
+
+
+@pytest.mark.asyncio
+async def test_oversized_page_is_skipped_without_evicting(tmp_path):
+    """超过上限的页面不缓存，也不淘汰已有条目；同一 URL 的旧正文被删除"""
+    cache = URLCache(str(tmp_path / "url_cache.db"), max_bytes=100)
+    await cache.set("https://a", "etag-a", None, "a" * 40)
+    await cache.set("https://b", "etag-b", None, "b" * 40)
+    await cache.set("https://b", "etag-b2", None, "b" * 101)
+
+    assert cached_urls(cache) == ["https://a"]
+    assert cache.evictions == 0
+    assert cache.stores == 2
+
+
+@pytest.mark.asyncio
+async def test_evicts_only_enough_for_new_page(tmp_path):
+    """按最久未访问淘汰，腾出新页面所需空间即停止"""
+    cache = URLCache(str(tmp_path / "url_cache.db"), max_bytes=100)
+    for name in "abc":
+        await cache.set(f"https://{name}", f"etag-{name}", None, name * 30)
+    await cache.set("https://d", "etag-d", None, "d" * 40)
+
+    assert cached_urls(cache) == ["https://b", "https://c", "https://d"]
+    assert cache.evictions == 1
+
+    # 替换已有 URL 时不计入它自己的旧正文
+    await cache.set("https://d", "etag-d2", None, "d" * 40)
+    assert cached_urls(cache) == ["https://b", "https://c", "https://d"]
+    assert cache.evictions == 1
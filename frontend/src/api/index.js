@@ -8,6 +8,32 @@ const api = axios.create({
   }
 })
 
+// 列表接口为游标分页：下一页游标在响应头 X-Next-Cursor，总数在 X-Total-Count（with_total=true 时返回）
+const PAGE_LIMIT = 200
+// 整表拉取的页数上限（最多 MAX_PAGES * PAGE_LIMIT 条），避免数据量大时一次下载全部记录
+const MAX_PAGES = 5
+
+// 逐页拉取列表（至多 maxPages 页），返回 { data, nextCursor }；nextCursor 非空表示还有未加载的数据，
+// 列表页据此显示"加载更多"，以 params.cursor = nextCursor 再次调用即可接着拉取
+const getAllPages = async (url, params = {}, maxPages = MAX_PAGES) => {
+  const data = []
+  let cursor = params.cursor || null
+  let pages = 0
+  do {
+    const res = await api.get(url, { params: { ...params, cursor, limit: PAGE_LIMIT } })
+    data.push(...res.data)
+    cursor = res.headers['x-next-cursor'] || null
+    pages += 1
+  } while (cursor && pages < maxPages)
+  return { data, nextCursor: cursor }
+}
+
+// 只取总数（不下载列表内容）
+const getTotal = async (url, params = {}) => {
+  const res = await api.get(url, { params: { ...params, limit: 1, with_total: true } })
+  return Number(res.headers['x-total-count'] || 0)
+}
+
 // 学习方向 API
 export const directionsApi = {
   getAll: () => api.get('/directions'),
@@ -17,7 +43,10 @@ export const directionsApi = {
 
 // 资料 API
 export const materialsApi = {
-  getAll: (directionId) => api.get('/materials', { params: { direction_id: directionId } }),
+  getAll: (directionId, cursor) => getAllPages('/materials', { direction_id: directionId, cursor }),
+  // 只取 id 和标题（用于下拉选择等场景），每行很小，拉取全部页，下拉选项不截断
+  getTitles: (directionId) => getAllPages('/materials', { direction_id: directionId, fields: 'id,title' }, Infinity),
+  count: (params) => getTotal('/materials', params),
   create: (data) => api.post('/materials', data),
   get: (id) => api.get(`/materials/${id}`),
   delete: (id) => api.delete(`/materials/${id}`),
@@ -38,7 +67,8 @@ export const materialsApi = {
 
 // 题目 API
 export const questionsApi = {
-  getAll: (params) => api.get('/questions', { params }),
+  getAll: (params) => getAllPages('/questions', params),
+  count: (params) => getTotal('/questions', params),
   get: (id) => api.get(`/questions/${id}`),
   update: (id, data) => api.patch(`/questions/${id}`, data),
   delete: (id) => api.delete(`/questions/${id}`),
@@ -47,7 +77,8 @@ export const questionsApi = {
 
 // 测验 API
 export const examsApi = {
-  getAll: (params) => api.get('/exams', { params }),
+  getAll: (params) => getAllPages('/exams', params),
+  getRecent: (limit, params) => api.get('/exams', { params: { ...params, limit } }),
   create: (data) => api.post('/exams', data),
   get: (id) => api.get(`/exams/${id}`),
   submit: (id, answers) => api.post(`/exams/${id}/submit`, { answers }),
@@ -57,7 +88,7 @@ export const examsApi = {
 
 // 错题 API
 export const mistakesApi = {
-  getAll: (params) => api.get('/mistakes', { params }),
+  getAll: (params) => getAllPages('/mistakes', params),
   update: (id, data) => api.patch(`/mistakes/${id}`, data),
   delete: (id) => api.delete(`/mistakes/${id}`)
 }
@@ -75,7 +106,9 @@ export const parseApi = {
     })
   },
   parseUrl: (data) => api.post('/parse/url', data),
-  getTasks: (params) => api.get('/parse/tasks', { params }),
+  parseBatch: (data) => api.post('/parse/batch', data),
+  getBatch: (batchId) => api.get(`/parse/batch/${batchId}`),
+  getTasks: (params) => getAllPages('/parse/tasks', params),
   getTaskDetail: (taskId) => api.get(`/parse/tasks/${taskId}`),
   deleteTask: (taskId) => api.delete(`/parse/tasks/${taskId}`),
   updateTaskDirection: (taskId, directionId) => api.patch(`/parse/tasks/${taskId}`, { direction_id: directionId }),